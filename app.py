@@ -1,41 +1,297 @@
+import argparse
 import asyncio
+import contextlib
 import multiprocessing as mp
+import os
+import queue
+import sys
 
-from automall_scraper import Automall
-from cars24_scraper import CarScraper
-from kavak_scraper import KavakScraper
-from dubizzle_scraper import DubizzleScraper
+from scraper_core import config, dashboard, logs, metrics, registry, stats
 
+log = logs.get_logger("app")
 
-async def run_kavak():
-    async with KavakScraper(concurrency_api=25, concurrency_details=200) as scraper:
-        await scraper.run_scraper()
 
+# Scrapers and the request layer are imported where they are used, so that
+# importing this module (the scheduler does) stays cheap and each process
+# only loads the sites it runs.
 
-async def run_automall():
-    async with Automall() as automall:
-        await automall.run_scraper()
 
+async def run_site(site: str) -> None:
+    """Scrape ``site`` with its registered scraper."""
+    from scraper_core import engine, shutdown
 
-async def run_cars24():
-    async with CarScraper() as scraper:
-        await scraper.run_scraper(max_pages=50)
+    shutdown.install()
+    async with registry.create(site) as scraper:
+        await engine.run(scraper)
 
 
-async def run_dubizzle():
-    async with DubizzleScraper() as scraper:
-        await scraper.fetch_data()
+def process_wrapper(site, metrics_port=None, metrics_textfile=None):
+    from scraper_core import shutdown, tracing
 
+    # Forked children inherit the parent's exporter and log listener without
+    # their threads.
+    tracing.configure_from_env()
+    logs.setup()
+    try:
+        with dashboard.publishing(), metrics.exporting(metrics_port, metrics_textfile):
+            asyncio.run(run_site(site))
+    finally:
+        # Closing the loop restored the default handlers; idle again.
+        shutdown.leave_to_parent()
+        tracing.shutdown()
+        logs.shutdown()
 
-def process_wrapper(coro_func):
-    asyncio.run(coro_func())
+
+def attach_to_parent(progress_channel=None, log_records=None, stop=None) -> None:
+    """Pool initializer: report progress and log records to the parent."""
+    from scraper_core import shutdown
+
+    if stop is not None:
+        shutdown.attach(stop)
+    if progress_channel is not None:
+        dashboard.attach(progress_channel)
+    if log_records is not None:
+        logs.forward(log_records)
+
+
+def live_dashboard(enabled: bool, channel, sites):
+    """The dashboard for this run, or a no-op context when it is off."""
+    if not enabled:
+        return contextlib.nullcontext()
+    return dashboard.Dashboard(channel, sites)
+
+
+def configure_tracing(args) -> None:
+    """Export the tracing options to the environment and enable tracing."""
+    from scraper_core import tracing
+
+    if args.trace_file:
+        os.environ["LEGEND_TRACE_FILE"] = os.path.abspath(args.trace_file)
+    if args.otlp_endpoint:
+        os.environ["LEGEND_OTLP_ENDPOINT"] = args.otlp_endpoint
+    if args.trace_sample is not None:
+        os.environ["LEGEND_TRACE_SAMPLE"] = str(args.trace_sample)
+    tracing.configure_from_env()
+
+
+def configure_settings(parser, args) -> None:
+    """Export the configuration file path to the environment and validate it."""
+    if args.config:
+        os.environ["LEGEND_CONFIG"] = os.path.abspath(args.config)
+    try:
+        config.use(config.load())
+    except config.ConfigError as e:
+        parser.error(str(e))
+
+
+def configure_logging(args, records=None) -> None:
+    """Export the logging options to the environment and start logging."""
+    if args.log_level:
+        os.environ["LEGEND_LOG_LEVEL"] = args.log_level
+    if args.progress_interval is not None:
+        os.environ["LEGEND_PROGRESS_INTERVAL"] = str(args.progress_interval)
+    # The dashboard replaces the progress lines.
+    logs.setup(progress_interval=0 if args.dashboard else None, records=records)
+
+
+def configure_cassette(args) -> None:
+    """Export the record/replay options to the environment and apply them."""
+    from scraper_core import cassette
+
+    if args.record or args.replay:
+        os.environ["LEGEND_CASSETTE_MODE"] = "record" if args.record else "replay"
+        os.environ["LEGEND_CASSETTE_DIR"] = os.path.abspath(args.record or args.replay)
+    cassette.configure_from_env()
+
+
+def _textfile_path(directory, name):
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"legend_{name}.prom")
+
+
+async def run_all_async(sites, concurrency_budget: int = 300) -> None:
+    """
+    Run the scrapers of ``sites`` as tasks on the current event loop.
+
+    All scrapers share one connection pool and one global in-flight request
+    budget, so the process holds a single interpreter, pandas import and curl
+    multi handle instead of one per site.
+    """
+    from scraper_core import http
+
+    http.set_concurrency_budget(concurrency_budget)
+    http.share_connection_pool()
+    try:
+        results = await asyncio.gather(
+            *(run_site(site) for site in sites), return_exceptions=True
+        )
+    finally:
+        await http.close_connection_pool()
+
+    for site, result in zip(sites, results):
+        if isinstance(result, Exception):
+            log.error("%s failed: %s", site, result)
+
+    for site, values in stats.snapshot_all().items():
+        log.info(
+            "%s: %d requests, %d errors, %.1f MB, p95 %s ms",
+            site,
+            values["requests"],
+            values["errors"],
+            values["bytes"] / 1_000_000,
+            values["p95_ms"],
+        )
+
+
+def run_event_loop(coro) -> None:
+    """Run ``coro`` on uvloop when it is installed, else on asyncio's loop."""
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(coro)
+    else:
+        uvloop.run(coro)
 
 
 def main():
-    scrapers = [run_kavak, run_automall, run_cars24, run_dubizzle]
+    parser = argparse.ArgumentParser(description="Run all Legend scrapers")
+    parser.add_argument(
+        "--config",
+        metavar="PATH",
+        help="Per-site settings file (default: legend.toml or $LEGEND_CONFIG)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["process", "async"],
+        default="process",
+        help="process: one OS process per site; async: every site on one event loop",
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=300,
+        help="Global in-flight request budget shared by all sites in async mode",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on this local port "
+        "(process mode: one consecutive port per site)",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="DIR",
+        help="Write Prometheus textfile-collector files into DIR",
+    )
+    parser.add_argument(
+        "--trace-file",
+        metavar="PATH",
+        help="Write sampled request/parse spans to PATH as JSON lines",
+    )
+    parser.add_argument(
+        "--otlp-endpoint",
+        metavar="URL",
+        help="Send spans to an OTLP/HTTP collector, e.g. http://127.0.0.1:4318",
+    )
+    parser.add_argument(
+        "--trace-sample",
+        type=float,
+        help="Fraction of detail fetches to trace (default 1.0)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Log level (default INFO; DEBUG logs every record)",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        help="Seconds between per-site progress lines, 0 to disable (default 10)",
+    )
+    parser.add_argument(
+        "--dashboard",
+        action=argparse.BooleanOptionalAction,
+        help="Show a live per-site progress table (default: on in a terminal)",
+    )
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record",
+        metavar="DIR",
+        help="Record every request and response into the cassette directory DIR",
+    )
+    cassette_group.add_argument(
+        "--replay",
+        metavar="DIR",
+        help="Answer requests from the cassette directory DIR instead of the network",
+    )
+    args = parser.parse_args()
+    configure_settings(parser, args)
+    sites = config.enabled_sites()
+    if not sites:
+        parser.error("no site is enabled in the configuration")
+    if args.dashboard is None:
+        args.dashboard = sys.stdout.isatty()
+    # Child processes log through the parent so that their lines are printed
+    # above the dashboard instead of through it.
+    log_records = mp.Queue() if args.dashboard and args.mode == "process" else None
+    configure_logging(args, log_records)
+    configure_tracing(args)
+    configure_cassette(args)
+
+    if args.mode == "async":
+        from scraper_core import tracing
+
+        channel = queue.SimpleQueue()
+        try:
+            with (
+                live_dashboard(args.dashboard, channel, sites),
+                metrics.exporting(
+                    args.metrics_port, _textfile_path(args.metrics_textfile, "all")
+                ),
+                dashboard.publishing(channel if args.dashboard else None),
+            ):
+                run_event_loop(run_all_async(sites, args.budget))
+        finally:
+            tracing.shutdown()
+            logs.shutdown()
+        return
+
+    from scraper_core import shutdown
 
-    with mp.Pool(processes=len(scrapers)) as pool:
-        pool.map(process_wrapper, scrapers)
+    # SIGTERM unwinds the parent like Ctrl+C; the workers share its stop flag.
+    shutdown.sigterm_as_interrupt()
+    stop = shutdown.share()
+    jobs = [
+        (
+            site,
+            args.metrics_port + index if args.metrics_port else None,
+            _textfile_path(args.metrics_textfile, site),
+        )
+        for index, site in enumerate(sites)
+    ]
+    channel = mp.Queue() if args.dashboard else None
+    try:
+        with (
+            live_dashboard(args.dashboard, channel, sites),
+            mp.Pool(
+                processes=len(sites),
+                initializer=attach_to_parent,
+                initargs=(channel, log_records, stop),
+            ) as pool,
+        ):
+            try:
+                pool.starmap(process_wrapper, jobs)
+            except KeyboardInterrupt:
+                # The scrapers drain, flush and checkpoint, then return.
+                shutdown.request("interrupted")
+            # Let the workers exit on their own so their queues are flushed;
+            # leaving the block would terminate them.
+            pool.close()
+            pool.join()
+    finally:
+        logs.shutdown()
 
 
 if __name__ == "__main__":
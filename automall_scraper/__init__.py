@@ -2,6 +2,22 @@
 Automall Scraper
 """
 
-from .automall_scraper import Automall
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .automall_scraper import Automall
 
 __all__ = ["Automall"]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "Automall":
+        from .automall_scraper import Automall
+
+        globals()[name] = Automall
+        return Automall
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
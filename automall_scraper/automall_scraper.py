@@ -1,33 +1,36 @@
 import asyncio
 import json
+import re
 from selectolax.parser import HTMLParser
-import os
-from curl_cffi import AsyncSession
-import pandas as pd
+from scraper_core import engine, logs, stats
+from scraper_core.base import BaseScraper, ScrapeError
 from datetime import datetime, timezone
-from rich import print
-from typing import Optional, Type, Any, Dict
-from types import TracebackType
+from typing import Any, AsyncIterator, Dict, Optional
 
+log = logs.get_logger("automall")
 
-class Automall:
+# The Next.js build id as it appears in a page's __NEXT_DATA__ script.
+BUILD_ID = re.compile(r'"buildId"\s*:\s*"([^"]+)"')
+
+
+class Automall(BaseScraper):
     """
     Automall is a website that sells cars.
     """
 
-    def __init__(self, concurrency: int = 100):
+    name = "automall"
+
+    def __init__(self, concurrency: Optional[int] = None):
         """
         Initialize the Automall class.
         """
-        print(f"--------- Automall Scraper Started ---------\n")
-
-        self.session = AsyncSession(timeout=120, impersonate="chrome")
-
-        today_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        self.csv_file = f"automall_{today_date}.csv"
-        self.concurrency = concurrency
+        super().__init__(concurrency)
 
         self.cars_url = "https://www.automall.ae/en/used-cars-shop/"
+        self.site_url = "https://www.automall.ae"
+        # Next.js build whose /_next/data/ JSON replaces the details pages;
+        # None until a page reveals it or after it went stale.
+        self.build_id: Optional[str] = None
 
         self.base_url = "https://www.automall.ae/bff/v2/vehicles"
 
@@ -49,176 +52,68 @@ class Automall:
             "&sort=price=1"
         )
 
-    async def __aenter__(self):
-        """Enter the context manager."""
-        return self
-
-    async def __aexit__(
-        self,
-        exc_type: Optional[Type[BaseException]],
-        exc: Optional[BaseException],
-        tb: Optional[TracebackType],
-    ) -> None:
-        """
-        Exit the context manager.
-        """
-        await self.session.close()
-
-    async def _make_request(
-        self,
-        method: str,
-        url: str,
-        params: Optional[Dict[str, Any]] = None,
-        data: Optional[Dict[str, Any]] = None,
-        json_payload: Optional[Dict[str, Any]] = None,
-        allow_redirects: bool = True,
-        headers: Optional[Dict[str, Any]] = None,
-        cookies: Optional[Dict[str, Any]] = None,
-        timeout: int = 120,
-        verify: bool = True,
-    ) -> Dict[str, Any]:
-        """
-        Make a request to the Automall API.
-
-        Args:
-            method (str): The HTTP method to use.
-            url (str): The URL to request.
-            params (Optional[Dict[str, Any]]): The parameters to send with the request.
-            data (Optional[Dict[str, Any]]): The data to send with the request.
-            json_payload (Optional[Dict[str, Any]]): The JSON payload to send with the request.
-            allow_redirects (bool): Whether to allow redirects.
-            headers (Optional[Dict[str, Any]]): The headers to send with the request.
-            cookies (Optional[Dict[str, Any]]): The cookies to send with the request.
-            timeout (int): The timeout for the request.
-            verify (bool): Whether to verify the SSL certificate.
-
-        Returns:
-            Dict[str, Any]: The response from the request.
-            status (bool): Whether the request was successful.
-            message (str): The message from the request.
-            json (Optional[Dict[str, Any]]): The JSON response from the request.
-            parser (Optional[HTMLParser]): The HTML parser from the request.
-            text (Optional[str]): The text response from the request.
-            response_obj (Optional[Response]): The response object from the request.
+    async def get_auth_token(self) -> Optional[str]:
         """
-        try:
-            method_lower = method.lower()
-            if method_lower not in [
-                "get",
-                "post",
-                "put",
-                "delete",
-                "patch",
-                "head",
-                "options",
-            ]:
-                return {"status": False, "message": f"Invalid HTTP method: {method}."}
-
-            response = await getattr(self.session, method_lower)(
-                url,
-                params=params,
-                data=data,
-                json=json_payload,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-                verify=verify,
-                allow_redirects=allow_redirects,
-            )
+        Get the auth token from the Automall API.
 
-            return {
-                "status": True,
-                "message": "Request successful.",
-                "response": response,
-            }
-        except Exception as e:
-            return {"status": False, "message": f"Request failed: {e}"}
+        The shop page is also where the Next.js build id is first read.
 
-    async def get_auth_token(self) -> str:
-        """
-        Get the auth token from the Automall API.
+        Raises:
+            ScrapeError: If the shop page cannot be loaded.
         """
-        response_data: dict = await self._make_request("get", self.cars_url)
-        if not response_data["status"]:
-            return response_data
-
-        response = response_data.get("response")
-        if response.status_code != 200:
-            return {
-                "status": False,
-                "message": f"Automall: API request failed for get_auth_token: {response.text}",
-            }
-
-        cookies = response.cookies.jar
-        for cookie in cookies:
+        response = await self.request("get", self.cars_url)
+        self._learn_build_id(response.text)
+        for cookie in response.cookies.jar:
             if cookie.name == "AUTH_TOKEN":
-                auth_token = cookie.value
-                return auth_token
-
+                return cookie.value
         return None
 
-    async def fetch_car_ids(self) -> dict:
+    async def discover(self) -> AsyncIterator[Dict[str, Any]]:
         """
-        Fetch a page of cars from Automall.
+        Yield the id and listed price of every car in the shop, a page at a
+        time.
 
-        Returns:
-            dict: A dictionary containing the status, message, and cars.
-            status (bool): Whether the request was successful.
-            message (str): The message from the request.
-            cars (list): A list of car ids.
+        Raises:
+            ScrapeError: If there is no auth token or a page cannot be fetched.
         """
-        print(">= Automall: Fetching car ids")
+        log.info("Fetching car ids")
 
         start_index = 0
-        no_of_records = 28
-
-        ids = []
+        no_of_records = self.settings.page_size
+        max_pages = self.settings.max_pages
+        pages = 0
 
         auth_token = await self.get_auth_token()
         if not auth_token:
-            return {
-                "status": False,
-                "message": "Automall: No auth token found.",
-            }
+            raise ScrapeError("Automall: No auth token found.", "no_auth_token")
         auth_token = f"Bearer {auth_token}"
         self.headers["authorization"] = auth_token
 
-        while True:
+        while not max_pages or pages < max_pages:
 
             paging_info = f"start-index={start_index}|no-of-records={no_of_records}"
 
-            print(f">= Scraping page {start_index} to {start_index + no_of_records}")
+            log.debug(
+                "Scraping page %d to %d", start_index, start_index + no_of_records
+            )
 
             self.headers["paging-info"] = paging_info
 
             api_url = f"{self.base_url}?{self.query}"
 
-            response_data: dict = await self._make_request(
-                "get", api_url, headers=self.headers
-            )
-            if not response_data["status"]:
-                return {
-                    "status": False,
-                    "message": f"API request failed for page: {response_data.get('message')}",
-                    "cars": [],
-                }
-
-            response = response_data.get("response")
-            if response.status_code != 200:
-                return {
-                    "status": False,
-                    "message": f"Automall API request failed for fetch_car_ids: {response.text}",
-                }
+            response = await self.request("get", api_url, headers=self.headers)
 
+            stats.for_site(self.name).record_page()
             json_responses: list[dict] = response.json()
             if len(json_responses) == 0:
-                print(">= Automall: No more cars pages to scrape")
+                log.info("No more cars pages to scrape")
                 break
 
             for json_response in json_responses:
 
                 id = json_response.get("id")
-                ids.append(id)
+                if id:
+                    yield {"id": id, "price": json_response.get("price")}
 
                 # price = json_response.get("price")
                 # equatedMonthlyInstallment = json_response.get(
@@ -269,45 +164,96 @@ class Automall:
                 # }
 
             start_index += no_of_records
+            pages += 1
 
-        return {
-            "status": True,
-            "message": "Car ids fetched successfully.",
-            "cars": ids,
-        }
-
-    async def get_car_data(self, id: str) -> dict:
-        """
-        Get the car data from the Automall API.
+    def _learn_build_id(self, html: str) -> None:
+        """Remember the build id of ``html``'s ``__NEXT_DATA__``, if it has one."""
+        match = BUILD_ID.search(html)
+        if match and match.group(1) != self.build_id:
+            log.info("Using Next.js build %s for car details", match.group(1))
+            self.build_id = match.group(1)
 
-        Args:
-            id (str): The id of the car to get the data from.
+    def item_id(self, car: Dict[str, Any]) -> str:
+        return str(car["id"])
 
+    def listing_signature(self, car: Dict[str, Any]) -> Optional[str]:
+        price = car.get("price")
+        return None if price is None else str(price)
 
+    async def fetch(self, car: Dict[str, Any]) -> Any:
         """
-        print(f">= Automall: Scraping car details for {id}")
+        Download the details of one car.
 
-        car_url = f"https://www.automall.ae/en/used-cars-shop/details/{id.lower()}/"
+        Once the Next.js build id is known this is the page's ``/_next/data/``
+        JSON, a fraction of the rendered HTML. When that answers 404, or
+        answers with something other than JSON, the build is stale or the car
+        is gone: the HTML page decides which, and a new build id found in it
+        is used from then on.
 
-        response_data: dict = await self._make_request(
-            "get",
-            car_url,
-        )
-        if not response_data["status"]:
-            return response_data
+        Args:
+            car (Dict[str, Any]): The car's listing, as yielded by
+                :meth:`discover`.
 
-        response = response_data.get("response")
-        if response.status_code != 200:
-            return {
-                "status": False,
-                "message": f"Automall API request failed for get_car_data: {response.text}",
-            }
+        Returns:
+            The ``/_next/data/`` JSON (dict) or the details page (str).
+        """
+        id = car["id"]
+        log.debug("Scraping car details for %s", id)
+
+        build_id = self.build_id
+        if build_id:
+            data_url = (
+                f"{self.site_url}/_next/data/{build_id}"
+                f"/en/used-cars-shop/details/{id.lower()}.json"
+            )
+            try:
+                response = await self.request("get", data_url)
+                return response.json()
+            except ScrapeError as e:
+                if e.reason != "http_404":
+                    raise
+                log.debug("No Next.js data for %s in build %s", id, build_id)
+            except ValueError:
+                # E.g. an error page served with 200 for an unknown build.
+                log.debug("Next.js data for %s in build %s is not JSON", id, build_id)
+
+        car_url = f"{self.site_url}/en/used-cars-shop/details/{id.lower()}/"
+        response = await self.request("get", car_url)
+        self._learn_build_id(response.text)
+        return response.text
+
+    def extract(self, payload: Any) -> Dict[str, Any]:
+        if isinstance(payload, str):
+            return self.parse_car_page(payload)
+        return self.build_car_data(payload.get("pageProps", {}))
+
+    def parse_car_page(self, html: str) -> dict:
+        """
+        Build one CSV row from a car details page.
+
+        Args:
+            html (str): The details page, including its ``__NEXT_DATA__`` script.
 
-        parser = HTMLParser(response.text)
+        Returns:
+            dict: The car data.
+        """
+        parser = HTMLParser(html)
         script = parser.css_first('script[id="__NEXT_DATA__"]')
         data: dict = json.loads(script.text())
 
-        pageProps: dict = data.get("props", {}).get("pageProps", {})
+        return self.build_car_data(data.get("props", {}).get("pageProps", {}))
+
+    def build_car_data(self, pageProps: dict) -> dict:
+        """
+        Build one CSV row from the ``pageProps`` of a car details page.
+
+        Args:
+            pageProps (dict): The page's props, from ``__NEXT_DATA__`` or the
+                ``/_next/data/`` JSON.
+
+        Returns:
+            dict: The car data.
+        """
         detailCarInfo: dict = pageProps.get("detailCarInfo", {})
 
         trimName = detailCarInfo.get("trimName")
@@ -401,50 +347,15 @@ class Automall:
 
         return car_data
 
-    async def run_scraper(self) -> None:
-        """Run the scraper."""
-        car_results: dict = await self.fetch_car_ids()
-        if not car_results["status"]:
-            print(f">= Automall: Error fetching car IDs: {car_results.get('message')}")
-            return
-
-        cars_ids = car_results.get("cars")
-        if not cars_ids:
-            print(">= Automall: No car IDs found to process.")
-            return
-
-        all_car_data = []
-
-        for i in range(0, len(cars_ids), self.concurrency):
-            batch_ids = cars_ids[i : i + self.concurrency]
-            print(
-                f">= Automall: Processing batch {i // self.concurrency + 1} with {len(batch_ids)} cars"
-            )
-            tasks = [self.get_car_data(id) for id in batch_ids]
-
-            print(
-                f">= Automall: Processing batch {i // self.concurrency + 1} with {len(batch_ids)} cars"
-            )
-            batch_results = await asyncio.gather(*tasks)
-
-            for result in batch_results:
-                all_car_data.append(result)
-
-                df = pd.DataFrame([result])
-                df.to_csv(
-                    self.csv_file,
-                    mode="a",
-                    index=False,
-                    header=not os.path.exists(self.csv_file),
-                )
-
-        print(f"\n>= Total cars processed and saved: {len(all_car_data)}")
-
 
 async def main():
     async with Automall() as automall:
-        await automall.run_scraper()
+        await engine.run(automall)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logs.setup()
+    try:
+        asyncio.run(main())
+    finally:
+        logs.shutdown()
@@ -0,0 +1,209 @@
+"""
+Micro-benchmarks for the per-record extraction functions.
+
+Times ``DubizzleScraper.build_car_data``, ``CarScraper.build_car_data`` and
+``Automall.extract`` (on details pages and on their decoded Next.js data) on
+saved payloads and reports the cost and peak allocation per record. Payloads come from ``fixtures/`` or, with
+``--cassette``, from a recorded run (see :mod:`scraper_core.cassette`).
+
+    python -m benchmarks.extraction
+    python -m benchmarks.extraction --cassette cassettes/2025-06-01
+    python -m benchmarks.extraction --save extraction_baseline.json
+    python -m benchmarks.extraction --compare extraction_baseline.json --max-regression 0.2
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from .mock_server import MockRequest
+from .sites import DEFAULT_PAGE_KB, AutomallSite, load_fixture, render
+
+PAYLOADS = 100
+
+
+def fixture_payloads(count: int, page_kb: int) -> Dict[str, List[Any]]:
+    """Build ``count`` distinct payloads per case from the sample fixtures."""
+    ids = [f"{index:07d}" for index in range(1, count + 1)]
+    automall = AutomallSite(count, page_kb=page_kb)
+    return {
+        "dubizzle": [render(load_fixture("dubizzle_hit.json"), id) for id in ids],
+        "cars24": [render(load_fixture("cars24_result.json"), id) for id in ids],
+        "automall": [
+            automall.handle(
+                MockRequest(
+                    "GET", f"/en/used-cars-shop/details/{id.lower()}/", {}, {}, b""
+                )
+            ).body.decode("utf-8")
+            for id in automall.ids
+        ],
+        "automall_json": [
+            automall.handle(
+                MockRequest(
+                    "GET",
+                    f"/_next/data/{automall.build_id}/en/used-cars-shop"
+                    f"/details/{id.lower()}.json",
+                    {},
+                    {},
+                    b"",
+                )
+            ).body.decode("utf-8")
+            for id in automall.ids
+        ],
+    }
+
+
+def cassette_payloads(directory: str, count: int) -> Dict[str, List[Any]]:
+    """Pull up to ``count`` payloads per case out of a recorded cassette."""
+    payloads: Dict[str, List[Any]] = {
+        "dubizzle": [],
+        "cars24": [],
+        "automall": [],
+        "automall_json": [],
+    }
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                response = entry["response"]
+                if response["status"] != 200 or response["content"].get("encoding"):
+                    continue
+                text = response["content"]["text"]
+                site = entry["site"]
+                if site == "dubizzle":
+                    payloads[site].extend(json.loads(text)["results"][0]["hits"])
+                elif site == "cars24":
+                    payloads[site].extend(json.loads(text).get("results", []))
+                elif site == "automall" and "/_next/data/" in entry["request"]["url"]:
+                    payloads["automall_json"].append(text)
+                elif site == "automall" and "/details/" in entry["request"]["url"]:
+                    payloads[site].append(text)
+    return {site: items[:count] for site, items in payloads.items() if items}
+
+
+def extractors() -> Dict[str, Callable[[Any], Any]]:
+    """The functions under test, bound to scraper instances."""
+    from automall_scraper import Automall
+    from cars24_scraper import CarScraper
+    from dubizzle_scraper import DubizzleScraper
+
+    dubizzle = DubizzleScraper()
+    cars24 = CarScraper()
+    automall = Automall()
+    return {
+        "dubizzle": dubizzle.build_car_data,
+        "cars24": cars24.build_car_data,
+        "automall": automall.extract,
+        # Decoding the JSON is part of the cost, as parsing is for the HTML.
+        "automall_json": lambda text: automall.extract(json.loads(text)),
+    }
+
+
+def measure(
+    func: Callable[[Any], Any], payloads: List[Any], repeat: int
+) -> Dict[str, float]:
+    """
+    Time ``func`` over ``payloads`` and trace its allocations.
+
+    Returns:
+        Dict[str, float]: Best-of-``repeat`` microseconds per record and the
+        mean peak KiB allocated per record.
+    """
+
+    def run_all() -> None:
+        for payload in payloads:
+            func(payload)
+
+    timer = timeit.Timer(run_all)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number))
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for payload in payloads:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            func(payload)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "us_per_record": round(best / (number * len(payloads)) * 1e6, 2),
+        "peak_kib_per_record": round(sum(peaks) / len(peaks) / 1024, 2),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline_path: str, max_regression: float
+) -> List[str]:
+    """Describe every case that got slower or allocates more than allowed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for case, result in results.items():
+        for metric in ("us_per_record", "peak_kib_per_record"):
+            base = baseline.get(case, {}).get(metric)
+            if base and result[metric] > base * (1 + max_regression):
+                regressions.append(
+                    f"{case} {metric}: {result[metric]} vs {base} "
+                    f"(+{result[metric] / base - 1:.0%})"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the extraction functions")
+    parser.add_argument(
+        "--cassette", metavar="DIR", help="Use payloads from a recording"
+    )
+    parser.add_argument("--payloads", type=int, default=PAYLOADS)
+    parser.add_argument("--page-kb", type=int, default=DEFAULT_PAGE_KB)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="Write the results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="Fail on regressions against saved results"
+    )
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.cassette:
+        payloads = cassette_payloads(args.cassette, args.payloads)
+    else:
+        payloads = fixture_payloads(args.payloads, args.page_kb)
+    functions = extractors()
+
+    results = {}
+    print(f"{'case':<14}{'payloads':>9}{'us/record':>12}{'peak KiB/record':>17}")
+    for case, items in payloads.items():
+        results[case] = measure(functions[case], items, args.repeat)
+        print(
+            f"{case:<14}{len(items):>9}{results[case]['us_per_record']:>12.2f}"
+            f"{results[case]['peak_kib_per_record']:>17.2f}"
+        )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {"source": args.cassette or "fixtures", "results": results}, f, indent=2
+            )
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_regression)
+        for message in regressions:
+            print(f">= Regression: {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Local stand-in for the scraped sites.
+
+A :class:`MockServer` serves one :class:`MockSite` over plain HTTP with
+keep-alive, optional per-request latency and injected 503 errors. The
+scrapers reach it through :func:`scraper_core.http.set_host_overrides`.
+A :class:`MockProxy` stands in for one of a site's ``proxies``.
+"""
+
+import http.client
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+class MockRequest(NamedTuple):
+    method: str
+    path: str
+    query: Dict[str, List[str]]
+    headers: Dict[str, str]
+    body: bytes
+
+
+class MockResponse(NamedTuple):
+    status: int
+    body: bytes
+    content_type: str = "application/json"
+    headers: Dict[str, str] = {}
+
+
+NOT_FOUND = MockResponse(404, b"Not Found", "text/plain")
+UNAVAILABLE = MockResponse(503, b"Service Unavailable", "text/plain")
+
+
+class MockSite:
+    """The routes of one site; subclasses implement :meth:`handle`."""
+
+    name = ""
+    # Real hostnames whose requests should be sent to the mock server.
+    hosts: List[str] = []
+
+    def handle(self, request: MockRequest) -> MockResponse:
+        raise NotImplementedError
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The detail phases open a few hundred connections at once.
+    request_queue_size = 1024
+
+
+class MockServer:
+    """Serves a :class:`MockSite` from a background thread."""
+
+    def __init__(
+        self,
+        site: MockSite,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        seed: int = 0,
+        address: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Args:
+            site (MockSite): The routes to serve.
+            latency_ms (float): Delay added before every response.
+            jitter_ms (float): Uniform random extra delay, 0 to ``jitter_ms``.
+            error_rate (float): Fraction of requests answered with a 503.
+            slow_rate (float): Fraction of requests delayed ``slow_ms`` more,
+                as stragglers.
+            slow_ms (float): Extra delay of a straggler.
+            seed (int): Seed for the latency and error draws.
+            address (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one.
+        """
+        self.site = site
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.requests = 0
+        self.injected_errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((address, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def host_overrides(self) -> Dict[str, str]:
+        """The mapping to pass to :func:`scraper_core.http.set_host_overrides`."""
+        return {host: self.base_url for host in self.site.hosts}
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name=f"mock-{self.site.name}",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _draw(self) -> tuple:
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            if self._random.random() < self.slow_rate:
+                delay += self.slow_ms
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.injected_errors += 1
+        return delay / 1000, failed
+
+    def _respond(self, request: MockRequest) -> MockResponse:
+        delay, failed = self._draw()
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return UNAVAILABLE
+        try:
+            return self.site.handle(request)
+        except Exception as e:
+            return MockResponse(500, str(e).encode("utf-8"), "text/plain")
+
+    def _make_handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                parts = urlsplit(self.path)
+                request = MockRequest(
+                    method=self.command,
+                    path=parts.path,
+                    query=parse_qs(parts.query),
+                    headers={k.lower(): v for k, v in self.headers.items()},
+                    body=self.rfile.read(length) if length else b"",
+                )
+                response = server._respond(request)
+                self.send_response(response.status)
+                self.send_header("Content-Type", response.content_type)
+                self.send_header("Content-Length", str(len(response.body)))
+                for name, value in response.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(response.body)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+
+# Headers that concern one hop and are not forwarded.
+HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-connection",
+        "proxy-authorization",
+        "transfer-encoding",
+    }
+)
+
+
+class MockProxy:
+    """
+    A forward proxy for plain-HTTP requests, with its own latency and a
+    share of requests dropped without an answer, as by a failing egress IP.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        address: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Args:
+            latency_ms (float): Delay added before forwarding a request.
+            error_rate (float): Fraction of requests dropped unanswered.
+            seed (int): Seed for the error draws.
+            address (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one.
+        """
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.dropped = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((address, port), self._make_handler())
+
+    @property
+    def url(self) -> str:
+        """The proxy URL, as listed in a site's ``proxies``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _drop(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            dropped = self._random.random() < self.error_rate
+            if dropped:
+                self.dropped += 1
+        return dropped
+
+    def _make_handler(self) -> type:
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _forward(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                if proxy._drop():
+                    self.close_connection = True
+                    return
+                if proxy.latency_ms:
+                    time.sleep(proxy.latency_ms / 1000)
+                target = urlsplit(self.path)
+                headers = {
+                    name: value
+                    for name, value in self.headers.items()
+                    if name.lower() not in HOP_HEADERS
+                }
+                upstream = http.client.HTTPConnection(target.netloc, timeout=60)
+                try:
+                    upstream.request(
+                        self.command,
+                        target.path + (f"?{target.query}" if target.query else ""),
+                        body=body,
+                        headers=headers,
+                    )
+                    response = upstream.getresponse()
+                    content = response.read()
+                finally:
+                    upstream.close()
+                self.send_response(response.status)
+                for name, value in response.getheaders():
+                    if name.lower() not in HOP_HEADERS | {"content-length"}:
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = _forward
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "MockProxy":
+        threading.Thread(
+            target=self._server.serve_forever, name="mock-proxy", daemon=True
+        ).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockProxy":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
@@ -0,0 +1,326 @@
+"""
+Offline scraper benchmarks.
+
+Runs each scraper's production entry point against a local mock of its
+site and reports records/sec, CPU time and peak RSS. Every scraper runs in
+a fresh process so the numbers are its own; the mock server runs in this
+one.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sites kavak automall --records 2000 --latency-ms 80
+    python -m benchmarks.run --save baseline.json
+    python -m benchmarks.run --compare baseline.json --max-regression 0.2
+    python -m benchmarks.run --sites kavak --proxies 4 --failing-proxies 1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .mock_server import MockProxy, MockServer
+from .sites import DEFAULT_PAGE_KB, SITES
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, in MB."""
+    try:
+        import resource
+    except ImportError:
+        return _peak_rss_mb_windows()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _peak_rss_mb_windows() -> Optional[float]:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        ok = ctypes.windll.psapi.GetProcessMemoryInfo(
+            kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+        )
+    except (AttributeError, OSError):
+        return None
+    return counters.PeakWorkingSetSize / (1024 * 1024) if ok else None
+
+
+def _bench_child(
+    site: str,
+    records: int,
+    overrides: Dict[str, str],
+    verbose: bool,
+    proxies: Optional[List[str]] = None,
+    proxy_concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Run one scraper in this (fresh) process and measure it."""
+    from scraper_core import config, http, logs, stats
+
+    from .sites import run_site
+
+    http.set_host_overrides(overrides)
+    if proxies:
+        loaded = config.get()
+        defaults = {**loaded.defaults, "proxies": proxies}
+        if proxy_concurrency:
+            defaults["proxy_concurrency"] = proxy_concurrency
+        sections = {
+            name: {key: value for key, value in values.items() if key != "proxies"}
+            for name, values in loaded.sections.items()
+        }
+        config.use(config.Config({"defaults": defaults, "sites": sections}))
+    if verbose:
+        logs.setup()
+    else:
+        logs.setup(level="WARNING", progress_interval=0)
+    # Output CSVs go to a scratch directory, not the working tree.
+    with tempfile.TemporaryDirectory(prefix=f"bench-{site}-") as workdir:
+        os.chdir(workdir)
+        with open(os.devnull, "w") as devnull, contextlib.ExitStack() as stack:
+            if not verbose:
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            error = None
+            try:
+                asyncio.run(run_site(site, records))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+            logs.shutdown()
+        os.chdir(tempfile.gettempdir())
+
+    snapshot = stats.snapshot(site)
+    return {
+        "site": site,
+        "records": snapshot["successes"],
+        "failures": snapshot["failures"],
+        "requests": snapshot["requests"],
+        "request_errors": snapshot["errors"],
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "records_per_s": round(snapshot["successes"] / wall, 1) if wall else 0.0,
+        "cpu_ms_per_record": (
+            round(cpu * 1000 / snapshot["successes"], 3)
+            if snapshot["successes"]
+            else None
+        ),
+        "peak_rss_mb": peak_rss_mb(),
+        "p95_ms": snapshot["p95_ms"],
+        "error": error,
+    }
+
+
+def bench_site(site: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Serve the mock of ``site`` and run its scraper against it."""
+    mock = SITES[site](args.records, page_kb=args.page_kb)
+    with (
+        MockServer(
+            mock,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            slow_rate=args.slow_rate,
+            slow_ms=args.slow_ms,
+            seed=args.seed,
+        ) as server,
+        contextlib.ExitStack() as stack,
+    ):
+        # The last --failing-proxies stand-ins drop every request.
+        proxies = [
+            stack.enter_context(
+                MockProxy(
+                    error_rate=float(index >= args.proxies - args.failing_proxies)
+                )
+            )
+            for index in range(args.proxies)
+        ]
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=mp.get_context("spawn")
+        ) as executor:
+            result = executor.submit(
+                _bench_child,
+                site,
+                args.records,
+                server.host_overrides(),
+                args.verbose,
+                [proxy.url for proxy in proxies],
+                args.proxy_concurrency,
+            ).result()
+        result["injected_errors"] = server.injected_errors
+        result["proxy_requests"] = [proxy.requests for proxy in proxies]
+    return result
+
+
+def print_report(results: List[Dict[str, Any]], args: argparse.Namespace) -> None:
+    print(
+        f">= Benchmarks: {args.records} records per site, latency "
+        f"{args.latency_ms}+{args.jitter_ms}ms, error rate {args.error_rate:.0%}"
+        + (
+            f", {args.slow_rate:.0%} stragglers +{args.slow_ms}ms"
+            if args.slow_rate
+            else ""
+        )
+        + (
+            f", {args.proxies} proxies ({args.failing_proxies} failing)"
+            if args.proxies
+            else ""
+        )
+    )
+    header = (
+        f"{'site':<11}{'records':>8}{'failed':>8}{'wall s':>9}{'rec/s':>9}"
+        f"{'cpu s':>8}{'cpu ms/rec':>11}{'rss MB':>8}{'p95 ms':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        print(
+            f"{r['site']:<11}{r['records']:>8}{r['failures']:>8}{r['wall_s']:>9.2f}"
+            f"{r['records_per_s']:>9.1f}{r['cpu_s']:>8.2f}"
+            f"{r['cpu_ms_per_record'] or 0:>11.3f}{rss:>8}{r['p95_ms'] or 0:>9.1f}"
+        )
+        if r["error"]:
+            print(f"   {r['site']} stopped early: {r['error']}")
+        if r.get("proxy_requests"):
+            print(f"   requests per proxy: {r['proxy_requests']}")
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline_path: str, max_regression: float
+) -> List[str]:
+    """
+    Compare ``results`` to a saved run.
+
+    Returns:
+        List[str]: One message per site whose records/sec or CPU per record
+        got worse by more than ``max_regression``.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["site"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    for r in results:
+        base = baseline.get(r["site"])
+        if not base:
+            continue
+        if base["records_per_s"] and r["records_per_s"] < base["records_per_s"] * (
+            1 - max_regression
+        ):
+            regressions.append(
+                f"{r['site']}: {r['records_per_s']} records/s vs {base['records_per_s']}"
+            )
+        if (
+            base["cpu_ms_per_record"]
+            and r["cpu_ms_per_record"]
+            and r["cpu_ms_per_record"]
+            > base["cpu_ms_per_record"] * (1 + max_regression)
+        ):
+            regressions.append(
+                f"{r['site']}: {r['cpu_ms_per_record']} CPU ms/record "
+                f"vs {base['cpu_ms_per_record']}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers offline")
+    parser.add_argument(
+        "--sites", nargs="+", choices=sorted(SITES), default=list(SITES)
+    )
+    parser.add_argument("--records", type=int, default=500, help="Listings per site")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of requests to 503"
+    )
+    parser.add_argument(
+        "--slow-rate", type=float, default=0.0, help="Fraction of requests to stall"
+    )
+    parser.add_argument(
+        "--slow-ms", type=float, default=2000.0, help="Extra delay of a stalled request"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--proxies", type=int, default=0, help="Route through N local proxy stand-ins"
+    )
+    parser.add_argument(
+        "--failing-proxies",
+        type=int,
+        default=0,
+        help="How many of the proxies drop every request",
+    )
+    parser.add_argument(
+        "--proxy-concurrency",
+        type=int,
+        help="Requests per proxy at once (default: the site's setting)",
+    )
+    parser.add_argument(
+        "--page-kb", type=int, default=DEFAULT_PAGE_KB, help="Size of HTML pages"
+    )
+    parser.add_argument("--save", metavar="PATH", help="Write the results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="Fail on regressions against saved results"
+    )
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="Show scraper output")
+    args = parser.parse_args()
+
+    results = [bench_site(site, args) for site in args.sites]
+    print_report(results, args)
+
+    if args.save:
+        settings = {
+            key: getattr(args, key)
+            for key in (
+                "records",
+                "latency_ms",
+                "jitter_ms",
+                "error_rate",
+                "slow_rate",
+                "slow_ms",
+                "page_kb",
+                "proxies",
+                "failing_proxies",
+            )
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_regression)
+        for message in regressions:
+            print(f">= Regression: {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Mock routes and benchmark drivers for each scraper.
+
+Responses are built from the recorded sample records in ``fixtures/``;
+``{id}`` placeholders are replaced so every listing is distinct. HTML
+pages are padded with listing cards to roughly the size of the real ones.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import re
+from typing import Any, Dict, List
+
+from .mock_server import NOT_FOUND, MockRequest, MockResponse, MockSite
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Approximate size of a real detail page.
+DEFAULT_PAGE_KB = 120
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def render(template: str, id: str) -> Dict[str, Any]:
+    return json.loads(template.replace("{id}", id))
+
+
+def json_response(data: Any, headers: Dict[str, str] = {}) -> MockResponse:
+    return MockResponse(200, json.dumps(data).encode("utf-8"), headers=headers)
+
+
+@functools.lru_cache(maxsize=None)
+def _filler(page_kb: int) -> str:
+    card = (
+        '<div class="card"><a href="/listing/{n}"><img src="/img/{n}.jpg" '
+        'alt="Similar car {n}"/><h3>Similar car {n}</h3><p class="price">AED '
+        "{n}9,900</p><ul><li>2021</li><li>45,000 km</li><li>Automatic</li>"
+        "</ul></a></div>\n"
+    )
+    cards = []
+    size = 0
+    while size < page_kb * 1024:
+        cards.append(card.format(n=len(cards)))
+        size += len(cards[-1])
+    return "".join(cards)
+
+
+def html_page(title: str, head: str, page_kb: int) -> MockResponse:
+    body = (
+        f"<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'/>"
+        f"<title>{title}</title>{head}</head><body><main>"
+        f"<section class='similar'>{_filler(page_kb)}</section></main></body></html>"
+    )
+    return MockResponse(200, body.encode("utf-8"), "text/html; charset=utf-8")
+
+
+def _ids(prefix: str, records: int) -> List[str]:
+    return [f"{prefix}{index:07d}" for index in range(1, records + 1)]
+
+
+def _page_slice(items: List[str], page: int, size: int) -> List[str]:
+    return items[page * size : (page + 1) * size] if page >= 0 else []
+
+
+class KavakSite(MockSite):
+    name = "kavak"
+    hosts = ["www.kavak.com"]
+    page_size = 20
+
+    def __init__(self, records: int, page_kb: int = DEFAULT_PAGE_KB) -> None:
+        self.ids = _ids("", records)
+        self.known = set(self.ids)
+        self.page_kb = page_kb
+        self.listing = load_fixture("kavak_listing.json")
+        self.detail = load_fixture("kavak_detail.json")
+
+    def handle(self, request: MockRequest) -> MockResponse:
+        if request.path.endswith("/advanced-search"):
+            page = int(request.query.get("page", ["0"])[0])
+            ids = _page_slice(self.ids, page, self.page_size)
+            return json_response(
+                {
+                    "cars": [render(self.listing, id) for id in ids],
+                    "total": len(self.ids),
+                }
+            )
+        id = request.path.rstrip("/").rsplit("/", 1)[-1]
+        if request.path.startswith("/ae/buy/") and id in self.known:
+            snippet = json.dumps(render(self.detail, id))
+            head = f"<script id='vip-snippet' type='application/ld+json'>{snippet}</script>"
+            return html_page(f"Kavak {id}", head, self.page_kb)
+        return NOT_FOUND
+
+
+class AutomallSite(MockSite):
+    name = "automall"
+    hosts = ["www.automall.ae"]
+    # Next.js build id served in __NEXT_DATA__; other ids get 404 from the
+    # /_next/data/ route, as after a deploy.
+    build_id = "bench"
+
+    def __init__(self, records: int, page_kb: int = DEFAULT_PAGE_KB) -> None:
+        self.ids = _ids("AM", records)
+        self.known = {id.lower(): id for id in self.ids}
+        self.page_kb = page_kb
+        self.vehicle = load_fixture("automall_vehicle.json")
+
+    def handle(self, request: MockRequest) -> MockResponse:
+        if request.path == "/en/used-cars-shop/":
+            return html_page(
+                "Automall",
+                self._next_data_script({"pageProps": {}, "page": "/used-cars-shop"}),
+                8,
+            )._replace(headers={"Set-Cookie": "AUTH_TOKEN=bench-token; Path=/"})
+        if request.path == "/bff/v2/vehicles":
+            paging = dict(
+                part.split("=", 1)
+                for part in request.headers.get("paging-info", "").split("|")
+                if "=" in part
+            )
+            start = int(paging.get("start-index", 0))
+            count = int(paging.get("no-of-records", 28))
+            return json_response(
+                [{"id": id, "price": 189000} for id in self.ids[start : start + count]]
+            )
+        match = re.fullmatch(
+            rf"/_next/data/{self.build_id}/en/used-cars-shop/details/([^/]+)\.json",
+            request.path,
+        )
+        if match and match.group(1) in self.known:
+            id = self.known[match.group(1)]
+            return json_response(
+                {
+                    "pageProps": {"detailCarInfo": render(self.vehicle, id)},
+                    "__N_SSP": True,
+                }
+            )
+        match = re.fullmatch(r"/en/used-cars-shop/details/([^/]+)/?", request.path)
+        if match and match.group(1) in self.known:
+            id = self.known[match.group(1)]
+            head = self._next_data_script(
+                {
+                    "pageProps": {"detailCarInfo": render(self.vehicle, id)},
+                    "page": "/used-cars-shop/details/[id]",
+                }
+            )
+            return html_page(f"Automall {id}", head, self.page_kb)
+        return NOT_FOUND
+
+    def _next_data_script(self, page: Dict[str, Any]) -> str:
+        next_data = {
+            "props": {"pageProps": page["pageProps"]},
+            "page": page["page"],
+            "buildId": self.build_id,
+        }
+        return (
+            f'<script id="__NEXT_DATA__" type="application/json">'
+            f"{json.dumps(next_data)}</script>"
+        )
+
+
+class Cars24Site(MockSite):
+    name = "cars24"
+    hosts = ["listing-service.c24.tech"]
+
+    def __init__(self, records: int, page_kb: int = DEFAULT_PAGE_KB) -> None:
+        self.ids = _ids("1", records)
+        self.result = load_fixture("cars24_result.json")
+
+    def handle(self, request: MockRequest) -> MockResponse:
+        if request.path != "/v3/vehicle":
+            return NOT_FOUND
+        page = int(request.query.get("page", ["0"])[0])
+        size = int(request.query.get("size", ["25"])[0])
+        ids = _page_slice(self.ids, page, size)
+        return json_response(
+            {"total": len(self.ids), "results": [render(self.result, id) for id in ids]}
+        )
+
+
+class DubizzleSite(MockSite):
+    name = "dubizzle"
+    hosts = ["wd0ptz13zs-1.algolianet.com"]
+    hits_per_page = 25
+
+    def __init__(self, records: int, page_kb: int = DEFAULT_PAGE_KB) -> None:
+        # Algolia pages are 0-based and the scraper starts at page 1.
+        self.ids = _ids("9", records + self.hits_per_page)
+        self.hit = load_fixture("dubizzle_hit.json")
+
+    def handle(self, request: MockRequest) -> MockResponse:
+        if request.method != "POST" or not request.path.endswith("/queries"):
+            return NOT_FOUND
+        params = json.loads(request.body)["requests"][0]["params"]
+        page = int(re.search(r"(?:^|&)page=(\d+)", params).group(1))
+        ids = _page_slice(self.ids, page, self.hits_per_page)
+        return json_response(
+            {
+                "results": [
+                    {
+                        "hits": [render(self.hit, id) for id in ids],
+                        "page": page,
+                        "nbHits": len(self.ids),
+                        "hitsPerPage": self.hits_per_page,
+                    },
+                    {"hits": [], "page": 0, "nbHits": 0},
+                ]
+            }
+        )
+
+
+class NxtCarsSite(MockSite):
+    name = "nxtcarsuae"
+    hosts = ["nxtcarsuae.com", "api.nxt-website.awr-api.com"]
+
+    def __init__(self, records: int, page_kb: int = DEFAULT_PAGE_KB) -> None:
+        self.ids = _ids("4", records)
+        self.known = set(self.ids)
+        self.vehicle = load_fixture("nxtcarsuae_vehicle.json")
+
+    def handle(self, request: MockRequest) -> MockResponse:
+        if request.path == "/api/generateToken":
+            return json_response({"access_token": "bench-token", "expires_in": 3600})
+        if request.path == "/api/getCarIds":
+            return json_response({"code": 200, "response": self.ids})
+        id = request.path.rsplit("/", 1)[-1]
+        if request.path.startswith("/vehicles/") and id in self.known:
+            return json_response({"code": 200, "response": render(self.vehicle, id)})
+        return NOT_FOUND
+
+
+SITES = {
+    site.name: site
+    for site in (KavakSite, AutomallSite, Cars24Site, DubizzleSite, NxtCarsSite)
+}
+
+
+async def run_site(name: str, records: int) -> None:
+    """Run the production entry point of ``name`` against its mock site."""
+    import app
+
+    await app.run_site(name)
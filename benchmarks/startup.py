@@ -0,0 +1,167 @@
+"""
+Start-up time of the entry points.
+
+Runs a fresh interpreter per sample for each import below and reports the
+best and median wall time, the time spent on imports over a bare
+interpreter, and the packages that took longest according to
+``-X importtime``. A scheduled job or pool worker pays this before its
+first request.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --save startup_baseline.json
+    python -m benchmarks.startup --compare startup_baseline.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Differences below this are process start-up noise, not regressions.
+MIN_REGRESSION_MS = 10.0
+
+TARGETS = {
+    "scraper_core": "import scraper_core",
+    "app": "import app",
+    "scheduler": "import scheduler",
+    "worker": "import worker",
+    "kavak": "from kavak_scraper import KavakScraper",
+    "automall": "from automall_scraper import Automall",
+    "cars24": "from cars24_scraper import CarScraper",
+    "dubizzle": "from dubizzle_scraper import DubizzleScraper",
+}
+
+
+def time_import(statement: str) -> float:
+    """Wall time of a fresh interpreter running ``statement``, in ms."""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", statement],
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return (time.perf_counter() - started) * 1000
+
+
+def import_times(statement: str) -> Dict[str, float]:
+    """Self import time of every module ``statement`` loads, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    modules: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(self_us) / 1000
+    return modules
+
+
+def slowest_packages(
+    statement: str, interpreter: Dict[str, float], count: int = 3
+) -> List[Tuple[str, float]]:
+    """
+    The top-level packages that ``statement`` spends longest importing.
+
+    Args:
+        statement (str): The code to run.
+        interpreter (Dict[str, float]): Modules a bare interpreter already
+            loads, which are left out.
+        count (int): How many packages to return.
+    """
+    packages: Dict[str, float] = {}
+    for module, ms in import_times(statement).items():
+        if module not in interpreter:
+            package = module.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + ms
+    return sorted(packages.items(), key=lambda item: -item[1])[:count]
+
+
+def measure(statement: str, repeat: int) -> Dict[str, float]:
+    time_import(statement)  # warm the OS file cache and __pycache__
+    samples = [time_import(statement) for _ in range(repeat)]
+    return {
+        "best_ms": round(min(samples), 1),
+        "median_ms": round(statistics.median(samples), 1),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline_path: str, max_regression: float
+) -> List[str]:
+    """Describe every entry point whose import time regressed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for target, result in results.items():
+        base = baseline.get(target, {}).get("import_ms")
+        if base is None:
+            continue
+        current = result["import_ms"]
+        if current > base * (1 + max_regression) and current - base > MIN_REGRESSION_MS:
+            regressions.append(f"{target}: imports take {current} ms vs {base} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark entry point start-up")
+    parser.add_argument(
+        "--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS)
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="Samples per target")
+    parser.add_argument("--save", metavar="PATH", help="Write the results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="Fail on regressions against saved results"
+    )
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    interpreter = import_times("pass")
+    bare = measure("pass", args.repeat)["best_ms"]
+    results = {}
+    print(
+        f"{'target':<14}{'best ms':>9}{'median ms':>11}{'imports ms':>12}"
+        "  slowest packages (ms)"
+    )
+    for target in args.targets:
+        statement = TARGETS[target]
+        results[target] = measure(statement, args.repeat)
+        results[target]["import_ms"] = round(
+            max(results[target]["best_ms"] - bare, 0.0), 1
+        )
+        slowest = ", ".join(
+            f"{name} {ms:.0f}" for name, ms in slowest_packages(statement, interpreter)
+        )
+        print(
+            f"{target:<14}{results[target]['best_ms']:>9.1f}"
+            f"{results[target]['median_ms']:>11.1f}"
+            f"{results[target]['import_ms']:>12.1f}  {slowest}"
+        )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_regression)
+        for message in regressions:
+            print(f">= Regression: {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
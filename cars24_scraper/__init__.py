@@ -2,6 +2,22 @@
 Cars24 Scraper
 """
 
-from .cars24_scraper import CarScraper
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .cars24_scraper import CarScraper
 
 __all__ = ["CarScraper"]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "CarScraper":
+        from .cars24_scraper import CarScraper
+
+        globals()[name] = CarScraper
+        return CarScraper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
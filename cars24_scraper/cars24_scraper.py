@@ -1,22 +1,22 @@
-import pandas as pd
-from rich import print
-import sys, os
+import itertools
 from datetime import datetime, timedelta, timezone
-from curl_cffi import AsyncSession
+from scraper_core import dedupe, engine, logs, stats
+from scraper_core.base import BaseScraper
 import asyncio
-from typing import Optional, Type, Any, Dict
-from types import TracebackType
-from selectolax.parser import HTMLParser
+from typing import AsyncIterator
 
+log = logs.get_logger("cars24")
 
-class CarScraper:
-    def __init__(self) -> None:
-        print(f"--------- Cars24 Scraper Started ---------\n")
 
-        self.session = AsyncSession(timeout=120, impersonate="chrome")
+class CarScraper(BaseScraper):
+    name = "cars24"
+    # The listing service returns every field; there are no detail pages.
+    detail_pages = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.max_pages = self.settings.max_pages
 
-        today_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        self.csv_file = f"cars24_{today_date}.csv"
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:138.0) Gecko/20100101 Firefox/138.0",
             "Accept": "application/json, text/plain, */*",
@@ -29,94 +29,16 @@ class CarScraper:
             "Referer": "https://www.cars24.ae/",
         }
 
-    async def __aenter__(self):
-        """Enter the context manager."""
-        return self
-
-    async def __aexit__(
-        self,
-        exc_type: Optional[Type[BaseException]],
-        exc: Optional[BaseException],
-        tb: Optional[TracebackType],
-    ) -> None:
-        """
-        Exit the context manager.
-        """
-        await self.session.close()
-
-    async def _make_request(
-        self,
-        method: str,
-        url: str,
-        params: Optional[Dict[str, Any]] = None,
-        data: Optional[Dict[str, Any]] = None,
-        json_payload: Optional[Dict[str, Any]] = None,
-        allow_redirects: bool = True,
-        headers: Optional[Dict[str, Any]] = None,
-        cookies: Optional[Dict[str, Any]] = None,
-        timeout: int = 120,
-        verify: bool = True,
-    ) -> Dict[str, Any]:
-        try:
-            method_lower = method.lower()
-            if method_lower not in [
-                "get",
-                "post",
-                "put",
-                "delete",
-                "patch",
-                "head",
-                "options",
-            ]:
-                return {"status": False, "message": f"Invalid HTTP method: {method}."}
-
-            response = await getattr(self.session, method_lower)(
-                url,
-                params=params,
-                data=data,
-                json=json_payload,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-                verify=verify,
-                allow_redirects=allow_redirects,
-            )
-
-            content_type = response.headers.get("Content-Type", "")
-            if "application/json" in content_type:
-                return {
-                    "status": True,
-                    "message": "Request successful, JSON response.",
-                    "json": response.json(),
-                    "response_obj": response,
-                }
-            elif "text/html" in content_type:
-                return {
-                    "status": True,
-                    "message": "Request successful, HTML response.",
-                    "parser": HTMLParser(response.text),
-                    "response_obj": response,
-                }
-            else:
-                return {
-                    "status": True,
-                    "message": "Request successful, text response.",
-                    "text": response.text,
-                    "response_obj": response,
-                }
-        except Exception as e:
-            return {"status": False, "message": f"Request failed: {e}"}
-
     async def fetch_page_data(self, page_number):
         params = {
             "isSeoFilter": "true",
             "sf": ["city:DU_DUBAI", "gaId:"],
-            "size": "25",
+            "size": str(self.settings.page_size),
             "spath": "buy-used-cars-dubai",
             "page": str(page_number),
             "variant": "filterV5",
         }
-        print(f">= Cars24: Fetching page {page_number}...\n")
+        log.debug("Fetching page %d...", page_number)
 
         try:
             # response = curl_cffi.get(
@@ -125,23 +47,29 @@ class CarScraper:
             #     params=params,
             #     impersonate="chrome",
             # )
-            response_data: dict = await self._make_request(
+            response = await self.request(
                 "get",
                 "https://listing-service.c24.tech/v3/vehicle",
                 headers=self.headers,
                 params=params,
             )
-            if not response_data["status"]:
-                return response_data
-
-            response_json: dict = response_data.get("json")
+            response_json: dict = response.json()
+            stats.for_site(self.name).record_page()
+            if page_number == 0 and response_json.get("total"):
+                size = int(params["size"])
+                total = response_json["total"]
+                if self.max_pages:
+                    total = min(total, self.max_pages * size)
+                stats.for_site(self.name).set_expected(total)
+                stats.for_site(self.name).set_expected_pages(-(-total // size))
             return response_json.get("results", [])
 
         except Exception as e:
-            print(f"Cars24: Error fetching page {page_number}: {e}")
+            log.warning("Error fetching page %d: %s", page_number, e)
             return []
 
-    async def process_car_data(self, result: dict):
+    def build_car_data(self, result: dict) -> dict:
+        """Build one CSV row from a listing-service result."""
         # Step 1: Extract all raw data fields from result and its nested structures
         emiDetails = result.get("emiDetails", {})
         parentHubLocation = result.get("parentHubLocation", {})
@@ -226,38 +154,44 @@ class CarScraper:
             "odometerReading": odometer_reading,
             "transmissionType": transmission_type,
         }
+        return car_data
 
-        df = pd.DataFrame([car_data])
-        df.to_csv(
-            self.csv_file,
-            mode="a",
-            index=False,
-            header=not os.path.exists(self.csv_file),
-        )
-
-        print(f">= Cars24: {car_data.get('title', 'Unknown Car')}")
-
-    async def run_scraper(self, max_pages=50):
-        total_cars_processed = 0
-        for page_num in range(max_pages):
+    async def discover(self) -> AsyncIterator[dict]:
+        """Yield every listing-service result until a page comes back empty."""
+        total_cars_found = 0
+        pages = range(self.max_pages) if self.max_pages else itertools.count()
+        for page_num in pages:
             results = await self.fetch_page_data(page_num)
 
             if not results:
-                print(f">= Cars24: No more results found at page {page_num}")
+                log.info("No more results found at page %d", page_num)
                 break
 
-            print(f">= Cars24: Found {len(results)} results on page {page_num}")
+            log.debug("Found %d results on page %d", len(results), page_num)
             for car_result in results:
-                await self.process_car_data(car_result)
-                total_cars_processed += 1
+                yield car_result
+            total_cars_found += len(results)
+
+        log.info("Total cars found - %d", total_cars_found)
 
-        print(f"\n>= Cars24: Total cars processed and saved - {total_cars_processed}")
+    def extract(self, result: dict) -> dict:
+        return self.build_car_data(result)
+
+    def item_id(self, result: dict) -> str:
+        appointment_id = result.get("appointmentId")
+        if appointment_id is None:
+            return dedupe.content_id(result)
+        return str(appointment_id)
 
 
 async def main():
     async with CarScraper() as scraper:
-        await scraper.run_scraper(max_pages=50)
+        await engine.run(scraper)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logs.setup()
+    try:
+        asyncio.run(main())
+    finally:
+        logs.shutdown()
@@ -2,6 +2,22 @@
 Dubizzle Scraper
 """
 
-from .dubizzle_scraper import DubizzleScraper
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .dubizzle_scraper import DubizzleScraper
 
 __all__ = ["DubizzleScraper"]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "DubizzleScraper":
+        from .dubizzle_scraper import DubizzleScraper
+
+        globals()[name] = DubizzleScraper
+        return DubizzleScraper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
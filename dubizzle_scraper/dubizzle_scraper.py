@@ -1,22 +1,20 @@
 import json
-import os
-from curl_cffi import AsyncSession
-import pandas as pd
-from selectolax.parser import HTMLParser
-from typing import Optional, Type, Dict, Any, List
-from types import TracebackType
+from scraper_core import dedupe, engine, logs, stats
+from scraper_core.base import BaseScraper
+from typing import AsyncIterator
 import asyncio
 from datetime import datetime, timezone
-from rich import print
 
+log = logs.get_logger("dubizzle")
 
-class DubizzleScraper:
-    def __init__(self):
-        print(f"--------- Dubizzle Scraper Started ---------\n")
 
-        self.today_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        self.csv_file = f"dubizzle_{self.today_date}.csv"
+class DubizzleScraper(BaseScraper):
+    name = "dubizzle"
+    # Algolia hits carry every field; there are no detail pages.
+    detail_pages = False
 
+    def __init__(self):
+        super().__init__()
         self.headers = {
             "Accept": "*/*",
             "Accept-Language": "en-US,en;q=0.9",
@@ -35,14 +33,6 @@ class DubizzleScraper:
             "sec-ch-ua-platform": '"Windows"',
         }
 
-    async def __aenter__(self):
-        self.session = AsyncSession(impersonate="chrome", timeout=120)
-        return self
-
-    async def __aexit__(self, exc_type, exc_value, traceback):
-        if self.session:
-            await self.session.close()
-
     def __attributes_to_retrieve(self) -> list[str]:
         """
         Attributes to retrieve from the API
@@ -106,8 +96,10 @@ class DubizzleScraper:
         ]
         return attributes_to_retrieve
 
-    async def _extract_data(self, hit: dict) -> list[dict]:
-
+    def build_car_data(self, hit: dict) -> dict:
+        """
+        Build one CSV row from an Algolia hit
+        """
         details = hit.get("details", {})
 
         # --- Extract all data into variables ---
@@ -209,7 +201,7 @@ class DubizzleScraper:
         car_data = {
             "posting_date": posting_date,
             "added_date": added_date,
-            "scrape_date": self.today_date,
+            "scrape_date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
             # "full_name": full_name,
             "name": f"{car_make} {car_model} {trim}",
             "description": description,
@@ -272,21 +264,15 @@ class DubizzleScraper:
             "has_variants": has_variants,
         }
         # print(car_data)
+        return car_data
 
-        df = pd.DataFrame([car_data])
-        df.to_csv(
-            self.csv_file,
-            mode="a",
-            index=False,
-            header=not os.path.exists(self.csv_file),
-        )
-
-    async def fetch_data(self):
+    async def discover(self) -> AsyncIterator[dict]:
         """
-        Fetch data from dubizzle
+        Yield every Algolia hit of the used-cars category
         """
         page = 1
-        while True:
+        max_pages = self.settings.max_pages
+        while not max_pages or page <= max_pages:
 
             url = "https://wd0ptz13zs-1.algolianet.com/1/indexes/*/queries"
 
@@ -301,7 +287,7 @@ class DubizzleScraper:
                     {
                         "indexName": "motors_textualized.com",
                         "query": "",
-                        "params": f'page={page}&attributesToHighlight=[]&hitsPerPage=25&attributesToRetrieve={json.dumps(self.__attributes_to_retrieve())}&filters=("category_v2.slug_paths":"motors/used-cars")&ruleContexts=["all_user"]',
+                        "params": f'page={page}&attributesToHighlight=[]&hitsPerPage={self.settings.page_size}&attributesToRetrieve={json.dumps(self.__attributes_to_retrieve())}&filters=("category_v2.slug_paths":"motors/used-cars")&ruleContexts=["all_user"]',
                     },
                     {
                         "indexName": "motors_textualized.com",
@@ -311,30 +297,51 @@ class DubizzleScraper:
                 ]
             }
 
-            response = await self.session.post(
-                url, params=params, headers=self.headers, json=data
+            response = await self.request(
+                "post",
+                url,
+                params=params,
+                headers=self.headers,
+                json=data,
             )
-            response.raise_for_status()
 
+            stats.for_site(self.name).record_page()
             json_response: dict = response.json()
             results: list[dict] = json_response.get("results")
             hits: list[dict] = results[0].get("hits")
+            if results[0].get("nbHits"):
+                stats.for_site(self.name).set_expected(results[0]["nbHits"])
+            if results[0].get("nbPages"):
+                stats.for_site(self.name).set_expected_pages(results[0]["nbPages"])
             if len(hits) == 0:
-                print(f">= Dubizzle: No hits found in page {page}")
+                log.info("No hits found in page %d", page)
                 break
 
-            print(f">= Dubizzle: Found {len(hits)} hits in page {page}")
+            log.debug("Found %d hits in page %d", len(hits), page)
 
             for hit in hits:
-                await self._extract_data(hit)
+                yield hit
 
             page += 1
 
+    def extract(self, hit: dict) -> dict:
+        return self.build_car_data(hit)
+
+    def item_id(self, hit: dict) -> str:
+        hit_id = hit.get("objectID") or hit.get("id")
+        if hit_id is None:
+            return dedupe.content_id(hit)
+        return str(hit_id)
+
 
 async def main():
     async with DubizzleScraper() as scraper:
-        await scraper.fetch_data()
+        await engine.run(scraper)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logs.setup()
+    try:
+        asyncio.run(main())
+    finally:
+        logs.shutdown()
@@ -2,6 +2,22 @@
 Kavak Scraper
 """
 
-from .kavak_scraper import KavakScraper
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .kavak_scraper import KavakScraper
 
 __all__ = ["KavakScraper"]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "KavakScraper":
+        from .kavak_scraper import KavakScraper
+
+        globals()[name] = KavakScraper
+        return KavakScraper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
@@ -1,28 +1,42 @@
+import argparse
+import contextlib
 import json
+import multiprocessing as mp
 import os
-from curl_cffi import AsyncSession
-import pandas as pd
+import shutil
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from scraper_core import (
+    checkpoint,
+    deadline,
+    engine,
+    logs,
+    priority,
+    shutdown,
+    stats,
+    tracing,
+)
+from scraper_core.base import BaseScraper, ScrapeError
 from selectolax.parser import HTMLParser
-from typing import Optional, Type, Dict, Any, List
-from types import TracebackType
+from typing import AsyncIterator, Iterator, Optional, Dict, Any, List, Tuple
 import asyncio
 from datetime import datetime, timezone
 
+log = logs.get_logger("kavak")
 
-class KavakScraper:
-    def __init__(
-        self, concurrency_api: int = 25, concurrency_details: int = 25
-    ) -> None:
-        print(f"--------- Kavak Scraper Started ---------\n")
-
-        self.session = AsyncSession(timeout=120, impersonate="chrome")
 
-        self.concurrency_api = concurrency_api
-        self.concurrency_details = concurrency_details
+class KavakScraper(BaseScraper):
+    name = "kavak"
+    # Pause between detail batches, on top of the configured rate limit.
+    batch_pause = 2.0
 
-        today_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        self.csv_file = f"kavak_{today_date}.csv"
-        self.json_file = f"kavak_{today_date}.json"
+    def __init__(
+        self,
+        concurrency_api: Optional[int] = None,
+        concurrency_details: Optional[int] = None,
+    ) -> None:
+        super().__init__(concurrency_details)
+        self.concurrency_api = concurrency_api or self.settings.listing_concurrency
 
         self.api_headers = {
             "kavak-country-acronym": "ae",
@@ -32,80 +46,6 @@ class KavakScraper:
             "https://www.kavak.com/api/advanced-search-api/v2/advanced-search"
         )
 
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(
-        self,
-        exc_type: Optional[Type[BaseException]],
-        exc: Optional[BaseException],
-        tb: Optional[TracebackType],
-    ) -> None:
-        await self.session.close()
-
-    async def _make_request(
-        self,
-        method: str,
-        url: str,
-        params: Optional[Dict[str, Any]] = None,
-        data: Optional[Dict[str, Any]] = None,
-        json_payload: Optional[Dict[str, Any]] = None,
-        allow_redirects: bool = True,
-        headers: Optional[Dict[str, Any]] = None,
-        cookies: Optional[Dict[str, Any]] = None,
-        timeout: int = 120,
-        verify: bool = True,
-    ) -> Dict[str, Any]:
-        try:
-            method_lower = method.lower()
-            if method_lower not in [
-                "get",
-                "post",
-                "put",
-                "delete",
-                "patch",
-                "head",
-                "options",
-            ]:
-                return {"status": False, "message": f"Invalid HTTP method: {method}."}
-
-            response = await getattr(self.session, method_lower)(
-                url,
-                params=params,
-                data=data,
-                json=json_payload,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-                verify=verify,
-                allow_redirects=allow_redirects,
-            )
-
-            content_type = response.headers.get("Content-Type", "")
-            if "application/json" in content_type:
-                return {
-                    "status": True,
-                    "message": "Request successful, JSON response.",
-                    "json": response.json(),
-                    "response_obj": response,
-                }
-            elif "text/html" in content_type:
-                return {
-                    "status": True,
-                    "message": "Request successful, HTML response.",
-                    "parser": HTMLParser(response.text),
-                    "response_obj": response,
-                }
-            else:
-                return {
-                    "status": True,
-                    "message": "Request successful, text response.",
-                    "text": response.text,
-                    "response_obj": response,
-                }
-        except Exception as e:
-            return {"status": False, "message": f"Request failed: {e}"}
-
     def _clean_price(self, price_str: Optional[str]) -> Optional[int]:
         if not price_str:
             return None
@@ -118,19 +58,19 @@ class KavakScraper:
 
     async def fetch_cars_from_api_page(self, page_to_fetch: int) -> Dict[str, Any]:
         params = {"page": page_to_fetch}
-        response_data = await self._make_request(
-            "get", self.kavak_api_endpoint, params=params, headers=self.api_headers
-        )
-
-        if not response_data["status"]:
+        try:
+            response = await self.request(
+                "get", self.kavak_api_endpoint, params=params, headers=self.api_headers
+            )
+            json_content = response.json()
+        except Exception as e:
             return {
                 "status": False,
-                "message": f"API request failed for page {page_to_fetch}: {response_data.get('message', 'Unknown error')}",
+                "message": f"API request failed for page {page_to_fetch}: {e}",
                 "cars": [],
                 "page_fetched": page_to_fetch,
             }
 
-        json_content = response_data.get("json")
         if not json_content:
             return {
                 "status": False,
@@ -139,10 +79,20 @@ class KavakScraper:
                 "page_fetched": page_to_fetch,
             }
 
+        site_stats = stats.for_site(self.name)
+        site_stats.record_page()
         cars_on_page: List[Dict[str, Any]] = json_content.get("cars", [])
+        if page_to_fetch == 0 and cars_on_page and json_content.get("total"):
+            total = json_content["total"]
+            if self.settings.max_pages:
+                total = min(total, self.settings.max_pages * len(cars_on_page))
+            site_stats.set_expected(total)
+            site_stats.set_expected_pages(-(-total // len(cars_on_page)))
         if cars_on_page:
-            print(
-                f">= Kavak: Fetched {len(cars_on_page)} car listings from API page {page_to_fetch}."
+            log.debug(
+                "Fetched %d car listings from API page %d.",
+                len(cars_on_page),
+                page_to_fetch,
             )
 
         return {
@@ -152,280 +102,442 @@ class KavakScraper:
             "message": f"Successfully fetched page {page_to_fetch}.",
         }
 
-    async def fetch_all_car_listings_from_api(self) -> Dict[str, Any]:
-        all_car_listings: List[Dict[str, Any]] = []
+    async def discover(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every listing of the search API, fetching pages in batches."""
+        listings_found = 0
         current_page_offset = 0
 
-        while True:
+        max_pages = self.settings.max_pages
+        while not max_pages or current_page_offset < max_pages:
+            batch_size = self.concurrency_api
+            if max_pages:
+                batch_size = min(batch_size, max_pages - current_page_offset)
             tasks = [
                 self.fetch_cars_from_api_page(current_page_offset + i)
-                for i in range(self.concurrency_api)
+                for i in range(batch_size)
             ]
             page_results_batch = await asyncio.gather(*tasks, return_exceptions=True)
 
             cars_found_in_this_batch = 0
             for result_or_exc in page_results_batch:
                 if isinstance(result_or_exc, Exception):
-                    print(
-                        f">= Kavak: Exception during API page fetch task: {result_or_exc}"
+                    log.warning(
+                        "Exception during API page fetch task: %s", result_or_exc
                     )
                     continue
 
                 if result_or_exc.get("status") and result_or_exc.get("cars"):
-                    all_car_listings.extend(result_or_exc["cars"])
+                    for car in result_or_exc["cars"]:
+                        yield car
                     cars_found_in_this_batch += len(result_or_exc["cars"])
                 elif not result_or_exc.get("status"):
                     page_num = result_or_exc.get("page_fetched")
                     error_msg = result_or_exc.get(
                         "message", "No specific error message"
                     )
-                    print(
-                        f">= Kavak: Failed to process API page {page_num}: {error_msg}"
+                    log.warning(
+                        "Failed to process API page %s: %s", page_num, error_msg
                     )
 
+            listings_found += cars_found_in_this_batch
             if cars_found_in_this_batch == 0 and current_page_offset > 0:
-                print(
-                    f">= Kavak: No new cars found in the last batch (pages {current_page_offset} to {current_page_offset + self.concurrency_api -1}). Stopping API fetch."
+                log.info(
+                    "No new cars found in the last batch (pages %d to %d). Stopping API fetch.",
+                    current_page_offset,
+                    current_page_offset + batch_size - 1,
                 )
                 break
             if current_page_offset == 0 and cars_found_in_this_batch == 0:
-                print(
-                    f">= Kavak: No cars found on initial API pages. Stopping API fetch."
-                )
-                break
+                raise ScrapeError("No car listings found from API.", "no_listings")
 
-            current_page_offset += self.concurrency_api
-            print(
-                f">= Kavak: Processed batch. Total listings so far: {len(all_car_listings)}. Moving to next set of pages from {current_page_offset}.\n"
+            current_page_offset += batch_size
+            log.info(
+                "Processed batch. Total listings so far: %d. Moving to next set of pages from %d.",
+                listings_found,
+                current_page_offset,
             )
             await asyncio.sleep(1)
 
-        if not all_car_listings:
-            return {
-                "status": False,
-                "message": "No car listings found from API.",
-                "data": [],
-            }
-
-        print(
-            f">= Kavak: Successfully fetched {len(all_car_listings)} car listings in total from API."
+        log.info(
+            "Successfully fetched %d car listings in total from API.", listings_found
         )
-        return {
-            "status": True,
-            "data": all_car_listings,
-            "message": "API fetch successful.",
-        }
-
-    async def fetch_and_parse_product_details(
-        self, car_api_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
 
+    async def fetch(self, car_api_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Download the product page of one listing."""
         url = car_api_data.get("url")
         if not url:
-            return {
-                "status": False,
-                "message": "Missing URL in car API data.",
-                "original_api_data": car_api_data,
-                "details": {},
-            }
-
-        default_return = {
-            "status": False,
-            "message": "Unknown error during product detail fetching.",
-            "original_api_data": car_api_data,
-            "details": {},
-        }
-
-        try:
-            response_data = await self._make_request("get", url)
-            if not response_data["status"]:
-                default_return["message"] = (
-                    f"Request failed for product URL {url}: {response_data.get('message')}"
-                )
-                return default_return
-
-            parser = response_data.get("parser")
-            if not parser:
-                default_return["message"] = f"No HTML parser object for URL {url}."
-                return default_return
+            raise ScrapeError("Missing URL in car API data.", "missing_url")
 
-            script_node = parser.css_first("script[id='vip-snippet']")
-            if not script_node:
-                default_return["message"] = (
-                    f"Script 'vip-snippet' not found on page {url}."
-                )
-                return default_return
-
-            script_text = script_node.text(strip=True)
-            if not script_text:
-                default_return["message"] = (
-                    f"Script 'vip-snippet' is empty on page {url}."
-                )
-                return default_return
+        response = await self.request("get", url)
+        if "text/html" not in response.headers.get("Content-Type", ""):
+            raise ScrapeError(f"No HTML page at {url}.", "not_html")
+        return car_api_data, response.text
 
-            json_data = json.loads(script_text)
-            graph_list = json_data.get("@graph", [])
-
-            if (
-                not graph_list
-                or not isinstance(graph_list, list)
-                or len(graph_list) == 0
-            ):
-                default_return["message"] = (
-                    f"No @graph data or invalid format in script on page {url}."
-                )
-                return default_return
-
-            graph = graph_list[0]
-
-            offers = graph.get("offers", {})
-            mileage_from_odometer = graph.get("mileageFromOdometer", {})
-            vehicle_engine = graph.get("vehicleEngine", {})
-
-            # Adhering to original script's specific key access patterns where possible
-            doors_info = graph.get("body_style.local_number_of_doors")
-            seats_info = graph.get("seats.capacity")
+    def extract(self, payload: Tuple[Dict[str, Any], str]) -> Dict[str, Any]:
+        """Combine a listing with the vehicle snippet of its product page."""
+        car_api_data, html = payload
+        url = car_api_data.get("url")
 
-            displacement_obj = vehicle_engine.get("engine.liters", {})
-            displacement_value = (
-                displacement_obj.get("value")
-                if isinstance(displacement_obj, dict)
-                else None
+        script_node = HTMLParser(html).css_first("script[id='vip-snippet']")
+        if not script_node:
+            raise ScrapeError(
+                f"Script 'vip-snippet' not found on page {url}.", "missing_snippet"
             )
 
-            performance_obj = vehicle_engine.get("performance.max_power_hp", {})
-            performance_value = (
-                performance_obj.get("value")
-                if isinstance(performance_obj, dict)
-                else None
+        script_text = script_node.text(strip=True)
+        if not script_text:
+            raise ScrapeError(
+                f"Script 'vip-snippet' is empty on page {url}.", "empty_snippet"
             )
 
-            details = {
-                "title": graph.get("name"),
-                "url": car_api_data.get("url"),
-                "name": car_api_data.get("name"),
-                "scrapedAt": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
-                "id": car_api_data.get("id"),
-                "make": car_api_data.get("make"),
-                "model": car_api_data.get("model"),
-                "trim": car_api_data.get("trim"),
-                "year": car_api_data.get("year"),
-                "badge": car_api_data.get("badge", {}).get("text"),
-                "transmission": car_api_data.get("transmission"),
-                "price": self._clean_price(car_api_data.get("price")),
-                "kmNoFormat": car_api_data.get("kmNoFormat"),
-                "offerPrice": offers.get("price"),
-                "offerPriceCurrency": offers.get("priceCurrency"),
-                "mileageUnitCode": mileage_from_odometer.get("unitCode"),
-                "mileageValue": mileage_from_odometer.get("value"),
-                "vehicleModelDate": graph.get("vehicleModelDate"),
-                "bodyType": graph.get("bodyType"),
-                "vehicleIdentificationNumber": graph.get("vehicleIdentificationNumber"),
-                "numberOfAxles": graph.get("numberOfAxles"),
-                "doors": doors_info,
-                "passengerCapacity": seats_info,
-                # "engineDetailName": vehicle_engine.get("name"),
-                # "engineFuelType": vehicle_engine.get("fuelType"),
-                # "engineDisplacementValue": displacement_value,
-                "MaxPowerValue": performance_value,
-            }
-
-            return {
-                "status": True,
-                "message": "Successfully extracted product details.",
-                "details": details,
-            }
-
+        try:
+            json_data = json.loads(script_text)
         except json.JSONDecodeError as e_json:
-            default_return["message"] = f"JSON decode error for {url}: {e_json}"
-            return default_return
-        except Exception as e:
-            default_return["message"] = (
-                f"Unexpected error processing product page {url}: {e}"
+            raise ScrapeError(
+                f"JSON decode error for {url}: {e_json}", "invalid_json"
+            ) from e_json
+        graph_list = json_data.get("@graph", [])
+
+        if not graph_list or not isinstance(graph_list, list) or len(graph_list) == 0:
+            raise ScrapeError(
+                f"No @graph data or invalid format in script on page {url}.",
+                "missing_graph",
             )
-            return default_return
 
-    async def run_scraper(self) -> None:
-        api_listings_response = await self.fetch_all_car_listings_from_api()
+        graph = graph_list[0]
 
-        if not api_listings_response["status"]:
-            print(
-                f">= Kavak: Halting: Failed to fetch car listings from API: {api_listings_response['message']}"
-            )
-            return api_listings_response
+        offers = graph.get("offers", {})
+        mileage_from_odometer = graph.get("mileageFromOdometer", {})
+        vehicle_engine = graph.get("vehicleEngine", {})
 
-        api_cars = api_listings_response.get("data", [])
-        if not api_cars:
-            print(">= Kavak: Halting: No car listings found from API.")
-            return
+        # Adhering to original script's specific key access patterns where possible
+        doors_info = graph.get("body_style.local_number_of_doors")
+        seats_info = graph.get("seats.capacity")
 
-        print(
-            f"\n>= Kavak: Fetched {len(api_cars)} car listings. Now fetching product details concurrently...\n"
+        displacement_obj = vehicle_engine.get("engine.liters", {})
+        displacement_value = (
+            displacement_obj.get("value")
+            if isinstance(displacement_obj, dict)
+            else None
         )
 
-        product_detail_tasks = [
-            self.fetch_and_parse_product_details(car_data) for car_data in api_cars
-        ]
-
-        all_combined_car_data: List[Dict[str, Any]] = []
+        performance_obj = vehicle_engine.get("performance.max_power_hp", {})
+        performance_value = (
+            performance_obj.get("value") if isinstance(performance_obj, dict) else None
+        )
 
-        for i in range(0, len(product_detail_tasks), self.concurrency_details):
-            batch_tasks = product_detail_tasks[i : i + self.concurrency_details]
-            results_batch = await asyncio.gather(*batch_tasks, return_exceptions=True)
+        details = {
+            "title": graph.get("name"),
+            "url": car_api_data.get("url"),
+            "name": car_api_data.get("name"),
+            "scrapedAt": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "id": car_api_data.get("id"),
+            "make": car_api_data.get("make"),
+            "model": car_api_data.get("model"),
+            "trim": car_api_data.get("trim"),
+            "year": car_api_data.get("year"),
+            "badge": car_api_data.get("badge", {}).get("text"),
+            "transmission": car_api_data.get("transmission"),
+            "price": self._clean_price(car_api_data.get("price")),
+            "kmNoFormat": car_api_data.get("kmNoFormat"),
+            "offerPrice": offers.get("price"),
+            "offerPriceCurrency": offers.get("priceCurrency"),
+            "mileageUnitCode": mileage_from_odometer.get("unitCode"),
+            "mileageValue": mileage_from_odometer.get("value"),
+            "vehicleModelDate": graph.get("vehicleModelDate"),
+            "bodyType": graph.get("bodyType"),
+            "vehicleIdentificationNumber": graph.get("vehicleIdentificationNumber"),
+            "numberOfAxles": graph.get("numberOfAxles"),
+            "doors": doors_info,
+            "passengerCapacity": seats_info,
+            # "engineDetailName": vehicle_engine.get("name"),
+            # "engineFuelType": vehicle_engine.get("fuelType"),
+            # "engineDisplacementValue": displacement_value,
+            "MaxPowerValue": performance_value,
+        }
 
-            print(
-                f"\n--- Kavak: Processing Batch {i // self.concurrency_details + 1} of Product Details ---"
-            )
-            for result_or_exc in results_batch:
-                if isinstance(result_or_exc, Exception):
-                    print(f"Error during product detail fetch task: {result_or_exc}")
-                    continue
+        return details
 
-                if result_or_exc["status"]:
-                    product_details = result_or_exc["details"]
+    def item_id(self, car_api_data: Dict[str, Any]) -> str:
+        return str(car_api_data.get("id") or car_api_data.get("url"))
 
-                    # print(product_details)
+    def listing_signature(self, car_api_data: Dict[str, Any]) -> Optional[str]:
+        price = car_api_data.get("price")
+        return None if price is None else str(price)
 
-                    df = pd.DataFrame([product_details])
-                    df.to_csv(
-                        self.csv_file,
-                        mode="a",
-                        index=False,
-                        header=not os.path.exists(self.csv_file),
-                    )
+    async def fetch_product_details_sharded(
+        self,
+        listing_files: List[str],
+        counts: List[int],
+        budget: float = 0,
+        partial: bool = False,
+    ) -> int:
+        """
+        Split the detail phase across one child process per listing file.
+
+        Each child streams its listings through its own detail pipeline into
+        a part file, and the parts are merged into the daily CSV once every
+        child has finished.
+
+        Args:
+            listing_files (List[str]): One JSON-lines file of listings per
+                shard, removed once its shard is done.
+            counts (List[int]): The number of listings in each file.
+            budget (float): Seconds the shards may take, 0 for no limit.
+            partial (bool): Whether the listing was cut short.
+        """
+        shards = len(listing_files)
+        part_files = [f"{self.output_file}.part{index}" for index in range(shards)]
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
+        log.info(
+            "Sharding %d listings across %d processes: %s",
+            sum(counts),
+            shards,
+            counts,
+        )
 
-                    all_combined_car_data.append(product_details)
-                    print(
-                        f">= Kavak: Successfully processed {product_details.get('name')}"
+        site_stats = stats.for_site(self.name)
+        site_stats.set_phase("details")
+        site_stats.set_expected(sum(counts))
+        loop = asyncio.get_running_loop()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=shards,
+                mp_context=mp.get_context("spawn"),
+                initializer=shutdown.attach,
+                initargs=(shutdown.share(),),
+            ) as pool:
+                shard_results = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            pool,
+                            _run_shard,
+                            listing_file,
+                            part_file,
+                            self.concurrency,
+                            budget,
+                            partial,
+                        )
+                        for listing_file, part_file, count in zip(
+                            listing_files, part_files, counts
+                        )
+                        if count
                     )
+                )
+        finally:
+            for listing_file in listing_files:
+                if os.path.exists(listing_file):
+                    os.remove(listing_file)
+
+        for _, shard_stats in shard_results:
+            site_stats.merge(shard_stats)
+
+        site_stats.set_phase("writing")
+        merged = self._merge_part_files(part_files)
+        log.info(
+            "Merged %d rows from %d shards into %s", merged, shards, self.output_file
+        )
+        self._merge_checkpoints(part_files)
+        return sum(saved for saved, _ in shard_results)
+
+    def _merge_checkpoints(self, part_files: List[str]) -> None:
+        """Fold the checkpoints of stopped shards into the daily checkpoint."""
+        stopped = [
+            checkpoint.path_for(part_file)
+            for part_file in part_files
+            if os.path.exists(checkpoint.path_for(part_file))
+        ]
+        if not stopped:
+            checkpoint.clear(self.checkpoint_file)
+            return
 
+        done = checkpoint.load(self.checkpoint_file)
+        for path in stopped:
+            done |= checkpoint.load(path)
+            checkpoint.clear(path)
+        checkpoint.save(self.checkpoint_file, done)
+        stats.for_site(self.name).set_phase(
+            "stopped" if shutdown.requested() else "partial"
+        )
+        log.info("Checkpointed %d saved items to %s.", len(done), self.checkpoint_file)
+
+    def _merge_part_files(self, part_files: List[str]) -> int:
+        """Append every part file to the daily file, keeping a single CSV header."""
+        merged = 0
+        has_header = self.settings.output_format == "csv"
+        write_header = not os.path.exists(self.output_file)
+        with open(self.output_file, "a", newline="", encoding="utf-8") as out:
+            for part_file in part_files:
+                if not os.path.exists(part_file):
+                    continue
+                with open(part_file, newline="", encoding="utf-8") as part:
+                    header = part.readline() if has_header else ""
+                    if write_header and header:
+                        out.write(header)
+                        write_header = False
+                    for line in part:
+                        out.write(line)
+                        merged += 1
+                os.remove(part_file)
+        return merged
+
+    async def run_sharded(self, shards: int) -> None:
+        """
+        Fetch every listing, then split the detail phase across processes.
+
+        Listings are partitioned by a stable hash of their id and spooled to
+        one JSON-lines file per shard as they arrive, so the inventory is
+        never held in memory. Listings checkpointed by an earlier, stopped
+        run of the day are left out. With a ``run_budget``, listing ends
+        after its share and the shards get what is left.
+
+        Cars whose price is unchanged since the last run are spooled apart
+        and appended to the shard files after the rest, so that each shard
+        fetches new and repriced cars first.
+        """
+        shutdown.install()
+        stats.for_site(self.name).set_phase("listing")
+        done = checkpoint.load(self.checkpoint_file)
+        budget = self.settings.run_budget
+        run_deadline = listing_deadline = None
+        if budget:
+            run_deadline = deadline.Deadline(budget)
+            listing_deadline = deadline.Deadline(budget * self.settings.listing_share)
+            deadline.set_current(listing_deadline)
+        listing_cut = listed_all = False
+        signatures = priority.ListingIndex(self.listing_index)
+        listing_files = [
+            f"{self.output_file}.listings{index}" for index in range(shards)
+        ]
+        later_files = [f"{path}.later" for path in listing_files]
+        counts = [0] * shards
+        try:
+            with contextlib.ExitStack() as stack:
+                spools, later = (
+                    [
+                        stack.enter_context(open(path, "w", encoding="utf-8"))
+                        for path in paths
+                    ]
+                    for paths in (listing_files, later_files)
+                )
+                async for car in self.discover():
+                    if shutdown.requested():
+                        break
+                    if listing_deadline is not None and listing_deadline.passed():
+                        listing_cut = True
+                        break
+                    key = self.item_id(car)
+                    rank = signatures.rank(key, self.listing_signature(car))
+                    if key in done:
+                        signatures.mark_saved(key)
+                        continue
+                    shard = zlib.crc32(key.encode()) % shards
+                    spool = later if rank == priority.UNCHANGED else spools
+                    spool[shard].write(json.dumps(car) + "\n")
+                    counts[shard] += 1
                 else:
-                    print(
-                        f">= Kavak: Failed to fetch/parse details for {result_or_exc['message']}"
-                    )
+                    listed_all = True
+        except ScrapeError as e:
+            if listing_deadline is None or not listing_deadline.passed():
+                log.error("Halting: Failed to fetch car listings from API: %s", e)
+                stats.for_site(self.name).fail(f"{e.reason}: {e}")
+                for path in listing_files + later_files:
+                    os.remove(path)
+                return
+            listing_cut = True
+
+        if shutdown.requested():
+            log.info("Stopped while listing; no details were fetched.")
+            stats.for_site(self.name).set_phase("stopped")
+            for path in listing_files + later_files:
+                os.remove(path)
+            return
 
-            if i + self.concurrency_details < len(product_detail_tasks):
-                print(
-                    f"--- Kavak: Batch {i // self.concurrency_details + 1} done. Sleeping for 2 seconds before next batch... ---"
-                )
-                await asyncio.sleep(2)
+        for path, later_path in zip(listing_files, later_files):
+            with open(path, "ab") as out, open(later_path, "rb") as src:
+                shutil.copyfileobj(src, out)
+            os.remove(later_path)
 
-        # print(f"\n\n--- Scraping Complete ---")
-        print(
-            f">= Kavak: Successfully processed and combined data for {len(all_combined_car_data)} out of {len(api_cars)} cars.\n"
+        if listing_cut:
+            log.warning(
+                "Listing share of the %.0fs budget spent; scraping the listings"
+                " found so far.",
+                budget,
+            )
+        log.info(
+            "Fetched %d car listings. Now fetching product details concurrently...",
+            sum(counts),
+        )
+        await self.fetch_product_details_sharded(
+            listing_files,
+            counts,
+            budget=run_deadline.remaining() if run_deadline is not None else 0,
+            partial=listing_cut,
         )
 
-        # if all_combined_car_data:
+        if os.path.exists(self.checkpoint_file):
+            for key in checkpoint.load(self.checkpoint_file):
+                signatures.mark_saved(key)
+        else:
+            signatures.mark_all_saved()
+        signatures.save(listed_all)
+
+
+def _read_listings(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _run_shard(
+    listing_file: str,
+    part_file: str,
+    concurrency_details: int,
+    budget: float = 0,
+    partial: bool = False,
+) -> Tuple[int, stats.SiteStats]:
+    """Entry point of a shard process: fetch details for one listing file."""
+    logs.setup()
+
+    async def run() -> int:
+        async with KavakScraper(concurrency_details=concurrency_details) as scraper:
+            scraper.output_file = part_file
+            counts = await engine.run(
+                scraper,
+                items=_read_listings(listing_file),
+                budget=budget,
+                partial=partial,
+            )
+            return counts["saved"]
 
-        #     with open(self.json_file, "w") as f:
-        #         json.dump(all_combined_car_data, f, indent=2)
-        #     print(f">= Saved all combined data to {self.json_file}")
+    saved = asyncio.run(run())
+    tracing.flush()
+    logs.shutdown()
+    return saved, stats.for_site(KavakScraper.name)
 
 
-async def main():
-    async with KavakScraper(concurrency_api=25, concurrency_details=200) as scraper:
-        await scraper.run_scraper()
+async def main(shards: int = 1):
+    async with KavakScraper() as scraper:
+        if shards > 1:
+            await scraper.run_sharded(shards)
+        else:
+            await engine.run(scraper)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Kavak scraper")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split the detail phase across N processes (hash of listing id)",
+    )
+    args = parser.parse_args()
+    logs.setup()
+    try:
+        asyncio.run(main(shards=args.shards))
+    finally:
+        logs.shutdown()
@@ -1,29 +1,24 @@
 import asyncio
-import json
-from selectolax.parser import HTMLParser
-import os
-from curl_cffi import AsyncSession
-import pandas as pd
+from scraper_core import engine, logs
+from scraper_core.base import BaseScraper, ScrapeError
 from datetime import datetime, timezone
-from rich import print
-from typing import Optional, Type, Any, Dict
-from types import TracebackType
+from typing import AsyncIterator, Optional, Any, Dict
 
+log = logs.get_logger("nxtcarsuae")
 
-class NxtCarsUae:
+
+class NxtCarsUae(BaseScraper):
     """
     NxtCarsUae is a website that sells cars.
     """
 
-    def __init__(self, concurrency: int = 100):
+    name = "nxtcarsuae"
+
+    def __init__(self, concurrency: Optional[int] = None):
         """
         Initialize the NxtCarsUae class.
         """
-        print(f"--------- NxtCarsUae Scraper Started ---------\n")
-        self.session = AsyncSession(timeout=120, impersonate="chrome")
-
-        today_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        self.csv_file = f"nxtcarsuae_{today_date}.csv"
+        super().__init__(concurrency)
 
         self.cars_url = "https://nxtcarsuae.com/sales"
         self.car_make_url = "https://nxtcarsuae.com/sales/car/"
@@ -38,147 +33,68 @@ class NxtCarsUae:
             self.headers = {"authorization": f"Bearer {self.access_token}"}
         return self
 
-    async def __aexit__(
-        self,
-        exc_type: Optional[Type[BaseException]],
-        exc: Optional[BaseException],
-        tb: Optional[TracebackType],
-    ) -> None:
-        """
-        Exit the context manager.
+    async def _get_bearer_token(self) -> Optional[str]:
         """
-        await self.session.close()
-
-    async def _make_request(
-        self,
-        method: str,
-        url: str,
-        params: Optional[Dict[str, Any]] = None,
-        data: Optional[Dict[str, Any]] = None,
-        json_payload: Optional[Dict[str, Any]] = None,
-        allow_redirects: bool = True,
-        headers: Optional[Dict[str, Any]] = None,
-        cookies: Optional[Dict[str, Any]] = None,
-        timeout: int = 120,
-        verify: bool = True,
-    ) -> Dict[str, Any]:
-        """
-        Make a request to the Automall API.
-
-        Args:
-            method (str): The HTTP method to use.
-            url (str): The URL to request.
-            params (Optional[Dict[str, Any]]): The parameters to send with the request.
-            data (Optional[Dict[str, Any]]): The data to send with the request.
-            json_payload (Optional[Dict[str, Any]]): The JSON payload to send with the request.
-            allow_redirects (bool): Whether to allow redirects.
-            headers (Optional[Dict[str, Any]]): The headers to send with the request.
-            cookies (Optional[Dict[str, Any]]): The cookies to send with the request.
-            timeout (int): The timeout for the request.
-            verify (bool): Whether to verify the SSL certificate.
-
-        Returns:
-            Dict[str, Any]: The response from the request.
-            status (bool): Whether the request was successful.
-            message (str): The message from the request.
-            json (Optional[Dict[str, Any]]): The JSON response from the request.
-            parser (Optional[HTMLParser]): The HTML parser from the request.
-            text (Optional[str]): The text response from the request.
-            response_obj (Optional[Response]): The response object from the request.
+        Get the bearer token from the NxtCarsUae website.
         """
         try:
-            method_lower = method.lower()
-            if method_lower not in [
-                "get",
+            response = await self.request(
                 "post",
-                "put",
-                "delete",
-                "patch",
-                "head",
-                "options",
-            ]:
-                return {"status": False, "message": f"Invalid HTTP method: {method}."}
-
-            response = await getattr(self.session, method_lower)(
-                url,
-                params=params,
-                data=data,
-                json=json_payload,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-                verify=verify,
-                allow_redirects=allow_redirects,
+                "https://nxtcarsuae.com/api/generateToken",
             )
+        except ScrapeError as e:
+            log.error("Could not get a bearer token: %s", e)
+            return None
 
-            return {
-                "status": True,
-                "message": "Request successful.",
-                "response": response,
-            }
-        except Exception as e:
-            return {"status": False, "message": f"Request failed: {e}"}
-
-    async def _get_bearer_token(self):
-        """
-        Get the bearer token from the NxtCarsUae website.
-        """
-
-        response_data = await self._make_request(
-            "post",
-            "https://nxtcarsuae.com/api/generateToken",
-        )
-        if not response_data.get("status"):
-            return response_data
-
-        response = response_data.get("response")
         json_data: dict = response.json()
         access_token = json_data.get("access_token")
         return access_token
 
-    async def fetch_car_ids(self) -> dict:
+    async def discover(self) -> AsyncIterator[str]:
         """
-        Fetch the car IDs from the NxtCarsUae website.
+        Yield the car IDs listed on the NxtCarsUae website.
         """
-        response_data = await self._make_request(
+        response = await self.request(
             "get",
             "https://nxtcarsuae.com/api/getCarIds",
         )
+        ids = response.json().get("response") or []
+        if not ids:
+            raise ScrapeError("No car ids found.", "no_listings")
+
+        log.info("Found %d car ids", len(ids))
+        for id in ids:
+            yield str(id)
 
-    async def get_car_data(self, id: str):
+    async def fetch(self, id: str) -> Dict[str, Any]:
         """
-        Get the car data from the NxtCarsUae website.
+        Get the vehicle record of one car from the NxtCarsUae API.
         Args:
             id (str): The ID of the car to get the data for.
 
         Returns:
-            dict: The car data.
-            status (bool): Whether the request was successful.
-            message (str): The message from the request.
+            dict: The vehicle record.
         """
-        print(f">= NxtCarsUae: Scraping car details for {id}")
+        log.debug("Scraping car details for %s", id)
 
-        response_data = await self._make_request(
+        response = await self.request(
             "get",
             f"https://api.nxt-website.awr-api.com/vehicles/{id}?origin=web",
             headers=self.headers,
         )
 
-        response = response_data.get("response")
-        if response.status_code != 200:
-            return {
-                "status": False,
-                "message": f"NxtCarsUae API request failed for get_car_data: {response.text}",
-            }
-
         json_data: dict = response.json()
         if json_data.get("code") != 200:
-            return {
-                "status": False,
-                "message": f"NxtCarsUae API request failed for get_car_data: {json_data}",
-            }
+            raise ScrapeError(
+                f"NxtCarsUae API request failed for {id}: {json_data}", "api_error"
+            )
+
+        return json_data.get("response")
 
-        get_response: dict = json_data.get("response")
+    def extract(self, get_response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build one CSV row from a vehicle record.
+        """
 
         id = get_response.get("_id")
         price = get_response.get("vhlPrice")
@@ -275,18 +191,15 @@ class NxtCarsUae:
 
         return car_data
 
-    async def run_scraper(self) -> None:
-        """
-        Run the scraper.
-        """
-        data = await self.get_car_data("46727577")
-        print(data)
-
 
 async def main():
     async with NxtCarsUae() as nxtcarsuae:
-        await nxtcarsuae.run_scraper()
+        await engine.run(nxtcarsuae)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logs.setup()
+    try:
+        asyncio.run(main())
+    finally:
+        logs.shutdown()
@@ -3,25 +3,30 @@
 Legend Scrapers Scheduler
 ========================
 
-This script schedules the Legend Scrapers to run automatically every day at 2:00 PM 
-Bangladesh/Dhaka time (UTC+6).
+This script runs each Legend Scraper on its own cron schedule, evaluated in
+Bangladesh/Dhaka time (UTC+6). Schedules come from the ``schedule`` setting
+in legend.toml; by default Cars24 refreshes hourly and the other sites run
+daily at 2:00 PM.
 
 Usage:
-    python scheduler.py          - Start the scheduler
-    python scheduler.py --once   - Run scrapers immediately
-    python scheduler.py --help   - Show help message
+    python scheduler.py                          - Start the scheduler
+    python scheduler.py --config prod.toml       - Use another settings file
+    python scheduler.py --cron "cars24=*/30 * * * *"  - Override a site schedule
+    python scheduler.py --once                   - Run scrapers immediately
+    python scheduler.py --help                   - Show help message
 
 Requirements:
-    - schedule>=1.2.0
     - pytz>=2023.3
 """
 
 import asyncio
+import json
 import multiprocessing as mp
-import schedule
+from multiprocessing.connection import wait
 import time
 import logging
 import argparse
+import re
 from datetime import datetime
 import pytz
 import sys
@@ -34,8 +39,10 @@ if sys.platform.startswith("win"):
     sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
     sys.stderr = codecs.getwriter("utf-8")(sys.stderr.detach())
 
-# Import the scraper functions from app.py
-from app import run_kavak, run_automall, run_cars24, run_dubizzle, process_wrapper
+# Import the scraper process entry point from app.py
+from app import process_wrapper
+from scraper_core import config, history, shutdown, stats
+from scraper_core.cron import CronSpec
 
 
 # Configure logging with UTF-8 encoding
@@ -71,9 +78,55 @@ logger = logging.getLogger(__name__)
 BANGLADESH_TZ = pytz.timezone("Asia/Dhaka")
 
 
+def configured_schedules():
+    """
+    Cron expressions in Bangladesh time (minute hour day-of-month month
+    day-of-week) for every site, from the ``schedule`` setting.
+    """
+    return {site: config.site(site).schedule for site in config.enabled_sites()}
+
+
+STATE_FILE = "scheduler_state.json"
+
+# Longest single sleep, so suspend/resume or clock changes are noticed.
+MAX_SLEEP_SECONDS = 3600
+# Seconds a stopping scraper gets beyond its drain_timeout to flush output.
+STOP_GRACE = 30
+
+# Set by scheduler_ascii.py for consoles that cannot show emoji: messages then
+# use these tags, and any other non-ASCII character is dropped.
+ASCII_ONLY = False
+ASCII_TAGS = {
+    "🚀": "[START]",
+    "✅": "[SUCCESS]",
+    "❌": "[ERROR]",
+    "🛑": "[STOP]",
+    "⏰": "[SCHEDULER]",
+    "🕐": "[TIME]",
+    "📋": "[SCHEDULE]",
+    "📅": "[SCHEDULE]",
+    "🔄": "[RUNNING]",
+    "🔧": "[MANUAL]",
+    "⏭️": "[SKIP]",
+    "⏪": "[CATCHUP]",
+    "⚠️": "[!]",
+    "📈": "[STATS]",
+}
+
+
+def _for_console(message):
+    """``message`` as it should be shown, in ASCII when ASCII_ONLY is set."""
+    if not ASCII_ONLY:
+        return message
+    for emoji, tag in ASCII_TAGS.items():
+        message = message.replace(emoji, tag)
+    return re.sub(r"[^\x00-\x7f]+ *", "", message)
+
+
 # Safe logging functions for Unicode compatibility
 def safe_log_info(message):
     """Log info message with Unicode fallback."""
+    message = _for_console(message)
     try:
         logger.info(message)
     except UnicodeEncodeError:
@@ -84,6 +137,7 @@ def safe_log_info(message):
 
 def safe_log_error(message):
     """Log error message with Unicode fallback."""
+    message = _for_console(message)
     try:
         logger.error(message)
     except UnicodeEncodeError:
@@ -94,6 +148,7 @@ def safe_log_error(message):
 
 def safe_print(message):
     """Print message with Unicode fallback."""
+    message = _for_console(message)
     try:
         print(message)
     except UnicodeEncodeError:
@@ -107,18 +162,134 @@ def get_bangladesh_time():
     return datetime.now(BANGLADESH_TZ)
 
 
-def run_all_scrapers():
+def _lock_path(site):
+    return f"scraper_{site}.lock"
+
+
+def _pid_alive(pid):
+    """Return whether a process with ``pid`` is still running."""
+    if pid <= 0:
+        return False
+    if sys.platform.startswith("win"):
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def acquire_lock(site, pid=None):
+    """
+    Take the lock file for ``site`` so two runs of it never overlap.
+
+    A lock left behind by a process that no longer exists is treated as
+    stale and replaced. Returns True when the lock was acquired.
+    """
+    path = _lock_path(site)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    owner = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                owner = 0
+            if _pid_alive(owner):
+                return False
+            safe_log_info(f"🔓 Removing stale lock for {site} (pid {owner})")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(str(pid or os.getpid()))
+        return True
+    return False
+
+
+def update_lock(site, pid):
+    """Point the lock at the process actually running the site."""
+    with open(_lock_path(site), "w", encoding="utf-8") as f:
+        f.write(str(pid))
+
+
+def release_lock(site):
+    """Remove the lock file for ``site``."""
+    try:
+        os.remove(_lock_path(site))
+    except FileNotFoundError:
+        pass
+
+
+def load_state():
+    """Load the last scheduled run time of each site."""
+    try:
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    """Persist the last scheduled run time of each site atomically."""
+    tmp_file = f"{STATE_FILE}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+
+def run_all_scrapers(sites=None):
     """Run all scrapers concurrently with error handling and logging."""
     start_time = get_bangladesh_time()
     safe_log_info(
         f"🚀 Starting Legend Scrapers at {start_time.strftime('%Y-%m-%d %H:%M:%S %Z')}"
     )
 
-    scrapers = [run_kavak, run_automall, run_cars24, run_dubizzle]
+    locked_sites = []
+    for site in sites or config.enabled_sites():
+        if acquire_lock(site):
+            locked_sites.append(site)
+        else:
+            safe_log_error(f"⏭️  {site} is already running elsewhere, skipping it")
+
+    if not locked_sites:
+        return False
 
     try:
-        with mp.Pool(processes=len(scrapers)) as pool:
-            pool.map(process_wrapper, scrapers)
+        with mp.Pool(
+            processes=len(locked_sites),
+            initializer=shutdown.attach,
+            initargs=(shutdown.share(),),
+        ) as pool:
+            statuses = {}
+            try:
+                statuses = dict(zip(locked_sites, pool.map(run_site, locked_sites)))
+            except KeyboardInterrupt:
+                # The scrapers drain, flush and checkpoint, then return.
+                shutdown.request("interrupted")
+            pool.close()
+            pool.join()
+        if shutdown.requested():
+            safe_log_info("🛑 Scrapers stopped by user")
+            return False
+        failed = [site for site, status in statuses.items() if status == "failed"]
+        if failed:
+            safe_log_error(f"❌ Scraping failed for {', '.join(failed)}")
+            return False
 
         end_time = get_bangladesh_time()
         duration = end_time - start_time
@@ -128,59 +299,191 @@ def run_all_scrapers():
     except Exception as e:
         safe_log_error(f"❌ Error during scraping: {str(e)}")
         return False
+    finally:
+        for site in locked_sites:
+            release_lock(site)
 
 
-def scheduled_job():
-    """Wrapper function for scheduled execution."""
+def run_site(site):
+    """
+    Child process entry point: run one site's scraper and record its stats.
+
+    Returns the run's status: ``ok``, ``failed`` (the scraper gave up, e.g.
+    when its listing could not be fetched), ``stopped`` or ``partial``.
+    """
+    stats.reset(site)
+    started_at = get_bangladesh_time()
+    status, error = "ok", None
+    try:
+        process_wrapper(site)
+        site_stats = stats.for_site(site)
+        if site_stats.phase == "failed":
+            status, error = "failed", site_stats.error
+        elif shutdown.requested():
+            status = "stopped"
+        elif site_stats.phase == "partial":
+            status = "partial"
+    except BaseException as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            history.record_run(
+                site,
+                started_at,
+                get_bangladesh_time(),
+                stats.snapshot(site),
+                status=status,
+                error=error,
+            )
+        except Exception as e:
+            safe_log_error(f"❌ {site}: could not record run history: {str(e)}")
+    return status
+
+
+def run_scheduled_site(site):
+    """Scheduler child entry point: like run_site, exiting 1 if the run failed."""
+    if run_site(site) == "failed":
+        sys.exit(1)
+
+
+def start_site(site, running):
+    """Start ``site`` in a child process unless a run of it is in progress."""
+    if site in running:
+        safe_log_error(f"⏭️  {site}: previous run still in progress, skipping")
+        return
+    if not acquire_lock(site):
+        safe_log_error(f"⏭️  {site}: locked by another process, skipping")
+        return
+
     try:
-        safe_log_info("📅 Scheduled scraping job started")
-        success = run_all_scrapers()
-        if success:
-            safe_log_info("📅 Scheduled scraping job completed successfully")
+        process = mp.Process(
+            target=run_scheduled_site, args=(site,), name=f"scraper-{site}"
+        )
+        process.start()
+    except Exception:
+        release_lock(site)
+        raise
+    update_lock(site, process.pid)
+    running[site] = (process, get_bangladesh_time())
+    safe_log_info(f"🚀 {site}: started (pid {process.pid})")
+
+
+def reap_finished(running):
+    """Release locks of child processes that have exited."""
+    for site, (process, started) in list(running.items()):
+        if process.is_alive():
+            continue
+        process.join()
+        release_lock(site)
+        del running[site]
+        duration = get_bangladesh_time() - started
+        if process.exitcode == 0:
+            safe_log_info(f"✅ {site}: completed successfully in {duration}")
         else:
-            safe_log_error("📅 Scheduled scraping job completed with errors")
-    except Exception as e:
-        safe_log_error(f"❌ Scheduled job failed: {str(e)}")
+            safe_log_error(
+                f"❌ {site}: exited with code {process.exitcode} after {duration}"
+            )
+
 
+def plan_next_runs(specs, state, now):
+    """
+    Work out when each site should next run.
+
+    A site whose last recorded run is older than its most recent scheduled
+    time missed a run while the scheduler was down, and is due immediately.
+    """
+    next_runs = {}
+    for site, spec in specs.items():
+        last_run = state.get(site)
+        if last_run:
+            missed = spec.next_after(datetime.fromisoformat(last_run))
+            if missed <= now:
+                safe_log_info(
+                    f"⏪ {site}: catching up run missed at {missed.strftime('%Y-%m-%d %H:%M %Z')}"
+                )
+                next_runs[site] = now
+                continue
+        next_runs[site] = spec.next_after(now)
+    return next_runs
+
+
+def scheduler_tick(specs, next_runs, running, state):
+    """Start every site whose deadline has passed and schedule its next run."""
+    reap_finished(running)
+    now = get_bangladesh_time()
+    for site, due in next_runs.items():
+        if due > now:
+            continue
+        safe_log_info(f"📅 {site}: scheduled run due at {due.strftime('%H:%M %Z')}")
+        start_site(site, running)
+        state[site] = due.isoformat()
+        save_state(state)
+        # Skip any deadlines that passed while this run was being started.
+        next_runs[site] = specs[site].next_after(now)
+        safe_log_info(
+            f"⏭️  {site}: next run {next_runs[site].strftime('%Y-%m-%d %H:%M:%S %Z')}"
+        )
 
-def run_scheduler():
-    """Run the scheduler that executes scrapers daily at 2 PM Bangladesh time."""
-    # Clear any existing scheduled jobs
-    schedule.clear()
 
-    # Schedule the job for 2:00 PM Bangladesh time (UTC+6)
-    schedule.every().day.at("14:00").do(scheduled_job)
+def sleep_until_next(next_runs, running):
+    """Sleep until the earliest deadline, waking early if a child exits."""
+    now = get_bangladesh_time()
+    remaining = (min(next_runs.values()) - now).total_seconds()
+    timeout = min(max(remaining, 0), MAX_SLEEP_SECONDS)
+    sentinels = [process.sentinel for process, _ in running.values()]
+    if sentinels:
+        wait(sentinels, timeout=timeout)
+    else:
+        time.sleep(timeout)
+
+
+def run_scheduler(schedules=None):
+    """Run each scraper on its own cron schedule in Bangladesh time."""
+    schedules = schedules or configured_schedules()
+    specs = {site: CronSpec(expr, BANGLADESH_TZ) for site, expr in schedules.items()}
 
     current_time = get_bangladesh_time()
-    next_run = schedule.next_run()
+    state = load_state()
+    next_runs = plan_next_runs(specs, state, current_time)
+    running = {}
 
     safe_log_info("⏰ Legend Scrapers Scheduler Started")
     safe_log_info(
         f"🕐 Current Bangladesh time: {current_time.strftime('%Y-%m-%d %H:%M:%S %Z')}"
     )
-    safe_log_info("📋 Schedule: Daily at 2:00 PM Bangladesh time (UTC+6)")
-
-    if next_run:
-        # Convert UTC time to Bangladesh time for display
-        next_run_bd = next_run.replace(tzinfo=pytz.UTC).astimezone(BANGLADESH_TZ)
+    for site, spec in specs.items():
         safe_log_info(
-            f"⏭️  Next scheduled run: {next_run_bd.strftime('%Y-%m-%d %H:%M:%S %Z')}"
+            f"📋 {site}: '{spec.expression}' - next run "
+            f"{next_runs[site].strftime('%Y-%m-%d %H:%M:%S %Z')}"
         )
 
     safe_log_info("🔄 Scheduler is running... Press Ctrl+C to stop")
 
-    # Keep the scheduler running
     try:
         while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+            try:
+                scheduler_tick(specs, next_runs, running, state)
+                sleep_until_next(next_runs, running)
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                safe_log_error(f"❌ Scheduler error: {str(e)}")
+                safe_log_info("🔄 Retrying in 60 seconds...")
+                time.sleep(60)
     except KeyboardInterrupt:
         safe_log_info("🛑 Scheduler stopped by user")
-    except Exception as e:
-        safe_log_error(f"❌ Scheduler error: {str(e)}")
-        safe_log_info("🔄 Restarting scheduler in 60 seconds...")
-        time.sleep(60)
-        run_scheduler()  # Restart scheduler
+    finally:
+        # SIGTERM asks each child to drain, flush and checkpoint; give it its
+        # drain deadline plus time to write before killing it.
+        for process, _ in running.values():
+            process.terminate()
+        for site, (process, _) in running.items():
+            process.join(timeout=config.site(site).drain_timeout + STOP_GRACE)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            release_lock(site)
 
 
 def run_once():
@@ -194,14 +497,88 @@ def run_once():
     return success
 
 
+def _format_change(latest, baseline, unit, higher_is_worse=True, precision=1):
+    if latest is None:
+        return "-"
+    text = f"{latest:,.{precision}f}{unit}"
+    if baseline:
+        change = (latest - baseline) / baseline * 100
+        flag = " ⚠️" if (change > 20 if higher_is_worse else change < -20) else ""
+        text += f" ({change:+.0f}%{flag})"
+    return text
+
+
+def show_stats(days=14):
+    """Print per-site trends from the run history database."""
+    summaries = history.summarise(days)
+    if not summaries:
+        safe_print(f"No runs recorded in {history.HISTORY_DB} in the last {days} days.")
+        return
+
+    safe_print(
+        f"📈 Run history for the last {days} days (change vs. median of earlier runs)"
+    )
+    for summary in summaries:
+        safe_print("")
+        safe_print(
+            f"🎯 {summary['site']}: {summary['runs']} runs, "
+            f"{summary['failed_runs']} failed, {summary['partial_runs']} partial, "
+            f"{summary['stopped_runs']} stopped, "
+            f"latest {summary['latest_started_at'][:16]} UTC"
+        )
+        safe_print(
+            "   Duration:     "
+            + _format_change(
+                summary["latest_duration_s"], summary["baseline_duration_s"], "s"
+            )
+        )
+        safe_print(
+            "   Records:      "
+            + _format_change(
+                summary["latest_successes"],
+                summary["baseline_successes"],
+                "",
+                higher_is_worse=False,
+                precision=0,
+            )
+        )
+        safe_print(
+            "   Records/sec:  "
+            + _format_change(
+                summary["latest_records_per_s"],
+                summary["baseline_records_per_s"],
+                "",
+                higher_is_worse=False,
+            )
+        )
+        safe_print(
+            "   Latency p95:  "
+            + _format_change(summary["latest_p95_ms"], summary["baseline_p95_ms"], "ms")
+            + f"  (p50 {summary['latest_p50_ms'] or '-'}ms)"
+        )
+        safe_print(
+            f"   Downloaded:   {summary['latest_mb']:.1f} MB, "
+            f"{summary['latest_failures']} failed fetches"
+        )
+        if summary["failure_reasons"]:
+            reasons = ", ".join(
+                f"{reason}={count}"
+                for reason, count in sorted(
+                    summary["failure_reasons"].items(), key=lambda item: -item[1]
+                )
+            )
+            safe_print(f"   Failures:     {reasons}")
+
+
 def show_help():
     """Display help information."""
     help_text = """
 🔧 Legend Scrapers Scheduler - Help
 
 DESCRIPTION:
-    This scheduler runs the Legend Scrapers automatically every day at 2:00 PM 
-    Bangladesh/Dhaka time (UTC+6).
+    This scheduler runs each Legend Scraper on its own cron schedule in
+    Bangladesh/Dhaka time (UTC+6). Defaults: Cars24 hourly, the other sites
+    daily at 2:00 PM.
 
 USAGE:
     python scheduler.py [OPTIONS]
@@ -210,6 +587,9 @@ USAGE:
 OPTIONS:
     (no arguments)    Start the scheduler (default behavior)
     --once           Run all scrapers immediately
+    --config PATH    Read per-site settings and schedules from PATH
+    --cron SITE=EXPR Override one site's cron schedule (repeatable)
+    --stats          Summarise run history trends (use --days to change window)
     --help           Show this help message
 
 EXAMPLES:
@@ -217,27 +597,33 @@ EXAMPLES:
     python scheduler.py --once   # Run scrapers now
     uv run scheduler.py          # Start with uv
     uv run scheduler.py --once   # Run once with uv
+    python scheduler.py --cron "cars24=*/30 * * * *" --cron "kavak=0 3 * * *"
 
 FEATURES:
-    ⏰ Automatic daily execution at 2:00 PM Bangladesh time
+    ⏰ Per-site cron schedules in Bangladesh time
+    🔒 Lock files (scraper_<site>.lock) prevent overlapping runs of a site
+    ⏪ Runs missed while the scheduler was down are caught up on start
+    💤 Sleeps until the next deadline instead of polling
     📝 Comprehensive logging to file and console
     🔄 Error handling and recovery
     🚀 Concurrent execution of all scrapers
     ⏹️  Graceful shutdown with Ctrl+C
 
-LOG FILE:
-    scraper_scheduler.log - Contains all execution logs
+FILES:
+    scraper_scheduler.log  - Contains all execution logs
+    scheduler_state.json   - Last scheduled run of each site, used for catch-up
+    scraper_history.db     - Per-run timing, counts, failures and latency (SQLite)
 
 TIMEZONE:
     All times are in Bangladesh/Dhaka timezone (UTC+6)
     """
-    print(help_text)
+    safe_print(help_text)
 
 
 def main():
     """Main function with command-line argument parsing."""
     parser = argparse.ArgumentParser(
-        description="Legend Scrapers Scheduler - Runs scrapers daily at 2 PM Bangladesh time",
+        description="Legend Scrapers Scheduler - Runs each scraper on a cron schedule in Bangladesh time",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
 
@@ -247,12 +633,70 @@ def main():
         help="Run scrapers immediately instead of scheduling",
     )
 
+    parser.add_argument(
+        "--config",
+        metavar="PATH",
+        help="Per-site settings file (default: legend.toml or $LEGEND_CONFIG)",
+    )
+
+    parser.add_argument(
+        "--cron",
+        action="append",
+        default=[],
+        metavar="SITE=EXPR",
+        help="Override a site's cron schedule, e.g. 'cars24=*/30 * * * *'",
+    )
+
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Summarise per-site trends from the run history and exit",
+    )
+
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=14,
+        help="History window in days for --stats (default: 14)",
+    )
+
     parser.add_argument(
         "--help-detailed", action="store_true", help="Show detailed help information"
     )
 
     args = parser.parse_args()
 
+    if args.stats:
+        show_stats(args.days)
+        return
+
+    if args.config:
+        # Exported so that the scraper processes read the same file.
+        os.environ["LEGEND_CONFIG"] = os.path.abspath(args.config)
+    try:
+        config.use(config.load())
+    except config.ConfigError as e:
+        parser.error(str(e))
+
+    schedules = configured_schedules()
+    overrides = {}
+    for override in args.cron:
+        site, _, expression = override.partition("=")
+        site = site.strip().lower()
+        if site not in schedules or not expression:
+            parser.error(f"--cron expects SITE=EXPR with SITE in {sorted(schedules)}")
+        try:
+            CronSpec(expression, BANGLADESH_TZ)
+        except ValueError as e:
+            parser.error(str(e))
+        overrides[site] = expression.strip()
+    if overrides:
+        # The scrapers name their output files after their schedule, so they
+        # must see the override too; exported for spawned processes.
+        os.environ[config.SCHEDULES_ENV] = json.dumps(overrides)
+        config.get().override_schedules(overrides)
+        schedules = configured_schedules()
+
     if args.help_detailed:
         show_help()
         return
@@ -267,6 +711,9 @@ def main():
     safe_print("🎯 Target platforms: Kavak, AutoMall, Cars24, Dubizzle")
     safe_print("=" * 60)
 
+    # A SIGTERM (e.g. from systemd) stops the scheduler like Ctrl+C does.
+    shutdown.sigterm_as_interrupt()
+
     if args.once:
         # Run scrapers immediately
         safe_print("🔧 Manual execution mode")
@@ -274,8 +721,8 @@ def main():
         sys.exit(0 if success else 1)
     else:
         # Start the scheduler
-        safe_print("⏰ Scheduler mode - Daily execution at 2:00 PM Bangladesh time")
-        run_scheduler()
+        safe_print("⏰ Scheduler mode - Per-site cron schedules in Bangladesh time")
+        run_scheduler(schedules)
 
 
 if __name__ == "__main__":
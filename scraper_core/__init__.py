@@ -0,0 +1,26 @@
+"""
+Scraper Core
+
+Shared plumbing used by every site scraper.
+
+Submodules are imported on first use (PEP 562): ``import scraper_core`` is
+free, and a process only loads curl_cffi once it touches ``http``.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from . import http, stats
+
+__all__ = ["http", "stats"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
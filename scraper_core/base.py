@@ -0,0 +1,207 @@
+"""
+The interface every site scraper implements.
+
+A scraper describes a site in three phases and leaves running them to
+:mod:`scraper_core.engine`:
+
+- :meth:`BaseScraper.discover` walks the listing pages and yields one work
+  item per car (an id, a URL or a listing dict).
+- :meth:`BaseScraper.fetch` downloads whatever an item needs, usually its
+  detail page. Sites whose listings already hold every field keep the
+  default, which returns the item itself.
+- :meth:`BaseScraper.extract` turns that payload into one output record.
+
+The base class owns the site's sessions (a
+:class:`~scraper_core.sessions.SessionPool`), its settings and its output
+file.
+"""
+
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Type
+from types import TracebackType
+
+from . import checkpoint, config, deadline, http, logs, output, sessions
+
+# Statuses worth another attempt; anything else >= 400 is final.
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class ScrapeError(Exception):
+    """
+    A work item that could not be fetched or extracted.
+
+    Args:
+        message (str): What went wrong, for the log.
+        reason (str): Short failure reason counted in the run stats.
+        retryable (bool): Whether the engine may try the item again.
+    """
+
+    def __init__(
+        self, message: str, reason: str = "unknown", retryable: bool = False
+    ) -> None:
+        super().__init__(message)
+        self.reason = reason
+        self.retryable = retryable
+
+
+class BaseScraper:
+    """
+    Base class of the site scrapers.
+
+    Subclasses set :attr:`name` and implement :meth:`discover` and
+    :meth:`extract`, plus :meth:`fetch` when items need a request of their
+    own.
+    """
+
+    # Site name, as used in legend.toml, stats and output file names.
+    name = ""
+    # Whether fetch() requests a detail page per item.
+    detail_pages = True
+    # Seconds to pause after every `concurrency` items, on top of the rate limit.
+    batch_pause = 0.0
+
+    def __init__(self, concurrency: Optional[int] = None) -> None:
+        """
+        Args:
+            concurrency (Optional[int]): Items fetched at once; defaults to
+                the site's ``detail_concurrency`` setting.
+        """
+        self.log = logs.get_logger(self.name)
+        self.log.info("Scraper started")
+
+        self.settings = config.site(self.name)
+        self.session = sessions.SessionPool(
+            self.name,
+            size=self.settings.sessions,
+            profiles=self.settings.impersonate,
+            connections=self.settings.session_connections,
+            strategy=self.settings.session_strategy,
+            timeout=deadline.split(
+                self.settings.connect_timeout, self.settings.timeout
+            ),
+        )
+        http.set_rate_limit(
+            self.name, self.settings.rate_limit, self.settings.rate_burst
+        )
+        http.set_hedging(
+            self.name, self.settings.hedge_percentile, self.settings.hedge_budget
+        )
+        http.set_proxies(
+            self.name,
+            self.settings.proxies,
+            self.settings.proxy_concurrency,
+            self.settings.proxy_quarantine,
+        )
+        self.concurrency = concurrency or self.settings.detail_concurrency
+        self.output_file = output.run_path(self.name, self.settings)
+
+    async def __aenter__(self) -> "BaseScraper":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.session.close()
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """
+        Send a request for this site through :func:`scraper_core.http.request`.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to request.
+            **kwargs: Passed through to the session; ``timeout`` defaults to
+                the site's connect and total timeouts, cut to what is left of
+                the current phase's deadline.
+
+        Returns:
+            Response: The response, whose status is below 400.
+
+        Raises:
+            ScrapeError: If the request fails, the status is 400 or more, or
+                the phase's deadline has passed.
+        """
+        limit = deadline.current()
+        if limit is not None and limit.passed():
+            raise ScrapeError(f"Out of time for {url}", "deadline")
+        kwargs.setdefault(
+            "timeout",
+            deadline.timeouts(self.settings.connect_timeout, self.settings.timeout),
+        )
+        try:
+            response = await http.request(
+                self.session, method, url, site=self.name, **kwargs
+            )
+        except Exception as e:
+            if limit is not None and limit.passed():
+                raise ScrapeError(f"Out of time for {url}", "deadline") from e
+            raise ScrapeError(
+                f"Request failed for {url}: {e}", "request_failed", retryable=True
+            ) from e
+        if response.status_code >= 400:
+            raise ScrapeError(
+                f"HTTP {response.status_code} for {url}",
+                f"http_{response.status_code}",
+                retryable=response.status_code in RETRYABLE_STATUSES,
+            )
+        return response
+
+    def discover(self) -> AsyncIterator[Any]:
+        """
+        Walk the listing pages and yield one work item per car.
+
+        Implemented as an async generator. Raising :class:`ScrapeError`
+        stops the run.
+        """
+        raise NotImplementedError
+
+    async def fetch(self, item: Any) -> Any:
+        """
+        Download what ``item`` needs for :meth:`extract`.
+
+        Raises:
+            ScrapeError: If the item cannot be fetched.
+        """
+        return item
+
+    def extract(self, payload: Any) -> Dict[str, Any]:
+        """
+        Build one output record from what :meth:`fetch` returned.
+
+        Raises:
+            ScrapeError: If the payload lacks the expected data.
+        """
+        raise NotImplementedError
+
+    def item_id(self, item: Any) -> str:
+        """A stable id of ``item``, used as its work-queue job id."""
+        return str(item)
+
+    def listing_signature(self, item: Any) -> Optional[str]:
+        """
+        The part of ``item``'s listing that changes with the car, e.g. its
+        price, or None when the listing shows nothing of the kind. Items
+        whose signature changed since the last run are fetched early.
+        """
+        return None
+
+    @property
+    def checkpoint_file(self) -> str:
+        """Where an interrupted run records the items it already saved."""
+        return checkpoint.path_for(self.output_file)
+
+    @property
+    def listing_index(self) -> str:
+        """Where the listing signatures of saved items are kept between runs."""
+        return os.path.join(self.settings.output_dir, f"{self.name}_listings.idx")
+
+    def sinks(self) -> List[output.Sink]:
+        """Where records go: today's output file of the site, written off-loop."""
+        return [
+            output.ThreadedSink(
+                output.FileSink(self.output_file, self.settings.output_format)
+            )
+        ]
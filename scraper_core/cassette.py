@@ -0,0 +1,239 @@
+"""
+Record and replay HTTP exchanges.
+
+In ``record`` mode every response that passes through
+:func:`scraper_core.http.request` is appended to a cassette directory as a
+HAR-style entry. In ``replay`` mode the same requests are answered from
+the cassette without touching the network, so parser and pipeline changes
+can be profiled at full speed and incidents reproduced exactly.
+
+A cassette is a directory of gzip-compressed JSON lines files, one per
+site and process (``kavak-1234.jsonl.gz``). Each entry is written as its
+own gzip member, so a crashed run still leaves a readable cassette.
+
+Requests are matched on method, URL with sorted query parameters, and a
+hash of the body. Headers are not part of the match, so requests that only
+differ by header (Automall's ``paging-info``) are replayed in recorded
+order; the last response repeats once the recordings run out.
+
+Configured with :func:`use` or the environment (inherited by workers):
+
+    LEGEND_CASSETTE_MODE   record or replay
+    LEGEND_CASSETTE_DIR    cassette directory
+"""
+
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import os
+from collections import deque
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from curl_cffi.requests import Cookies, Headers, Response
+
+MODES = ("record", "replay")
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def _body_bytes(kwargs: Dict[str, Any]) -> bytes:
+    if kwargs.get("json") is not None:
+        return json.dumps(kwargs["json"], sort_keys=True).encode("utf-8")
+    data = kwargs.get("data")
+    if data is None:
+        return b""
+    if isinstance(data, dict):
+        return urlencode(sorted(data.items()), doseq=True).encode("utf-8")
+    return data.encode("utf-8") if isinstance(data, str) else bytes(data)
+
+
+def request_key(method: str, url: str, kwargs: Dict[str, Any]) -> str:
+    """
+    Identify a request by method, normalised URL and body.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The URL, possibly with a query string.
+        kwargs (Dict[str, Any]): The keyword arguments of the request, of
+            which ``params``, ``json`` and ``data`` are used.
+
+    Returns:
+        str: The match key.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    params = kwargs.get("params") or {}
+    for name, value in params.items() if isinstance(params, dict) else params:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        query.extend((name, str(item)) for item in values)
+    normalised = urlunsplit(
+        (parts.scheme, parts.netloc, parts.path or "/", urlencode(sorted(query)), "")
+    )
+    body = _body_bytes(kwargs)
+    digest = hashlib.sha1(body).hexdigest()[:16] if body else "-"
+    return f"{method.upper()} {normalised} {digest}"
+
+
+def _encode_body(content: bytes) -> Dict[str, Any]:
+    try:
+        return {"size": len(content), "text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {
+            "size": len(content),
+            "text": base64.b64encode(content).decode("ascii"),
+            "encoding": "base64",
+        }
+
+
+def _decode_body(content: Dict[str, Any]) -> bytes:
+    if content.get("encoding") == "base64":
+        return base64.b64decode(content["text"])
+    return content.get("text", "").encode("utf-8")
+
+
+class Cassette:
+    """A cassette directory opened for recording or replaying."""
+
+    def __init__(self, directory: str, mode: str) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {MODES}, got {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self._entries: Dict[str, Deque[Dict[str, Any]]] = {}
+        if mode == "record":
+            os.makedirs(directory, exist_ok=True)
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        paths = sorted(glob.glob(os.path.join(self.directory, "*.jsonl.gz")))
+        if not paths:
+            raise FileNotFoundError(f"No cassette files in {self.directory}")
+        for path in paths:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], deque()).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _path(self, site: str) -> str:
+        return os.path.join(self.directory, f"{site}-{os.getpid()}.jsonl.gz")
+
+    def record(
+        self,
+        site: str,
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any],
+        response: Any,
+        seconds: float,
+    ) -> None:
+        """Append one exchange to the cassette."""
+        entry = {
+            "key": request_key(method, url, kwargs),
+            "site": site,
+            "startedDateTime": datetime.now(timezone.utc).isoformat(),
+            "time": round(seconds * 1000, 3),
+            "request": {"method": method.upper(), "url": url},
+            "response": {
+                "status": response.status_code,
+                "statusText": response.reason,
+                "url": response.url,
+                "headers": [
+                    {"name": name, "value": value}
+                    for name, value in response.headers.multi_items()
+                ],
+                "cookies": [
+                    {
+                        "name": cookie.name,
+                        "value": cookie.value,
+                        "domain": cookie.domain,
+                        "path": cookie.path,
+                    }
+                    for cookie in response.cookies.jar
+                ],
+                "content": _encode_body(response.content or b""),
+            },
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(self._path(site), "ab") as f:
+            f.write(gzip.compress(line.encode("utf-8")))
+
+    def replay(self, method: str, url: str, kwargs: Dict[str, Any]) -> Response:
+        """
+        Return the recorded response for a request.
+
+        Raises:
+            CassetteMiss: If the request is not in the cassette.
+        """
+        key = request_key(method, url, kwargs)
+        entries = self._entries.get(key)
+        if not entries:
+            raise CassetteMiss(f"Not in cassette {self.directory}: {key}")
+        entry = entries.popleft() if len(entries) > 1 else entries[0]
+        return self._build_response(entry["response"])
+
+    @staticmethod
+    def _build_response(recorded: Dict[str, Any]) -> Response:
+        response = Response()
+        response.url = recorded.get("url", "")
+        response.status_code = recorded["status"]
+        response.reason = recorded.get("statusText", "")
+        response.ok = 200 <= response.status_code < 400
+        headers: List[Tuple[str, str]] = [
+            (header["name"], header["value"]) for header in recorded["headers"]
+        ]
+        response.headers = Headers(headers)
+        response.cookies = Cookies()
+        for cookie in recorded.get("cookies", []):
+            response.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain") or "",
+                path=cookie.get("path") or "/",
+            )
+        if not recorded.get("cookies"):
+            for name, value in headers:
+                if name.lower() == "set-cookie":
+                    for morsel in SimpleCookie(value).values():
+                        response.cookies.set(morsel.key, morsel.value)
+        response.content = _decode_body(recorded["content"])
+        return response
+
+
+_active: Optional[Cassette] = None
+
+
+def use(directory: Optional[str], mode: Optional[str] = None) -> None:
+    """
+    Start recording to or replaying from ``directory``; None turns it off.
+
+    Args:
+        directory (Optional[str]): The cassette directory.
+        mode (Optional[str]): ``record`` or ``replay``.
+    """
+    global _active
+    _active = Cassette(directory, mode or "replay") if directory else None
+
+
+def configure_from_env() -> None:
+    """Configure from ``LEGEND_CASSETTE_MODE`` and ``LEGEND_CASSETTE_DIR``."""
+    directory = os.environ.get("LEGEND_CASSETTE_DIR") or None
+    use(directory, os.environ.get("LEGEND_CASSETTE_MODE") or None)
+
+
+def active() -> Optional[Cassette]:
+    """The cassette in use, if any."""
+    return _active
+
+
+configure_from_env()
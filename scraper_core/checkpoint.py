@@ -0,0 +1,40 @@
+"""
+Checkpoints of interrupted runs.
+
+When a run is stopped early, the ids of the items it saved are written next
+to the day's output file. A restart on the same day reads them back and
+skips those items, so it only scrapes what is left instead of starting
+over; a run that finishes removes its checkpoint.
+"""
+
+import os
+from typing import Iterable, Set
+
+
+def path_for(output_file: str) -> str:
+    """The checkpoint that belongs to ``output_file``."""
+    return f"{output_file}.checkpoint"
+
+
+def load(path: str) -> Set[str]:
+    """The item ids saved by earlier runs; empty when there is no checkpoint."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def save(path: str, ids: Iterable[str]) -> None:
+    """Replace the checkpoint at ``path`` with ``ids``, atomically."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.writelines(f"{id}\n" for id in ids)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def clear(path: str) -> None:
+    """Remove the checkpoint at ``path``, if any."""
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,394 @@
+"""
+Per-site settings from ``legend.toml``.
+
+Which sites run, concurrency, sessions, proxies, rate limits, timeouts,
+time budgets, retries, hedging, page sizes, output and schedules live in one
+TOML file instead of constructor arguments, so throughput can be tuned per
+environment without touching code::
+
+    [defaults]
+    timeout = 120
+
+    [sites.kavak]
+    detail_concurrency = 200
+    rate_limit = 20
+
+Every site gets every setting: its own section, then ``[defaults]``, then
+the built-in values below, which match the checked-in ``legend.toml``.
+Unknown sections, unknown keys and bad values are rejected when the file
+is loaded.
+
+The file is ``legend.toml`` in the working directory, or the path in
+``LEGEND_CONFIG`` (inherited by workers). Without a file the built-in
+values apply. Schedules in ``LEGEND_SCHEDULES`` (set by ``scheduler.py
+--cron``) replace those of the file.
+"""
+
+import json
+import os
+import tomllib
+from datetime import timedelta, timezone
+from urllib.parse import urlsplit
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from . import registry
+from .cron import CronSpec
+
+DEFAULT_PATH = "legend.toml"
+# Schedule overrides as JSON, {site: cron expression}, set by the scheduler so
+# that the scraper processes it starts, forked or spawned, use them too.
+SCHEDULES_ENV = "LEGEND_SCHEDULES"
+OUTPUT_FORMATS = ("csv", "jsonl")
+SESSION_STRATEGIES = ("least_loaded", "round_robin")
+# Timezone of the schedule setting: Bangladesh time, UTC+6 all year.
+SCHEDULE_TZ = timezone(timedelta(hours=6), "Asia/Dhaka")
+PROXY_SCHEMES = ("http", "https", "socks4", "socks4a", "socks5", "socks5h")
+
+
+class ConfigError(ValueError):
+    """Raised for a configuration file that cannot be used."""
+
+
+class SiteConfig(NamedTuple):
+    """The settings of one site."""
+
+    # Whether app.py and the scheduler run the site.
+    enabled: bool
+    # Seconds a request may take to connect.
+    connect_timeout: float
+    # Seconds a request may take in all, connecting included, before it is
+    # abandoned.
+    timeout: float
+    # Browser fingerprint curl_cffi presents, or a list handed out to the
+    # site's sessions in turn.
+    impersonate: Union[str, List[str]]
+    # Sessions the site's requests are spread across.
+    sessions: int
+    # Requests each session sends at once at most.
+    session_connections: int
+    # How a request picks its session: least_loaded or round_robin.
+    session_strategy: str
+    # Proxy URLs the site's requests are spread across; empty to connect
+    # directly.
+    proxies: List[str]
+    # Requests each proxy carries at once at most.
+    proxy_concurrency: int
+    # Seconds a proxy with repeated failures is left out.
+    proxy_quarantine: float
+    # Requests per second to the site, 0 for no limit.
+    rate_limit: float
+    # Requests that may go out back to back before rate_limit applies.
+    rate_burst: int
+    # Extra attempts for a detail fetch that failed with a transient error.
+    retries: int
+    # Percentile of the host's recent latencies after which a GET is sent a
+    # second time, 0 for no hedging.
+    hedge_percentile: float
+    # Fraction of the site's requests that may be hedged.
+    hedge_budget: float
+    # Seconds in-flight items may take to finish after a stop is requested.
+    drain_timeout: float
+    # Seconds the whole run may take, 0 for no limit.
+    run_budget: float
+    # Share of run_budget after which no more listing pages are fetched.
+    listing_share: float
+    # Share of run_budget kept for flushing the output.
+    write_share: float
+    # Listing pages fetched at once.
+    listing_concurrency: int
+    # Detail pages fetched at once.
+    detail_concurrency: int
+    # Listings requested per page.
+    page_size: int
+    # Listing pages to fetch at most, 0 for all.
+    max_pages: int
+    output_format: str
+    output_dir: str
+    # Cron expression (minute hour day month weekday) for scheduler.py, in
+    # Bangladesh time.
+    schedule: str
+
+
+def _positive(value: Any) -> Optional[str]:
+    return None if value > 0 else "must be greater than 0"
+
+
+def _not_negative(value: Any) -> Optional[str]:
+    return None if value >= 0 else "must not be negative"
+
+
+def _percentile(value: Any) -> Optional[str]:
+    return None if 0 <= value < 100 else "must be 0 (off) or a percentile below 100"
+
+
+def _fraction(value: Any) -> Optional[str]:
+    return None if 0 <= value <= 1 else "must be between 0 and 1"
+
+
+def _share(value: Any) -> Optional[str]:
+    return None if 0 < value < 1 else "must be between 0 and 1 (exclusive)"
+
+
+def _profiles(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return None
+    if value and all(isinstance(profile, str) for profile in value):
+        return None
+    return "must be a profile name or a non-empty list of them"
+
+
+def _session_strategy(value: Any) -> Optional[str]:
+    if value in SESSION_STRATEGIES:
+        return None
+    return f"must be one of {SESSION_STRATEGIES}"
+
+
+def _proxies(value: Any) -> Optional[str]:
+    for url in value:
+        if not isinstance(url, str) or urlsplit(url).scheme not in PROXY_SCHEMES:
+            return f"must be a list of proxy URLs ({'/'.join(PROXY_SCHEMES)}://...)"
+    return None
+
+
+def _output_format(value: Any) -> Optional[str]:
+    return None if value in OUTPUT_FORMATS else f"must be one of {OUTPUT_FORMATS}"
+
+
+def _cron(value: Any) -> Optional[str]:
+    try:
+        CronSpec(value, timezone.utc)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+# Setting -> (accepted types, check returning an error message or None).
+SCHEMA: Dict[str, Tuple[Tuple[type, ...], Optional[Callable[[Any], Optional[str]]]]] = {
+    "enabled": ((bool,), None),
+    "connect_timeout": ((int, float), _positive),
+    "timeout": ((int, float), _positive),
+    "impersonate": ((str, list), _profiles),
+    "sessions": ((int,), _positive),
+    "session_connections": ((int,), _positive),
+    "session_strategy": ((str,), _session_strategy),
+    "proxies": ((list,), _proxies),
+    "proxy_concurrency": ((int,), _positive),
+    "proxy_quarantine": ((int, float), _not_negative),
+    "rate_limit": ((int, float), _not_negative),
+    "rate_burst": ((int,), _positive),
+    "retries": ((int,), _not_negative),
+    "hedge_percentile": ((int, float), _percentile),
+    "hedge_budget": ((int, float), _fraction),
+    "drain_timeout": ((int, float), _not_negative),
+    "run_budget": ((int, float), _not_negative),
+    "listing_share": ((int, float), _share),
+    "write_share": ((int, float), _share),
+    "listing_concurrency": ((int,), _positive),
+    "detail_concurrency": ((int,), _positive),
+    "page_size": ((int,), _positive),
+    "max_pages": ((int,), _not_negative),
+    "output_format": ((str,), _output_format),
+    "output_dir": ((str,), None),
+    "schedule": ((str,), _cron),
+}
+
+DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "connect_timeout": 10,
+    "timeout": 120,
+    "impersonate": "chrome",
+    "sessions": 1,
+    "session_connections": 10,
+    "session_strategy": "least_loaded",
+    "proxies": [],
+    "proxy_concurrency": 10,
+    "proxy_quarantine": 60,
+    "rate_limit": 0,
+    "rate_burst": 1,
+    "retries": 0,
+    "hedge_percentile": 0,
+    "hedge_budget": 0.05,
+    "drain_timeout": 30,
+    "run_budget": 0,
+    "listing_share": 0.5,
+    "write_share": 0.05,
+    "listing_concurrency": 25,
+    "detail_concurrency": 100,
+    "page_size": 25,
+    "max_pages": 0,
+    "output_format": "csv",
+    "output_dir": ".",
+    "schedule": "0 14 * * *",
+}
+
+SITE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "kavak": {
+        "detail_concurrency": 200,
+        "impersonate": ["chrome", "edge", "safari"],
+        "sessions": 4,
+        "session_connections": 50,
+    },
+    "automall": {"page_size": 28, "hedge_percentile": 95},
+    "cars24": {"max_pages": 50, "schedule": "0 * * * *", "run_budget": 3000},
+    "dubizzle": {},
+    # Unfinished: run it explicitly or enable it in legend.toml.
+    "nxtcarsuae": {"enabled": False},
+}
+
+
+def _check(section: str, values: Any) -> Dict[str, Any]:
+    if not isinstance(values, dict):
+        raise ConfigError(f"[{section}] must be a table")
+    for key, value in values.items():
+        if key not in SCHEMA:
+            raise ConfigError(
+                f"[{section}] unknown setting {key!r}; expected one of {sorted(SCHEMA)}"
+            )
+        types, check = SCHEMA[key]
+        # TOML booleans are ints to isinstance(); never accept them as numbers.
+        if (isinstance(value, bool) and bool not in types) or not isinstance(
+            value, types
+        ):
+            names = " or ".join(t.__name__ for t in types)
+            raise ConfigError(f"[{section}] {key} must be {names}, got {value!r}")
+        problem = check(value) if check else None
+        if problem:
+            raise ConfigError(f"[{section}] {key}: {problem}, got {value!r}")
+    return values
+
+
+class Config:
+    """Validated settings for every site."""
+
+    def __init__(self, data: Dict[str, Any], path: Optional[str] = None) -> None:
+        self.path = path
+        unknown = set(data) - {"defaults", "sites"}
+        if unknown:
+            raise ConfigError(
+                f"Unknown section(s) {sorted(unknown)}; expected [defaults] and [sites.*]"
+            )
+        self.defaults = _check("defaults", data.get("defaults", {}))
+        sections = data.get("sites", {})
+        if not isinstance(sections, dict):
+            raise ConfigError("[sites] must hold one table per site")
+        known = registry.names()
+        for site, values in sections.items():
+            if site not in known:
+                raise ConfigError(
+                    f"Unknown site [sites.{site}]; expected one of {known}"
+                )
+            _check(f"sites.{site}", values)
+        self.sections: Dict[str, Dict[str, Any]] = sections
+        self.sites: Dict[str, SiteConfig] = {}
+        # Settings that depend on each other may come from different sections,
+        # so they are checked on every site's merged settings.
+        for site in known:
+            self.site(site)
+
+    def site(self, name: str) -> SiteConfig:
+        """The settings of site ``name``."""
+        if name not in self.sites:
+            settings = SiteConfig(
+                **{
+                    **DEFAULTS,
+                    **SITE_DEFAULTS.get(name, {}),
+                    **self.defaults,
+                    **self.sections.get(name, {}),
+                }
+            )
+            # The detail phase runs between the two shares of the budget.
+            if settings.listing_share + settings.write_share >= 1:
+                raise ConfigError(
+                    f"[sites.{name}] listing_share + write_share must be below 1,"
+                    f" got {settings.listing_share} + {settings.write_share}"
+                )
+            self.sites[name] = settings
+        return self.sites[name]
+
+    def override_schedules(self, schedules: Dict[str, str]) -> None:
+        """
+        Replace the ``schedule`` of some sites, as ``scheduler.py --cron`` does.
+
+        Raises:
+            ConfigError: For an unknown site or an invalid cron expression.
+        """
+        known = registry.names()
+        for site, expression in schedules.items():
+            if site not in known:
+                raise ConfigError(f"Unknown site {site!r}; expected one of {known}")
+            _check(f"sites.{site}", {"schedule": expression})
+            self.sections[site] = {
+                **self.sections.get(site, {}),
+                "schedule": expression,
+            }
+            self.sites.pop(site, None)
+
+    def enabled_sites(self) -> List[str]:
+        """The registered sites whose ``enabled`` setting is on."""
+        return [site for site in registry.names() if self.site(site).enabled]
+
+
+def load(path: Optional[str] = None) -> Config:
+    """
+    Read and validate a configuration file.
+
+    Args:
+        path (Optional[str]): The file; defaults to ``LEGEND_CONFIG`` or
+            ``legend.toml``, and to the built-in values when that does not exist.
+
+    Raises:
+        ConfigError: If the file is not valid TOML or fails validation.
+    """
+    explicit = path or os.environ.get("LEGEND_CONFIG")
+    path = explicit or DEFAULT_PATH
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            try:
+                data = tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ConfigError(f"{path}: {e}") from None
+        try:
+            config = Config(data, path)
+        except ConfigError as e:
+            raise ConfigError(f"{path}: {e}") from None
+    elif explicit:
+        raise ConfigError(f"Configuration file not found: {path}")
+    else:
+        config = Config({})
+    schedules = os.environ.get(SCHEDULES_ENV)
+    if schedules:
+        try:
+            overrides = json.loads(schedules)
+        except ValueError as e:
+            raise ConfigError(f"{SCHEDULES_ENV}: {e}") from None
+        if not isinstance(overrides, dict):
+            raise ConfigError(f"{SCHEDULES_ENV} must map sites to cron expressions")
+        config.override_schedules(overrides)
+    return config
+
+
+_config: Optional[Config] = None
+
+
+def get() -> Config:
+    """The configuration of this process, loaded on first use."""
+    global _config
+    if _config is None:
+        _config = load()
+    return _config
+
+
+def use(config: Optional[Config]) -> None:
+    """Replace the configuration of this process; None reloads it on next use."""
+    global _config
+    _config = config
+
+
+def site(name: str) -> SiteConfig:
+    """The settings of site ``name`` in this process's configuration."""
+    return get().site(name)
+
+
+def enabled_sites() -> List[str]:
+    """The sites this process's configuration runs."""
+    return get().enabled_sites()
@@ -0,0 +1,151 @@
+"""
+Minimal five-field cron expressions.
+
+Supports ``*``, numbers, ranges (``1-5``), lists (``1,15``), steps
+(``*/15``, ``8-18/2``) and the ``@hourly``/``@daily``/``@weekly``/
+``@monthly`` shortcuts. Day-of-month and day-of-week follow the usual cron
+rule: when both are restricted, a day matching either one fires.
+"""
+
+from datetime import datetime, timedelta, tzinfo
+from typing import FrozenSet, Optional, Tuple
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+# (name, lowest, highest) for each field, in expression order.
+FIELDS: Tuple[Tuple[str, int, int], ...] = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+
+
+def _parse_field(text: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Invalid step in cron {name} field: {text!r}")
+            step = int(step_text)
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            if not (start_text.isdigit() and end_text.isdigit()):
+                raise ValueError(f"Invalid range in cron {name} field: {text!r}")
+            start, end = int(start_text), int(end_text)
+        elif part.isdigit():
+            start = int(part)
+            end = high if step > 1 else start
+        else:
+            raise ValueError(f"Invalid cron {name} field: {text!r}")
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron {name} field {text!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSpec:
+    """A parsed cron expression evaluated in a fixed timezone."""
+
+    def __init__(self, expression: str, tz: tzinfo) -> None:
+        self.expression = expression.strip()
+        self.tz = tz
+
+        fields = ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(
+                f"Cron expression needs 5 fields, got {len(fields)}: {expression!r}"
+            )
+
+        parsed = [
+            _parse_field(text, name, low, high)
+            for text, (name, low, high) in zip(fields, FIELDS)
+        ]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # Cron allows both 0 and 7 for Sunday; Python's weekday() has Monday=0.
+        self.weekdays = frozenset((day - 1) % 7 for day in weekdays)
+        # As in cron, a field starting with "*" (e.g. "*/2") does not restrict
+        # the day, so the two day fields are only ORed when neither does.
+        self.day_restricted = not fields[2].startswith("*")
+        self.weekday_restricted = not fields[4].startswith("*")
+
+    def __repr__(self) -> str:
+        return f"CronSpec({self.expression!r})"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = moment.weekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, after: datetime) -> datetime:
+        """
+        Return the first firing time strictly after ``after``.
+
+        Args:
+            after (datetime): A timezone-aware datetime.
+
+        Returns:
+            datetime: The next firing time, aware and in the spec's timezone.
+        """
+        local = after.astimezone(self.tz).replace(tzinfo=None)
+        moment = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = datetime(moment.year + year, month + 1, 1)
+                continue
+            if not self._day_matches(moment):
+                moment = datetime(moment.year, moment.month, moment.day) + timedelta(
+                    days=1
+                )
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            localize = getattr(self.tz, "localize", None)
+            return localize(moment) if localize else moment.replace(tzinfo=self.tz)
+
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def fires_more_than_daily(self) -> bool:
+        """Whether the expression fires more than once on the days it fires."""
+        return len(self.minutes) * len(self.hours) > 1
+
+    def last_at_or_before(self, moment: datetime) -> Optional[datetime]:
+        """
+        Return the latest firing time at or before ``moment``, looking back
+        one day at most.
+
+        Args:
+            moment (datetime): A timezone-aware datetime.
+
+        Returns:
+            Optional[datetime]: The firing time, or None if there was none
+            in the day before ``moment``.
+        """
+        latest = None
+        fire = self.next_after(moment - timedelta(days=1))
+        while fire <= moment:
+            latest = fire
+            fire = self.next_after(fire)
+        return latest
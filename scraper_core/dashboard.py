@@ -0,0 +1,277 @@
+"""
+Live multi-site progress dashboard.
+
+Every scraper process runs a :class:`Publisher` that puts a small snapshot
+of its :mod:`scraper_core.stats` counters on a queue whenever they change,
+at most twice a second. The parent process reads that queue and renders a
+single ``rich.Live`` table with, per site: phase, pages, records/sec, error
+rate and ETA. A site that has not made progress for a minute is flagged as
+stalled.
+
+The channel is a ``multiprocessing.Queue`` handed to pool workers with
+:func:`attach`, or a plain ``queue.SimpleQueue`` when every site runs in
+one process.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from . import stats
+
+if TYPE_CHECKING:
+    from rich.live import Live
+    from rich.table import Table
+
+PUBLISH_INTERVAL = 0.5
+# Records/sec is measured over this many seconds of updates.
+RATE_WINDOW = 10.0
+# A running site without new pages or records for this long is stalled.
+STALL_AFTER = 60.0
+FINISHED = ("done", "failed", "stopped", "partial")
+
+
+def progress_message(site: str) -> Dict[str, Any]:
+    """The counters of ``site`` that the dashboard shows, as a picklable dict."""
+    site_stats = stats.for_site(site)
+    return {
+        "site": site,
+        "phase": site_stats.phase,
+        "pages": site_stats.pages,
+        "expected_pages": site_stats.expected_pages,
+        "records": site_stats.successes,
+        "failed": sum(site_stats.failures.values()),
+        "expected": site_stats.expected,
+        "requests": site_stats.requests,
+        "errors": site_stats.errors,
+    }
+
+
+class Publisher:
+    """Puts changed per-site counters of this process on ``channel``."""
+
+    def __init__(self, channel: Any, interval: float = PUBLISH_INTERVAL) -> None:
+        self.channel = channel
+        self.interval = interval
+        self._sent: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="dashboard-publisher", daemon=True
+        )
+
+    def start(self) -> "Publisher":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.publish()
+
+    def publish(self) -> None:
+        for site in stats.sites():
+            message = progress_message(site)
+            if message != self._sent.get(site):
+                self._sent[site] = message
+                self.channel.put(message)
+
+    def stop(self, failed: bool = False) -> None:
+        """Mark every site of this process finished and send a last update."""
+        self._stop.set()
+        self._thread.join()
+        for site in stats.sites():
+            site_stats = stats.for_site(site)
+            if site_stats.phase not in FINISHED:
+                site_stats.set_phase("failed" if failed else "done")
+        self.publish()
+
+
+_channel: Any = None
+
+
+def attach(channel: Any) -> None:
+    """Publish this process's progress to ``channel``, e.g. from a pool initializer."""
+    global _channel
+    _channel = channel
+
+
+@contextmanager
+def publishing(channel: Any = None) -> Iterator[None]:
+    """
+    Publish progress while the block runs, if a channel is given or attached.
+
+    Sites whose scraper is still running when the block raises are marked
+    failed.
+    """
+    channel = channel if channel is not None else _channel
+    if channel is None:
+        yield
+        return
+    publisher = Publisher(channel).start()
+    try:
+        yield
+    except BaseException:
+        publisher.stop(failed=True)
+        raise
+    publisher.stop()
+
+
+class _SiteRow:
+    """What the dashboard knows about one site."""
+
+    def __init__(self, site: str) -> None:
+        self.message: Dict[str, Any] = {"site": site, "phase": "waiting"}
+        self.progress: Tuple[int, int] = (0, 0)
+        self.last_progress = time.monotonic()
+        self.samples: Deque[Tuple[float, int]] = deque()
+
+    def update(self, message: Dict[str, Any], now: float) -> None:
+        done = message["records"] + message["failed"]
+        if (message["pages"], done) != self.progress:
+            self.progress = (message["pages"], done)
+            self.last_progress = now
+        self.message = message
+        self.samples.append((now, done))
+
+    def rate(self, now: float) -> float:
+        """Records finished per second over the last ``RATE_WINDOW`` seconds."""
+        while len(self.samples) > 1 and self.samples[1][0] <= now - RATE_WINDOW:
+            self.samples.popleft()
+        if len(self.samples) < 2:
+            return 0.0
+        first_time, first_done = self.samples[0]
+        return (self.samples[-1][1] - first_done) / max(now - first_time, 1e-6)
+
+
+class Dashboard:
+    """
+    Renders progress messages from ``channel`` as a live table.
+
+    Use as a context manager around the run; log output written to stderr
+    meanwhile is printed above the table.
+    """
+
+    def __init__(
+        self, channel: Any, sites: List[str], refresh_per_second: float = 2
+    ) -> None:
+        self.channel = channel
+        self.rows = {site: _SiteRow(site) for site in sites}
+        self.refresh_per_second = refresh_per_second
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._read, name="dashboard", daemon=True
+        )
+        self._live: Optional["Live"] = None
+
+    def __enter__(self) -> "Dashboard":
+        # Only the parent draws; worker processes never import rich.
+        from rich.live import Live
+
+        self._live = Live(
+            self.render(),
+            refresh_per_second=self.refresh_per_second,
+            redirect_stderr=True,
+        )
+        self._live.start()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._drain()
+        self._live.update(self.render(), refresh=True)
+        self._live.stop()
+
+    def _read(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.handle(self.channel.get(timeout=1 / self.refresh_per_second))
+            except queue.Empty:
+                pass
+            self._live.update(self.render())
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                self.handle(self.channel.get(timeout=0.1))
+            except queue.Empty:
+                return
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        site = message["site"]
+        row = self.rows.get(site)
+        if row is None:
+            row = self.rows[site] = _SiteRow(site)
+        row.update(message, time.monotonic())
+
+    def render(self) -> "Table":
+        from rich.table import Table
+        from rich.text import Text
+
+        now = time.monotonic()
+        table = Table(title="Legend scrapers", title_justify="left")
+        table.add_column("Site")
+        table.add_column("Phase")
+        table.add_column("Pages", justify="right")
+        table.add_column("Records", justify="right")
+        table.add_column("Rec/s", justify="right")
+        table.add_column("Errors", justify="right")
+        table.add_column("ETA", justify="right")
+
+        for site, row in self.rows.items():
+            message = row.message
+            phase = Text(message["phase"])
+            if message["phase"] == "failed":
+                phase.stylize("bold red")
+            elif message["phase"] == "done":
+                phase.stylize("green")
+            elif message["phase"] in ("stopped", "partial"):
+                phase.stylize("yellow")
+            elif "records" in message and now - row.last_progress > STALL_AFTER:
+                phase.append(
+                    f" (stalled {now - row.last_progress:.0f}s)", style="bold red"
+                )
+            if "records" not in message:
+                table.add_row(site, phase, *["-"] * 5)
+                continue
+
+            finished = message["phase"] in FINISHED
+            rate = 0.0 if finished else row.rate(now)
+            done = message["records"] + message["failed"]
+            table.add_row(
+                site,
+                phase,
+                _of(message["pages"], message["expected_pages"]),
+                _of(message["records"], message["expected"]),
+                "-" if finished else f"{rate:.1f}",
+                _errors(message),
+                _eta(done, message["expected"], rate),
+            )
+        return table
+
+
+def _of(done: int, total: Optional[int]) -> str:
+    # Scrapers that stop on an empty page fetch a few past the total.
+    return f"{done:,}/{total:,}" if total and done <= total else f"{done:,}"
+
+
+def _errors(message: Dict[str, Any]) -> str:
+    """Failed records as a share of finished ones, else failed requests."""
+    done = message["records"] + message["failed"]
+    if done:
+        return f"{message['failed']:,} ({message['failed'] / done:.1%})"
+    if message["requests"]:
+        return (
+            f"{message['errors']:,} req ({message['errors'] / message['requests']:.1%})"
+        )
+    return "-"
+
+
+def _eta(done: int, expected: Optional[int], rate: float) -> str:
+    if not expected or done >= expected or rate <= 0:
+        return "-"
+    return str(timedelta(seconds=round((expected - done) / rate)))
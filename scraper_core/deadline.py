@@ -0,0 +1,69 @@
+"""
+Time budgets for a run and its phases.
+
+A site with a ``run_budget`` gets a :class:`Deadline` for the whole run and
+one for each phase: listing gets the first ``listing_share`` of the budget,
+detail fetches run until the last ``write_share`` is left, which is kept
+for flushing the output. The engine makes the phase's deadline current for
+the code running in it, and :func:`timeouts` then shortens the timeouts of
+every request so that none outlives it.
+"""
+
+import contextvars
+import time
+from typing import Optional, Tuple
+
+# A deadline with less time left than this counts as passed: no request is
+# worth starting.
+MIN_REMAINING = 0.1
+
+_current: "contextvars.ContextVar[Optional[Deadline]]" = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+class Deadline:
+    """A point on the monotonic clock by which some work must be done."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.at - time.monotonic())
+
+    def passed(self) -> bool:
+        return self.remaining() < MIN_REMAINING
+
+
+def current() -> Optional[Deadline]:
+    """The deadline of the phase the calling task runs in, if any."""
+    return _current.get()
+
+
+def set_current(deadline: Optional[Deadline]) -> None:
+    """Make ``deadline`` apply to the calling task and the tasks it starts."""
+    _current.set(deadline)
+
+
+def split(connect: float, total: float) -> Tuple[float, float]:
+    """
+    The ``(connect, read)`` timeout pair for a request that may take
+    ``total`` seconds in all.
+
+    curl gives a request ``connect + read`` seconds in all and takes a
+    timeout of 0 as no limit, so connecting gets at most half of ``total``
+    and reading the rest, never less than :data:`MIN_REMAINING`.
+    """
+    total = max(total, 2 * MIN_REMAINING)
+    connect = min(connect, total / 2)
+    return connect, total - connect
+
+
+def timeouts(connect: float, total: float) -> Tuple[float, float]:
+    """The :func:`split` timeouts for a request, cut to the current deadline."""
+    deadline = _current.get()
+    if deadline is not None:
+        total = min(total, deadline.remaining())
+    return split(connect, total)
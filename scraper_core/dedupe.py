@@ -0,0 +1,98 @@
+"""
+Recognising repeated work.
+
+Listings can show the same car twice, e.g. when the inventory shifts
+between two offset-based pages. :class:`SeenSet` remembers what a run has
+already taken on in 8 bytes of fingerprint per entry, and
+:func:`request_key` names a request by its normalised method, URL, headers
+and body so that identical requests in flight can share one response (see
+:func:`scraper_core.http.request`).
+"""
+
+import hashlib
+import json
+from typing import Any, Mapping, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def fingerprint(value: str) -> int:
+    """A 64-bit hash of ``value``; collisions are negligible below ~10^8 values."""
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class SeenSet:
+    """A set of strings that stores only their fingerprints."""
+
+    def __init__(self) -> None:
+        self._fingerprints: Set[int] = set()
+
+    def add(self, value: str) -> bool:
+        """Remember ``value``; False if it was seen already."""
+        key = fingerprint(value)
+        if key in self._fingerprints:
+            return False
+        self._fingerprints.add(key)
+        return True
+
+    def __contains__(self, value: str) -> bool:
+        return fingerprint(value) in self._fingerprints
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+
+def content_id(item: Mapping[str, Any]) -> str:
+    """
+    An id for a listing that has none of its own, from its whole content, so
+    that two id-less listings are only taken for one when they are the same.
+    """
+    content = json.dumps(item, sort_keys=True, default=str)
+    return f"content-{fingerprint(content):016x}"
+
+
+def normalize_url(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    ``url`` with ``params`` merged into its query, the query sorted, scheme
+    and host lower-cased and the fragment dropped.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(key), str(value)) for key, value in params.items())
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path or "/",
+            urlencode(sorted(query)),
+            "",
+        )
+    )
+
+
+def request_key(method: str, url: str, kwargs: Mapping[str, Any]) -> str:
+    """
+    What identifies a request for coalescing: method, normalised URL,
+    headers and body (``json``, ``data`` or ``content``). Headers count
+    because some APIs page with them, e.g. Automall's ``paging-info``.
+    """
+    body: Any = kwargs.get("json")
+    if body is not None:
+        body = json.dumps(body, sort_keys=True, default=str)
+    else:
+        body = kwargs.get("data", kwargs.get("content"))
+        if isinstance(body, Mapping):
+            body = urlencode(sorted((str(k), str(v)) for k, v in body.items()))
+        elif isinstance(body, bytes):
+            body = body.decode("latin-1")
+    headers = kwargs.get("headers") or {}
+    return "\n".join(
+        (
+            method.upper(),
+            normalize_url(url, kwargs.get("params")),
+            urlencode(sorted((str(k).lower(), str(v)) for k, v in headers.items())),
+            str(body or ""),
+        )
+    )
@@ -0,0 +1,464 @@
+"""
+Runs a scraper's discover, fetch and extract phases.
+
+Every site goes through the same pipeline, so concurrency, retries, stats,
+metrics, tracing and output behave the same everywhere:
+
+- items from :meth:`~scraper_core.base.BaseScraper.discover` are processed
+  as they arrive, at most the scraper's ``concurrency`` at a time. Discovery
+  waits while that window is full, so memory stays proportional to the
+  concurrency rather than to the site's inventory, and listing pages are
+  fetched while earlier items' detail pages are. An item listed twice is
+  scraped once;
+- cars that are new or whose listing changed since the last run (see
+  :mod:`scraper_core.priority`) are fetched as they are listed, unchanged
+  ones only after the listing is done, so a run cut short has spent its
+  time on what changed;
+- each item is fetched, retrying :class:`~scraper_core.base.ScrapeError`
+  failures marked retryable up to the site's ``retries`` setting;
+- the payload is extracted and the record written to every sink.
+
+On SIGINT or SIGTERM (see :mod:`scraper_core.shutdown`) discovery stops,
+the items in flight get the site's ``drain_timeout`` to finish, the sinks
+are flushed and the ids of the saved items are checkpointed, so that the
+next run of the day skips them.
+
+A site with a ``run_budget`` is held to it the same way (see
+:mod:`scraper_core.deadline`): discovery ends when the listing share of the
+budget is spent, and the items found until then are scraped until only the
+write share is left. What was saved is kept and checkpointed, and the site
+is reported as ``partial`` instead of running past its slot.
+
+:func:`run` does all of it in one process; :func:`enqueue` and :func:`work`
+split discovery and the per-item work across a
+:class:`~scraper_core.workqueue.WorkQueue`.
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Union
+
+from . import (
+    checkpoint,
+    deadline,
+    dedupe,
+    metrics,
+    priority,
+    shutdown,
+    stats,
+    tracing,
+    workqueue,
+)
+from .base import BaseScraper, ScrapeError
+from .output import Sink
+from .workqueue import WorkQueue
+
+# Seconds before the first retry of an item, doubled for each further one.
+RETRY_BACKOFF = 1.0
+# Jobs handed to the work queue per enqueue call.
+ENQUEUE_BATCH = 500
+
+
+async def _fetch(scraper: BaseScraper, item: Any) -> Any:
+    attempt = 0
+    while True:
+        try:
+            return await scraper.fetch(item)
+        except ScrapeError as e:
+            if not e.retryable or attempt >= scraper.settings.retries:
+                raise
+            # Leave the time to items that can still finish.
+            limit = deadline.current()
+            if limit is not None and limit.remaining() < RETRY_BACKOFF * 2**attempt:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+        attempt += 1
+
+
+async def process(scraper: BaseScraper, item: Any, sinks: List[Sink]) -> bool:
+    """
+    Fetch and extract one item and write its record to ``sinks``.
+
+    Failures are counted and logged, never raised.
+
+    Returns:
+        bool: Whether a record was written.
+    """
+    site_stats = stats.for_site(scraper.name)
+    detail = scraper.detail_pages
+    span = tracing.span(f"{scraper.name}.detail") if detail else None
+    try:
+        with span or contextlib.nullcontext():
+            payload = await _fetch(scraper, item)
+            parse_started = time.perf_counter()
+            try:
+                record = scraper.extract(payload)
+            except ScrapeError:
+                raise
+            except Exception as e:
+                raise ScrapeError(
+                    f"Could not extract {scraper.item_id(item)}: {e}", "parse_error"
+                ) from e
+            parse_seconds = time.perf_counter() - parse_started
+            metrics.PARSE_TIME.observe(parse_seconds, site=scraper.name)
+            tracing.record(f"{scraper.name}.parse", parse_seconds)
+    except ScrapeError as e:
+        site_stats.record_failure(e.reason, detail=detail)
+        scraper.log.warning("%s", e)
+        return False
+    except Exception as e:
+        site_stats.record_failure(type(e).__name__, detail=detail)
+        scraper.log.warning("Failed to scrape %s: %s", scraper.item_id(item), e)
+        return False
+
+    for sink in sinks:
+        await sink.send(record)
+    metrics.RECORDS.inc(site=scraper.name)
+    site_stats.record_success(detail=detail)
+    return True
+
+
+async def _close(sinks: List[Sink]) -> None:
+    # Closing waits for the sinks' queued writes; keep the loop running.
+    for sink in sinks:
+        await asyncio.to_thread(sink.close)
+
+
+async def _iterate(
+    items: Union[Iterable[Any], AsyncIterator[Any]],
+) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _stop(until: Optional[deadline.Deadline]) -> None:
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(shutdown.wait(), until.remaining() if until else None)
+
+
+async def _until_stopped(
+    tasks: Set["asyncio.Future[Any]"], until: Optional[deadline.Deadline] = None
+) -> bool:
+    """
+    Wait for ``tasks`` to finish; True if a stop was requested or ``until``
+    passed first.
+    """
+    stop = asyncio.ensure_future(_stop(until))
+    try:
+        while tasks and not stop.done():
+            await asyncio.wait({*tasks, stop}, return_when=asyncio.FIRST_COMPLETED)
+            tasks = {task for task in tasks if not task.done()}
+    finally:
+        stop.cancel()
+    return bool(tasks)
+
+
+async def run(
+    scraper: BaseScraper,
+    items: Optional[Iterable[Any]] = None,
+    sinks: Optional[List[Sink]] = None,
+    budget: Optional[float] = None,
+    partial: bool = False,
+) -> Dict[str, int]:
+    """
+    Scrape every item of ``scraper``'s site.
+
+    Items are scraped while discovery goes on, in a window of
+    ``scraper.concurrency``; only counters are kept. A listing failure stops
+    discovery; the items found until then are still scraped and the site is
+    reported as failed.
+
+    Items saved by an earlier, interrupted run of the day are skipped. When
+    this run is stopped, runs out of time or fails to list everything, the
+    saved ids are checkpointed for the next one; a complete run removes the
+    checkpoint.
+
+    Args:
+        scraper (BaseScraper): The site, entered as a context manager.
+        items (Optional[Iterable[Any]]): Items to scrape instead of
+            discovering them, e.g. one shard of a listing.
+        sinks (Optional[List[Sink]]): Record destinations; defaults to
+            ``scraper.sinks()``. Closed when the run ends.
+        budget (Optional[float]): Seconds the run may take; defaults to the
+            site's ``run_budget`` setting, 0 for no limit.
+        partial (bool): Whether ``items`` is only part of the listing, e.g.
+            cut short by the budget; the run is then checkpointed and
+            reported as partial even if every item is scraped.
+
+    Returns:
+        Dict[str, int]: The number of records saved and items failed.
+    """
+    shutdown.install()
+    site_stats = stats.for_site(scraper.name)
+    sinks = scraper.sinks() if sinks is None else sinks
+    counts = {"saved": 0, "failed": 0}
+    window = asyncio.Semaphore(scraper.concurrency)
+    in_flight: Set["asyncio.Task[None]"] = set()
+    errors: List[BaseException] = []
+    halted: Optional[ScrapeError] = None
+    out_of_time = partial
+    seen = dedupe.SeenSet()
+    duplicates = 0
+    # Given items, e.g. a shard's, were put in order by whoever listed them.
+    index = unchanged = None
+    if items is None and scraper.detail_pages:
+        index = priority.ListingIndex(scraper.listing_index)
+        unchanged = priority.Spool()
+    ranks = [0, 0, 0]
+    listed_all = False
+
+    settings = scraper.settings
+    budget = settings.run_budget if budget is None else budget
+    run_deadline = listing_deadline = details_deadline = None
+    if budget:
+        run_deadline = deadline.Deadline(budget)
+        details_deadline = deadline.Deadline(budget * (1 - settings.write_share))
+        # Given items are listed already.
+        if items is None:
+            listing_deadline = deadline.Deadline(budget * settings.listing_share)
+
+    done = checkpoint.load(scraper.checkpoint_file)
+    if done:
+        scraper.log.info("Resuming: skipping %d items saved earlier today.", len(done))
+
+    async def scrape(item: Any, item_id: str) -> None:
+        deadline.set_current(details_deadline)
+        try:
+            saved = await process(scraper, item, sinks)
+            counts["saved" if saved else "failed"] += 1
+            if saved:
+                done.add(item_id)
+                if index is not None:
+                    index.mark_saved(item_id)
+        finally:
+            window.release()
+
+    def finished(task: "asyncio.Task[None]") -> None:
+        in_flight.discard(task)
+        metrics.QUEUE_DEPTH.set(len(in_flight), site=scraper.name)
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    async def dispatch(item: Any, item_id: str, dispatched: int) -> None:
+        await window.acquire()
+        if scraper.batch_pause and dispatched:
+            if dispatched % scraper.concurrency == 0:
+                await asyncio.sleep(scraper.batch_pause)
+        task = asyncio.create_task(scrape(item, item_id))
+        in_flight.add(task)
+        task.add_done_callback(finished)
+        metrics.QUEUE_DEPTH.set(len(in_flight), site=scraper.name)
+
+    async def feed() -> None:
+        nonlocal halted, out_of_time, duplicates, listed_all
+        deadline.set_current(listing_deadline)
+        dispatched = 0
+        try:
+            async for item in _iterate(scraper.discover() if items is None else items):
+                if errors:
+                    break
+                if listing_deadline is not None and listing_deadline.passed():
+                    out_of_time = True
+                    scraper.log.warning(
+                        "Listing share of the %.0fs budget spent; scraping the"
+                        " items found so far.",
+                        budget,
+                    )
+                    break
+                item_id = scraper.item_id(item)
+                if index is not None:
+                    rank = index.rank(item_id, scraper.listing_signature(item))
+                if item_id in done:
+                    if index is not None:
+                        index.mark_saved(item_id)
+                    continue
+                if not seen.add(item_id):
+                    duplicates += 1
+                    continue
+                if index is not None:
+                    ranks[rank] += 1
+                    if rank == priority.UNCHANGED:
+                        unchanged.append(item)
+                        continue
+                await dispatch(item, item_id, dispatched)
+                dispatched += 1
+            else:
+                listed_all = True
+        except ScrapeError as e:
+            # A page cut off by the deadline fails like any timeout.
+            if listing_deadline is not None and listing_deadline.passed():
+                out_of_time = True
+                scraper.log.warning("Listing stopped by the run budget: %s", e)
+            else:
+                halted = e
+                scraper.log.error("Halting discovery: %s", e)
+
+        if not unchanged:
+            return
+        site_stats.set_phase("details")
+        scraper.log.info(
+            "Listed %d new, %d changed and %d unchanged items;"
+            " fetching the unchanged ones last.",
+            *ranks,
+        )
+        for item in unchanged:
+            if errors:
+                break
+            await dispatch(item, scraper.item_id(item), dispatched)
+            dispatched += 1
+
+    site_stats.set_phase("listing")
+    feeder = asyncio.ensure_future(feed())
+    try:
+        stopped = await _until_stopped({feeder}, details_deadline)
+        if stopped:
+            feeder.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await feeder
+        else:
+            feeder.result()
+
+        site_stats.set_phase("details" if scraper.detail_pages else "writing")
+        stopped = stopped or await _until_stopped(set(in_flight), details_deadline)
+        if stopped and not shutdown.requested():
+            out_of_time = True
+            scraper.log.warning(
+                "Run budget of %.0fs spent; saving what is done.", budget
+            )
+        if stopped and in_flight:
+            drain_timeout = settings.drain_timeout
+            if run_deadline is not None:
+                drain_timeout = min(drain_timeout, run_deadline.remaining())
+            scraper.log.warning(
+                "Draining %d in-flight items for up to %.0fs.",
+                len(in_flight),
+                drain_timeout,
+            )
+            await asyncio.wait(set(in_flight), timeout=drain_timeout)
+    finally:
+        feeder.cancel()
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        await _close(sinks)
+        if unchanged is not None:
+            unchanged.close()
+
+    if errors:
+        raise errors[0]
+    if duplicates:
+        scraper.log.info("Skipped %d items listed more than once.", duplicates)
+    if stopped or out_of_time or halted is not None:
+        checkpoint.save(scraper.checkpoint_file, done)
+        scraper.log.info(
+            "Checkpointed %d saved items to %s.", len(done), scraper.checkpoint_file
+        )
+    else:
+        checkpoint.clear(scraper.checkpoint_file)
+    if index is not None:
+        index.save(listed_all)
+    if halted is not None:
+        site_stats.fail(f"{halted.reason}: {halted}")
+    elif stopped and shutdown.requested():
+        site_stats.set_phase("stopped")
+    elif out_of_time:
+        site_stats.set_phase("partial")
+    scraper.log.info(
+        "Finished: %d records saved, %d failed.", counts["saved"], counts["failed"]
+    )
+    return counts
+
+
+async def enqueue(scraper: BaseScraper, queue: WorkQueue) -> Dict[str, Any]:
+    """
+    Discover every item and add one job per item to ``queue``.
+
+    With a ``run_budget``, discovery ends after its listing share.
+
+    Returns:
+        Dict[str, Any]: ``status``, ``message`` and the number of new jobs
+        ``enqueued``.
+    """
+    shutdown.install()
+    added = discovered = 0
+    jobs = []
+    halted: Optional[ScrapeError] = None
+    listing_deadline = None
+    if scraper.settings.run_budget:
+        listing_deadline = deadline.Deadline(
+            scraper.settings.run_budget * scraper.settings.listing_share
+        )
+        deadline.set_current(listing_deadline)
+    try:
+        async for item in scraper.discover():
+            if shutdown.requested():
+                break
+            if listing_deadline is not None and listing_deadline.passed():
+                scraper.log.warning("Listing share of the run budget spent.")
+                break
+            jobs.append((scraper.item_id(item), item))
+            discovered += 1
+            if len(jobs) >= ENQUEUE_BATCH:
+                added += queue.enqueue(jobs)
+                jobs = []
+    except ScrapeError as e:
+        if listing_deadline is not None and listing_deadline.passed():
+            scraper.log.warning("Listing stopped by the run budget: %s", e)
+        else:
+            halted = e
+            scraper.log.error("Halting discovery: %s", e)
+    if jobs:
+        added += queue.enqueue(jobs)
+
+    if halted is not None:
+        return {"status": False, "message": str(halted), "enqueued": added}
+    scraper.log.info("Enqueued %d new jobs (%d items).", added, discovered)
+    return {"status": True, "message": "Items enqueued.", "enqueued": added}
+
+
+async def work(scraper: BaseScraper, queue: WorkQueue) -> Dict[str, int]:
+    """
+    Lease jobs from ``queue`` and scrape them until it is drained.
+
+    After a stop request, or once the ``run_budget`` is spent but for its
+    write share, the worker finishes its current batch and leases no more;
+    the queue keeps the rest for the next worker.
+
+    Returns:
+        Dict[str, int]: Number of jobs this worker acked and nacked.
+    """
+    shutdown.install()
+    stats.for_site(scraper.name).set_phase(
+        "details" if scraper.detail_pages else "writing"
+    )
+    sinks = scraper.sinks()
+    details_deadline = None
+    if scraper.settings.run_budget:
+        details_deadline = deadline.Deadline(
+            scraper.settings.run_budget * (1 - scraper.settings.write_share)
+        )
+        deadline.set_current(details_deadline)
+
+    async def handle(item: Any) -> bool:
+        return await process(scraper, item, sinks)
+
+    def stop() -> bool:
+        if details_deadline is not None and details_deadline.passed():
+            return True
+        return shutdown.requested()
+
+    try:
+        counts = await workqueue.drain(
+            queue, handle, batch_size=scraper.concurrency, stop=stop
+        )
+    finally:
+        await _close(sinks)
+    scraper.log.info(
+        "Worker finished: %d saved, %d failed.", counts["acked"], counts["nacked"]
+    )
+    return counts
@@ -0,0 +1,170 @@
+"""
+Run history stored in a local SQLite database.
+
+Every scraper run appends one row per site with its timing, counts,
+failure reasons, bytes downloaded and request latency percentiles, so
+performance can be compared across days.
+"""
+
+import json
+import sqlite3
+import statistics
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+HISTORY_DB = "scraper_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    duration_s REAL NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    pages INTEGER NOT NULL DEFAULT 0,
+    details INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    failure_reasons TEXT NOT NULL DEFAULT '{}',
+    requests INTEGER NOT NULL DEFAULT 0,
+    request_errors INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    p50_ms REAL,
+    p95_ms REAL
+);
+CREATE INDEX IF NOT EXISTS runs_site_started ON runs (site, started_at);
+"""
+
+
+def connect(path: str = HISTORY_DB) -> sqlite3.Connection:
+    """Open the history database, creating the schema if needed."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_run(
+    site: str,
+    started_at: datetime,
+    finished_at: datetime,
+    snapshot: Dict[str, Any],
+    status: str = "ok",
+    error: Optional[str] = None,
+    path: str = HISTORY_DB,
+) -> None:
+    """
+    Append one run of ``site`` to the history.
+
+    Args:
+        site (str): The site that ran.
+        started_at (datetime): When the run started (timezone-aware).
+        finished_at (datetime): When the run finished (timezone-aware).
+        snapshot (Dict[str, Any]): Counters from :func:`scraper_core.stats.snapshot`.
+        status (str): ``ok``, ``failed``, ``stopped`` (shut down early) or
+            ``partial`` (ran out of its ``run_budget``).
+        error (Optional[str]): The error that ended a failed run.
+        path (str): Path of the history database.
+    """
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO runs (
+                    site, started_at, finished_at, duration_s, status, error,
+                    pages, details, successes, failures, failure_reasons,
+                    requests, request_errors, bytes, p50_ms, p95_ms
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    site,
+                    started_at.astimezone(timezone.utc).isoformat(),
+                    finished_at.astimezone(timezone.utc).isoformat(),
+                    (finished_at - started_at).total_seconds(),
+                    status,
+                    error,
+                    snapshot.get("pages", 0),
+                    snapshot.get("details", 0),
+                    snapshot.get("successes", 0),
+                    snapshot.get("failures", 0),
+                    json.dumps(snapshot.get("failure_reasons", {})),
+                    snapshot.get("requests", 0),
+                    snapshot.get("errors", 0),
+                    snapshot.get("bytes", 0),
+                    snapshot.get("p50_ms"),
+                    snapshot.get("p95_ms"),
+                ),
+            )
+    finally:
+        conn.close()
+
+
+def recent_runs(days: int = 14, path: str = HISTORY_DB) -> List[sqlite3.Row]:
+    """Return the runs of the last ``days`` days, oldest first."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    conn = connect(path)
+    try:
+        return conn.execute(
+            "SELECT * FROM runs WHERE started_at >= ? ORDER BY site, started_at",
+            (since,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _median(values: List[Optional[float]]) -> Optional[float]:
+    present = [value for value in values if value is not None]
+    return statistics.median(present) if present else None
+
+
+def summarise(days: int = 14, path: str = HISTORY_DB) -> List[Dict[str, Any]]:
+    """
+    Summarise each site's recent runs and compare the latest to the baseline.
+
+    The baseline is the median of the earlier runs in the window, so one bad
+    day does not hide the next regression.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per site.
+    """
+    by_site: Dict[str, List[sqlite3.Row]] = {}
+    for row in recent_runs(days, path):
+        by_site.setdefault(row["site"], []).append(row)
+
+    summaries = []
+    for site, rows in sorted(by_site.items()):
+        latest, earlier = rows[-1], rows[:-1]
+        reasons: Dict[str, int] = {}
+        for row in rows:
+            for reason, count in json.loads(row["failure_reasons"]).items():
+                reasons[reason] = reasons.get(reason, 0) + count
+
+        def rate(row: sqlite3.Row) -> float:
+            return row["successes"] / row["duration_s"] if row["duration_s"] else 0.0
+
+        summaries.append(
+            {
+                "site": site,
+                "runs": len(rows),
+                "failed_runs": sum(1 for row in rows if row["status"] == "failed"),
+                "partial_runs": sum(1 for row in rows if row["status"] == "partial"),
+                "stopped_runs": sum(1 for row in rows if row["status"] == "stopped"),
+                "latest_started_at": latest["started_at"],
+                "latest_duration_s": latest["duration_s"],
+                "baseline_duration_s": _median([row["duration_s"] for row in earlier]),
+                "latest_successes": latest["successes"],
+                "baseline_successes": _median([row["successes"] for row in earlier]),
+                "latest_records_per_s": rate(latest),
+                "baseline_records_per_s": _median([rate(row) for row in earlier]),
+                "latest_failures": latest["failures"],
+                "latest_mb": latest["bytes"] / 1_000_000,
+                "latest_p50_ms": latest["p50_ms"],
+                "latest_p95_ms": latest["p95_ms"],
+                "baseline_p95_ms": _median([row["p95_ms"] for row in earlier]),
+                "failure_reasons": reasons,
+            }
+        )
+    return summaries
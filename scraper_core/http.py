@@ -0,0 +1,442 @@
+"""
+Shared request path.
+
+Every scraper sends its network calls through :func:`request` so that
+process-wide limits and counters apply no matter how many scrapers share
+the interpreter, and so that runs can be recorded and replayed
+(:mod:`scraper_core.cassette`).
+
+Sites can opt into hedging (:func:`set_hedging`): a GET still unanswered
+after its host's recent p95 (or another percentile) is sent a second time
+and whichever copy answers first is used, so a few stragglers no longer
+set the pace of a whole run. A budget caps the extra requests.
+
+Identical requests in flight at the same time are coalesced into one
+(single-flight), e.g. when a listing shows the same car on two pages.
+
+Sites with proxies (:func:`set_proxies`) send each request, hedges
+included, through the healthiest proxy with a free slot (see
+:mod:`scraper_core.proxies`).
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from curl_cffi import AsyncCurl, AsyncSession
+
+from . import cassette, dedupe, metrics, proxies, stats, tracing
+
+_shared_curl: Optional[AsyncCurl] = None
+
+_budget: Optional[asyncio.Semaphore] = None
+_budget_limit: Optional[int] = None
+
+_host_overrides: Dict[str, str] = {}
+
+# Requests in flight by (session, request key), for coalescing.
+_flights: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+
+
+class _Abandoned(Exception):
+    """Set on a coalesced request whose sender was cancelled."""
+
+
+# Successful request latencies kept per host to derive the hedging delay.
+HEDGE_WINDOW = 500
+# Latencies a host needs before its requests are hedged.
+HEDGE_MIN_SAMPLES = 50
+# New latencies after which a host's hedging delay is recomputed.
+HEDGE_REFRESH = 25
+# Only requests that are safe to send twice are hedged.
+HEDGE_METHODS = frozenset({"GET", "HEAD"})
+# Answers that suggest the site throttles or blocks the sender; they count
+# against the session and proxy that got them.
+BLOCKED_STATUSES = frozenset({403, 429})
+
+
+class RateLimiter:
+    """
+    Spaces requests ``1 / rate`` seconds apart, letting ``burst`` of them go
+    out back to back after a quiet spell (GCRA).
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.interval = 1 / rate
+        self.burst = burst
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        slot = max(self._next, now)
+        self._next = slot + self.interval
+        delay = slot - now - (self.burst - 1) * self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_rate_limits: Dict[str, RateLimiter] = {}
+
+
+class LatencyWindow:
+    """The latest successful request latencies to one host."""
+
+    def __init__(self, size: int = HEDGE_WINDOW) -> None:
+        self.samples: Deque[float] = deque(maxlen=size)
+        self._added = 0
+        self._quantiles: Dict[float, Optional[float]] = {}
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._added += 1
+        if self._added % HEDGE_REFRESH == 0:
+            self._quantiles.clear()
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """The ``fraction`` percentile, or None while samples are too few."""
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        if fraction not in self._quantiles:
+            self._quantiles[fraction] = stats.percentile(list(self.samples), fraction)
+        return self._quantiles[fraction]
+
+
+class HedgePolicy:
+    """
+    When a site's requests get a second copy: after ``percentile`` of the
+    host's latencies, for at most ``budget`` of the site's requests.
+    """
+
+    def __init__(self, percentile: float, budget: float) -> None:
+        self.fraction = percentile / 100
+        self.budget = budget
+        self.requests = 0
+        self.hedged = 0
+
+    def take(self) -> bool:
+        """Spend one hedge if the budget allows it."""
+        if self.hedged + 1 > self.budget * self.requests:
+            return False
+        self.hedged += 1
+        return True
+
+
+_hedging: Dict[str, HedgePolicy] = {}
+_latencies: Dict[str, LatencyWindow] = {}
+_proxies: Dict[str, proxies.ProxyPool] = {}
+
+
+def set_concurrency_budget(limit: Optional[int]) -> None:
+    """
+    Cap the number of in-flight requests across every scraper in the process.
+
+    Args:
+        limit (Optional[int]): Maximum concurrent requests, or None to disable.
+    """
+    global _budget, _budget_limit
+    _budget_limit = limit
+    _budget = asyncio.Semaphore(limit) if limit else None
+
+
+def set_rate_limit(site: str, rate: Optional[float], burst: int = 1) -> None:
+    """
+    Limit how many requests per second ``site`` sends.
+
+    Args:
+        site (str): The scraper, as passed to :func:`request`.
+        rate (Optional[float]): Requests per second; None or 0 removes the limit.
+        burst (int): Requests allowed back to back.
+    """
+    if rate:
+        _rate_limits[site] = RateLimiter(rate, burst)
+    else:
+        _rate_limits.pop(site, None)
+
+
+def set_hedging(site: str, percentile: Optional[float], budget: float = 0.05) -> None:
+    """
+    Hedge ``site``'s slow GET requests.
+
+    Args:
+        site (str): The scraper, as passed to :func:`request`.
+        percentile (Optional[float]): Send a second copy of a request that
+            takes longer than this percentile of its host's recent latencies;
+            None or 0 turns hedging off.
+        budget (float): Fraction of the site's requests that may be hedged.
+    """
+    if percentile:
+        _hedging[site] = HedgePolicy(percentile, budget)
+    else:
+        _hedging.pop(site, None)
+
+
+def set_proxies(
+    site: str,
+    urls: Optional[List[str]],
+    concurrency: int = 10,
+    quarantine: float = 60.0,
+) -> None:
+    """
+    Send ``site``'s requests through a pool of proxies.
+
+    Args:
+        site (str): The scraper, as passed to :func:`request`.
+        urls (Optional[List[str]]): Proxy URLs; None or empty to connect
+            directly.
+        concurrency (int): Requests each proxy carries at once at most.
+        quarantine (float): Seconds a failing proxy is left out.
+    """
+    if urls:
+        _proxies[site] = proxies.ProxyPool(site, urls, concurrency, quarantine)
+    else:
+        _proxies.pop(site, None)
+
+
+def set_host_overrides(overrides: Optional[Dict[str, str]]) -> None:
+    """
+    Send requests for some hosts to another base URL, keeping path and query.
+
+    Used to point the scrapers at a local stand-in, e.g.
+    ``{"www.kavak.com": "http://127.0.0.1:8401"}``. Metrics and stats keep
+    the original host.
+
+    Args:
+        overrides (Optional[Dict[str, str]]): Host to base URL, or None to clear.
+    """
+    _host_overrides.clear()
+    _host_overrides.update(overrides or {})
+
+
+def _resolve(url: str) -> str:
+    parts = urlsplit(url)
+    base = _host_overrides.get(parts.hostname or "")
+    if base is None:
+        return url
+    target = urlsplit(base)
+    return urlunsplit(
+        (target.scheme, target.netloc, parts.path, parts.query, parts.fragment)
+    )
+
+
+def share_connection_pool() -> None:
+    """
+    Make every session created by :func:`new_session` share one curl multi
+    handle, and with it one connection cache.
+
+    Must be called from inside the running event loop.
+    """
+    global _shared_curl
+    if _shared_curl is None:
+        _shared_curl = AsyncCurl(loop=asyncio.get_running_loop())
+
+
+async def close_connection_pool() -> None:
+    """Close the shared curl multi handle, if any."""
+    global _shared_curl
+    if _shared_curl is not None:
+        await _shared_curl.close()
+        _shared_curl = None
+
+
+def new_session(**kwargs: Any) -> AsyncSession:
+    """
+    Create an ``AsyncSession``, attached to the shared connection pool when
+    one is active.
+
+    Args:
+        **kwargs: Passed through to ``AsyncSession``.
+
+    Returns:
+        AsyncSession: The new session.
+    """
+    if _shared_curl is not None:
+        kwargs.setdefault("async_curl", _shared_curl)
+    if tracing.enabled():
+        kwargs.setdefault("curl_infos", tracing.CURL_INFOS)
+    return AsyncSession(**kwargs)
+
+
+async def _hedged(
+    send: Callable[[], Awaitable[Any]],
+    delay: float,
+    policy: HedgePolicy,
+    site: str,
+    budget: Optional[asyncio.Semaphore],
+) -> Any:
+    """Run ``send``, and again if it takes longer than ``delay``; first wins."""
+
+    async def hedge() -> Any:
+        if budget is None:
+            return await send()
+        async with budget:
+            return await send()
+
+    attempts: List["asyncio.Future[Any]"] = [asyncio.ensure_future(send())]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        # A full concurrency budget means the process is saturated already.
+        if not done and (budget is None or not budget.locked()) and policy.take():
+            attempts.append(asyncio.ensure_future(hedge()))
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for attempt in attempts:
+                if attempt in done and attempt.exception() is None:
+                    if len(attempts) > 1:
+                        outcome = "won" if attempt is attempts[1] else "lost"
+                        metrics.HEDGES.inc(site=site, outcome=outcome)
+                    return attempt.result()
+        # Every copy failed: report the original's error.
+        if len(attempts) > 1:
+            metrics.HEDGES.inc(site=site, outcome="failed")
+        return attempts[0].result()
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+async def request(
+    session: Any, method: str, url: str, site: str = "default", **kwargs: Any
+) -> Any:
+    """
+    Send a request through ``session`` under the process-wide budget.
+
+    A request identical to one still in flight on the same session (same
+    method, normalised URL, headers and body) is not sent again: it waits
+    for that one and gets the same response, or error. If the task sending
+    it is cancelled, one of the waiting requests is sent instead.
+
+    A GET to a host that answers slower than usual may be sent twice when
+    hedging is on for ``site``; the first answer is returned.
+
+    Args:
+        session (AsyncSession): The session to send the request with, or a
+            :class:`~scraper_core.sessions.SessionPool`.
+        method (str): The HTTP method to use.
+        url (str): The URL to request.
+        site (str): The scraper the request belongs to, used for accounting.
+        **kwargs: Passed through to ``session.request``.
+
+    Returns:
+        Response: The response object from the session.
+    """
+    key = (id(session), dedupe.request_key(method, url, kwargs))
+    flight = _flights.get(key)
+    while flight is not None:
+        metrics.COALESCED.inc(site=site)
+        try:
+            return await asyncio.shield(flight)
+        except _Abandoned:
+            # The first waiter to get here sends it; the others wait for it.
+            flight = _flights.get(key)
+
+    flight = asyncio.get_running_loop().create_future()
+    _flights[key] = flight
+    try:
+        response = await _send(session, method, url, site, kwargs)
+    except asyncio.CancelledError:
+        flight.set_exception(_Abandoned())
+        flight.exception()
+        raise
+    except Exception as e:
+        flight.set_exception(e)
+        # Mark it retrieved; nobody may be waiting.
+        flight.exception()
+        raise
+    finally:
+        del _flights[key]
+    flight.set_result(response)
+    return response
+
+
+async def _send(
+    session: Any, method: str, url: str, site: str, kwargs: Dict[str, Any]
+) -> Any:
+    site_stats = stats.for_site(site)
+    host = urlsplit(url).hostname or ""
+    budget = _budget
+
+    recorder = cassette.active()
+    # A proxy chosen by the caller wins over the site's pool.
+    pool = None if "proxy" in kwargs else _proxies.get(site)
+    policy = _hedging.get(site)
+    window: Optional[LatencyWindow] = None
+    hedge_delay: Optional[float] = None
+    if policy is not None and method.upper() in HEDGE_METHODS:
+        policy.requests += 1
+        window = _latencies.setdefault(host, LatencyWindow())
+        hedge_delay = window.quantile(policy.fraction)
+
+    async def send() -> Any:
+        proxy = await pool.acquire() if pool is not None else None
+        sent = time.perf_counter()
+        ok = None
+        try:
+            response = await session.request(
+                method.upper(),
+                _resolve(url) if _host_overrides else url,
+                **(kwargs if proxy is None else {**kwargs, "proxy": proxy.url}),
+            )
+            ok = response.status_code not in BLOCKED_STATUSES
+        except Exception:
+            ok = False
+            raise
+        finally:
+            if proxy is not None:
+                pool.release(proxy, time.perf_counter() - sent, ok)
+        if recorder is not None:
+            recorder.record(
+                site, method, url, kwargs, response, time.perf_counter() - sent
+            )
+        if window is not None:
+            window.add(time.perf_counter() - sent)
+        return response
+
+    limiter = _rate_limits.get(site)
+    if limiter is not None:
+        await limiter.wait()
+    if budget is not None:
+        await budget.acquire()
+
+    site_stats.in_flight += 1
+    metrics.IN_FLIGHT.inc(site=site)
+    with tracing.span(
+        "http.request", site=site, method=method.upper(), url=url, host=host
+    ) as span:
+        started = time.perf_counter()
+        try:
+            if recorder is not None and recorder.mode == "replay":
+                response = recorder.replay(method, url, kwargs)
+            elif hedge_delay is not None:
+                response = await _hedged(send, hedge_delay, policy, site, budget)
+            else:
+                response = await send()
+        except Exception:
+            elapsed = time.perf_counter() - started
+            site_stats.record_request(elapsed, 0, ok=False)
+            metrics.REQUESTS.inc(site=site, host=host, status="error")
+            metrics.REQUEST_LATENCY.observe(elapsed, site=site, host=host)
+            raise
+        finally:
+            site_stats.in_flight -= 1
+            metrics.IN_FLIGHT.dec(site=site)
+            if budget is not None:
+                budget.release()
+
+        elapsed = time.perf_counter() - started
+        size = len(response.content or b"")
+        site_stats.record_request(elapsed, size, ok=True)
+        metrics.REQUESTS.inc(site=site, host=host, status=str(response.status_code))
+        metrics.REQUEST_LATENCY.observe(elapsed, site=site, host=host)
+        metrics.RESPONSE_BYTES.inc(size, site=site, host=host)
+        if span is not None:
+            span.attributes.update(
+                status=response.status_code,
+                bytes=size,
+                **tracing.curl_phases(response),
+            )
+        return response
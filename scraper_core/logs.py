@@ -0,0 +1,236 @@
+"""
+Structured, rate-limited logging for the scrapers.
+
+Scrapers log through :func:`get_logger`. Records are put on an in-memory
+queue by a ``QueueHandler`` and written by a listener thread, so the event
+loop never waits on the console. Repeated messages from the same call site
+are rate-limited, and instead of one line per car a progress thread logs
+one aggregated line per site every few seconds:
+
+    14:02:11 INFO  legend.kavak: 1,840/5,012 records (92.4/s), 12 failed, ETA 0:00:34
+
+Child processes can :func:`forward` their records to the parent's queue
+instead, so a single listener owns the terminal (see
+:mod:`scraper_core.dashboard`).
+
+Configured with :func:`setup` or the environment (inherited by workers):
+
+    LEGEND_LOG_LEVEL          DEBUG, INFO (default), WARNING, ...
+    LEGEND_PROGRESS_INTERVAL  seconds between progress lines, 0 to disable (default 10)
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from . import stats
+
+ROOT = "legend"
+FORMAT = "%(asctime)s %(levelname)-5s %(name)s: %(message)s"
+DATE_FORMAT = "%H:%M:%S"
+
+# Identical call sites may log this many records per window before muting.
+RATE_LIMIT_BURST = 5
+RATE_LIMIT_WINDOW = 10.0
+
+
+def get_logger(site: str) -> logging.Logger:
+    """Return the logger of ``site``, e.g. ``legend.kavak``."""
+    return logging.getLogger(f"{ROOT}.{site}")
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let each call site (logger, level and message template) log ``burst``
+    records per ``window`` seconds; the next record after a muted stretch
+    says how many were dropped.
+    """
+
+    def __init__(
+        self, burst: int = RATE_LIMIT_BURST, window: float = RATE_LIMIT_WINDOW
+    ) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._windows: Dict[Tuple[str, int, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed = 0
+            else:
+                state[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.msg} (+{suppressed} similar suppressed)"
+        return True
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """
+    Writes to whatever ``sys.stderr`` is when a record is emitted, so output
+    follows a live display that redirects stderr above itself.
+    """
+
+    @property
+    def stream(self) -> Any:
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value: Any) -> None:
+        pass
+
+
+class ProgressReporter:
+    """Logs one progress line per active site every ``interval`` seconds."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._started = time.monotonic()
+        self._last: Dict[str, Tuple[float, int]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+
+    def start(self) -> "ProgressReporter":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for site in list(stats.sites()):
+                self.report(site)
+
+    def report(self, site: str) -> None:
+        site_stats = stats.for_site(site)
+        failed = sum(site_stats.failures.values())
+        done = site_stats.successes + failed
+        now = time.monotonic()
+        last_time, last_done = self._last.get(site, (self._started, 0))
+        self._last[site] = (now, done)
+        if done == last_done:
+            return
+
+        rate = (done - last_done) / max(now - last_time, 1e-6)
+        line = f"{site_stats.successes:,}"
+        eta = ""
+        if site_stats.expected:
+            line += f"/{site_stats.expected:,}"
+            remaining = max(site_stats.expected - done, 0)
+            if remaining and rate > 0:
+                eta = f", ETA {timedelta(seconds=round(remaining / rate))}"
+        get_logger(site).info(
+            "%s records (%.1f/s), %d failed%s", line, rate, failed, eta
+        )
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_progress: Optional[ProgressReporter] = None
+_setup_pid: Optional[int] = None
+
+
+def _route_to(records: Any, level: Optional[str]) -> None:
+    if level is None:
+        level = os.environ.get("LEGEND_LOG_LEVEL", "INFO")
+    root = logging.getLogger(ROOT)
+    root.setLevel(level.upper())
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(RateLimitFilter())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+
+def setup(
+    level: Optional[str] = None,
+    progress_interval: Optional[float] = None,
+    records: Any = None,
+) -> None:
+    """
+    Route ``legend.*`` loggers through a background queue to stderr.
+
+    Safe to call again, and must be called again in a child process: a
+    forked child inherits the handlers but not the listener thread.
+
+    Args:
+        level (Optional[str]): Log level; defaults to ``LEGEND_LOG_LEVEL`` or INFO.
+        progress_interval (Optional[float]): Seconds between progress lines;
+            defaults to ``LEGEND_PROGRESS_INTERVAL`` or 10, 0 disables them.
+        records (Any): Queue to listen on, e.g. a ``multiprocessing.Queue``
+            that child processes :func:`forward` to; a private one by default.
+    """
+    global _listener, _progress, _setup_pid
+    if progress_interval is None:
+        progress_interval = float(os.environ.get("LEGEND_PROGRESS_INTERVAL", "10"))
+
+    if _setup_pid == os.getpid():
+        if level is not None or "LEGEND_LOG_LEVEL" in os.environ:
+            logging.getLogger(ROOT).setLevel(
+                (level or os.environ["LEGEND_LOG_LEVEL"]).upper()
+            )
+        return
+    shutdown()
+
+    if records is None:
+        records = queue.SimpleQueue()
+    _route_to(records, level)
+    console = ConsoleHandler()
+    console.setFormatter(logging.Formatter(FORMAT, DATE_FORMAT))
+
+    _listener = logging.handlers.QueueListener(records, console)
+    _listener.start()
+    if progress_interval > 0:
+        _progress = ProgressReporter(progress_interval).start()
+    _setup_pid = os.getpid()
+
+
+def forward(records: Any, level: Optional[str] = None) -> None:
+    """
+    Send this process's records to a queue the parent listens on.
+
+    Later :func:`setup` calls in this process keep the forwarding, and no
+    progress lines are logged here; the parent shows progress instead.
+
+    Args:
+        records (Any): The queue passed to the parent's :func:`setup`.
+        level (Optional[str]): Log level; defaults to ``LEGEND_LOG_LEVEL`` or INFO.
+    """
+    global _listener, _progress, _setup_pid
+    _listener = None
+    _progress = None
+    _route_to(records, level)
+    _setup_pid = os.getpid()
+
+
+def shutdown() -> None:
+    """Log a final progress line per site and flush pending records."""
+    global _listener, _progress, _setup_pid
+    owned = _setup_pid == os.getpid()
+    if _progress is not None:
+        _progress.stop()
+        if owned:
+            for site in list(stats.sites()):
+                _progress.report(site)
+        _progress = None
+    if _listener is not None:
+        if owned:
+            _listener.stop()
+        _listener = None
+    _setup_pid = None
@@ -0,0 +1,380 @@
+"""
+Prometheus metrics for the scrapers.
+
+A small self-contained registry of counters, gauges and histograms that
+renders the Prometheus text exposition format. It can be served over a
+local HTTP endpoint (:func:`serve`) or written periodically for the node
+exporter's textfile collector (:func:`start_textfile_writer`).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [
+                (key, list(counts), self._sums[key])
+                for key, counts in self._counts.items()
+            ]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """A collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(
+    Counter(
+        "legend_requests_total",
+        "HTTP requests sent, by site, host and status code.",
+        ("site", "host", "status"),
+    )
+)
+REQUEST_LATENCY = REGISTRY.register(
+    Histogram(
+        "legend_request_duration_seconds",
+        "Time from sending a request to receiving the full response.",
+        ("site", "host"),
+    )
+)
+RESPONSE_BYTES = REGISTRY.register(
+    Counter(
+        "legend_response_bytes_total",
+        "Response body bytes received.",
+        ("site", "host"),
+    )
+)
+HEDGES = REGISTRY.register(
+    Counter(
+        "legend_hedged_requests_total",
+        "Second copies sent of slow requests, by whether they answered first.",
+        ("site", "outcome"),
+    )
+)
+COALESCED = REGISTRY.register(
+    Counter(
+        "legend_coalesced_requests_total",
+        "Requests answered by an identical one already in flight.",
+        ("site",),
+    )
+)
+SESSION_ROTATIONS = REGISTRY.register(
+    Counter(
+        "legend_session_rotations_total",
+        "Sessions replaced after repeated failed or blocked requests.",
+        ("site",),
+    )
+)
+PROXY_REQUESTS = REGISTRY.register(
+    Counter(
+        "legend_proxy_requests_total",
+        "Requests sent through each proxy, by outcome.",
+        ("site", "proxy", "outcome"),
+    )
+)
+PROXY_QUARANTINES = REGISTRY.register(
+    Counter(
+        "legend_proxy_quarantines_total",
+        "Times a proxy was left out after repeated failed or blocked requests.",
+        ("site", "proxy"),
+    )
+)
+IN_FLIGHT = REGISTRY.register(
+    Gauge(
+        "legend_requests_in_flight",
+        "Requests currently awaiting a response.",
+        ("site",),
+    )
+)
+PARSE_TIME = REGISTRY.register(
+    Histogram(
+        "legend_parse_duration_seconds",
+        "Time spent parsing a page and building its record.",
+        ("site",),
+        PARSE_BUCKETS,
+    )
+)
+RECORDS = REGISTRY.register(
+    Counter("legend_records_total", "Records written to the output.", ("site",))
+)
+QUEUE_DEPTH = REGISTRY.register(
+    Gauge(
+        "legend_queue_depth", "Work items discovered but not yet processed.", ("site",)
+    )
+)
+
+
+def render() -> str:
+    """Render every metric in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def serve(port: int, address: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve ``/metrics`` from a daemon thread.
+
+    Args:
+        port (int): Port to listen on.
+        address (str): Interface to bind; local-only by default.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call ``shutdown()`` to stop it.
+    """
+    server = ThreadingHTTPServer((address, port), _MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    return server
+
+
+def write_textfile(path: str) -> None:
+    """Atomically write the current metrics to ``path``."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class TextfileWriter:
+    """Rewrites a textfile-collector file every ``interval`` seconds."""
+
+    def __init__(self, path: str, interval: float = 15.0) -> None:
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "TextfileWriter":
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-textfile", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            write_textfile(self.path)
+
+    def stop(self) -> None:
+        """Stop the writer and write the final values."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        write_textfile(self.path)
+
+
+def start_textfile_writer(path: str, interval: float = 15.0) -> TextfileWriter:
+    """Start writing metrics to ``path`` every ``interval`` seconds."""
+    return TextfileWriter(path, interval).start()
+
+
+@contextmanager
+def exporting(
+    port: Optional[int] = None, textfile: Optional[str] = None
+) -> Iterator[None]:
+    """
+    Expose metrics for the duration of the ``with`` block.
+
+    Args:
+        port (Optional[int]): Serve ``/metrics`` on this local port.
+        textfile (Optional[str]): Keep this textfile-collector file up to date.
+    """
+    server = serve(port) if port else None
+    writer = start_textfile_writer(textfile) if textfile else None
+    try:
+        yield
+    finally:
+        if writer is not None:
+            writer.stop()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,211 @@
+"""
+Output files and sinks.
+
+The engine hands every extracted record to the scraper's sinks. The
+default :class:`FileSink` appends records to a daily file per site,
+``<output_dir>/<site>_<YYYY-MM-DD>.<csv|jsonl>``, in the format set in
+``legend.toml``. A site scheduled more than once a day gets a file per
+scheduled run instead (see :func:`run_path`), since every run saves the
+whole inventory again. Scrapers wrap it in a :class:`ThreadedSink` so that CSV
+encoding and disk writes happen on a writer thread instead of the event
+loop that is running the requests.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .config import SCHEDULE_TZ, SiteConfig
+from .cron import CronSpec
+
+# Records a ThreadedSink holds before senders have to wait.
+MAX_QUEUED = 2000
+# Records written to the wrapped sink at once, at most.
+WRITE_BATCH = 500
+# Seconds between attempts to queue a record while the queue is full.
+BACKPRESSURE_POLL = 0.01
+
+_STOP = object()
+
+
+def daily_path(site: str, settings: SiteConfig, day: Optional[str] = None) -> str:
+    """
+    The output file of ``site`` for ``day`` (UTC today by default).
+
+    Creates the output directory if needed.
+    """
+    day = day or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    os.makedirs(settings.output_dir, exist_ok=True)
+    return os.path.join(settings.output_dir, f"{site}_{day}.{settings.output_format}")
+
+
+def run_path(site: str, settings: SiteConfig) -> str:
+    """
+    The output file of a run of ``site`` starting now.
+
+    That is the daily file, unless the site's schedule fires more than once
+    a day: then it is ``<site>_<YYYY-MM-DD>_<HHMM>`` after the latest
+    scheduled time (UTC), so that each run has a file of its own and a
+    stopped run that is restarted before the next slot resumes its file.
+    """
+    spec = CronSpec(settings.schedule, SCHEDULE_TZ)
+    slot = None
+    if spec.fires_more_than_daily():
+        slot = spec.last_at_or_before(datetime.now(timezone.utc))
+    if slot is None:
+        return daily_path(site, settings)
+    stamp = slot.astimezone(timezone.utc).strftime("%Y-%m-%d_%H%M")
+    return daily_path(site, settings, day=stamp)
+
+
+def append(path: str, record: Dict[str, Any], output_format: str) -> None:
+    """
+    Append one record to ``path``.
+
+    CSV files get a header row when they are created.
+    """
+    append_many(path, [record], output_format)
+
+
+def append_many(path: str, records: List[Dict[str, Any]], output_format: str) -> None:
+    """Append ``records`` to ``path`` in one write, as :func:`append` would."""
+    if output_format == "jsonl":
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                for record in records
+            )
+        return
+
+    import pandas as pd
+
+    pd.DataFrame(records).to_csv(
+        path, mode="a", index=False, header=not os.path.exists(path)
+    )
+
+
+class Sink:
+    """Destination of extracted records."""
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Store one record."""
+        raise NotImplementedError
+
+    def write_many(self, records: List[Dict[str, Any]]) -> None:
+        """Store several records; sinks that can batch override this."""
+        for record in records:
+            self.write(record)
+
+    async def send(self, record: Dict[str, Any]) -> None:
+        """Store one record from the event loop; the engine calls this."""
+        self.write(record)
+
+    def close(self) -> None:
+        """Flush anything buffered; called once the run is over."""
+
+
+class FileSink(Sink):
+    """Appends records to one output file."""
+
+    def __init__(self, path: str, output_format: str) -> None:
+        self.path = path
+        self.output_format = output_format
+
+    def write(self, record: Dict[str, Any]) -> None:
+        append(self.path, record, self.output_format)
+
+    def write_many(self, records: List[Dict[str, Any]]) -> None:
+        append_many(self.path, records, self.output_format)
+
+    def close(self) -> None:
+        """Make sure what was written reached the disk."""
+        if os.path.exists(self.path):
+            # Windows only flushes handles opened for writing.
+            with open(self.path, "ab") as f:
+                os.fsync(f.fileno())
+
+
+class ThreadedSink(Sink):
+    """
+    Writes records to another sink from a background thread.
+
+    :meth:`send` only queues the record. The writer thread takes whatever
+    has queued up, up to ``batch_size`` records, and hands it to the wrapped
+    sink in one :meth:`Sink.write_many` call. When ``max_queued`` records
+    are waiting, :meth:`send` waits for room, so a slow disk slows the
+    scrape down instead of filling memory.
+
+    A write error stops the writing; it is raised by the next
+    :meth:`send` and by :meth:`close`.
+
+    Args:
+        sink (Sink): The sink the thread writes to.
+        max_queued (int): Records queued before senders wait.
+        batch_size (int): Records written at once, at most.
+    """
+
+    def __init__(
+        self, sink: Sink, max_queued: int = MAX_QUEUED, batch_size: int = WRITE_BATCH
+    ) -> None:
+        self.sink = sink
+        self.batch_size = batch_size
+        self.error: Optional[BaseException] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(max_queued)
+        self._thread = threading.Thread(
+            target=self._run, name="sink-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            # After an error the queue is still drained, so senders never
+            # wait on a thread that stopped writing.
+            if batch and self.error is None:
+                try:
+                    self.sink.write_many(batch)
+                except BaseException as e:
+                    self.error = e
+
+    def _raise_error(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Queue one record, blocking while the queue is full."""
+        self._raise_error()
+        self._queue.put(record)
+
+    async def send(self, record: Dict[str, Any]) -> None:
+        """Queue one record, waiting without blocking the loop while it is full."""
+        self._raise_error()
+        while True:
+            try:
+                self._queue.put_nowait(record)
+                return
+            except queue.Full:
+                await asyncio.sleep(BACKPRESSURE_POLL)
+
+    def close(self) -> None:
+        """Write everything queued, then close the wrapped sink."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self.sink.close()
+        self._raise_error()
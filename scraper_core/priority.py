@@ -0,0 +1,117 @@
+"""
+Which items to fetch first.
+
+A run that is cut short (see :mod:`scraper_core.deadline`) should have spent
+its time on the cars that changed. :class:`ListingIndex` remembers, per
+site, a fingerprint of every listing saved by earlier runs, e.g. its price,
+and ranks each listed item as new, changed or unchanged. The engine fetches
+new and changed items as they are listed and keeps the unchanged ones in a
+:class:`Spool` on disk until the listing is done.
+"""
+
+import os
+import pickle
+import struct
+import tempfile
+from typing import Any, Dict, Iterator, Optional
+
+from .dedupe import fingerprint
+
+NEW = 0
+CHANGED = 1
+UNCHANGED = 2
+
+# One index entry: item id and listing signature fingerprints.
+_ENTRY = struct.Struct("<QQ")
+
+
+class ListingIndex:
+    """
+    Listing signatures of a site's saved items, kept between runs.
+
+    Args:
+        path (str): The index file; missing on a site's first run.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.previous = self._load(path)
+        self._listed: Dict[int, int] = {}
+        self._saved: Dict[int, int] = {}
+
+    @staticmethod
+    def _load(path: str) -> Dict[int, int]:
+        if not os.path.exists(path):
+            return {}
+        with open(path, "rb") as f:
+            data = f.read()
+        return dict(_ENTRY.iter_unpack(data[: len(data) - len(data) % _ENTRY.size]))
+
+    def rank(self, item_id: str, signature: Optional[str]) -> int:
+        """
+        Rank a listed item against earlier runs.
+
+        Returns:
+            int: :data:`NEW`, :data:`CHANGED` or :data:`UNCHANGED`. Items
+            without a signature are never ranked as changed.
+        """
+        key = fingerprint(item_id)
+        value = fingerprint(signature) if signature is not None else 0
+        self._listed[key] = value
+        previous = self.previous.get(key)
+        if previous is None:
+            return NEW
+        if signature is not None and previous != value:
+            return CHANGED
+        return UNCHANGED
+
+    def mark_saved(self, item_id: str) -> None:
+        """Remember the signature of a listed item whose record was saved."""
+        key = fingerprint(item_id)
+        if key in self._listed:
+            self._saved[key] = self._listed[key]
+
+    def mark_all_saved(self) -> None:
+        """Treat every listed item as saved, e.g. when shards saved them."""
+        self._saved.update(self._listed)
+
+    def save(self, listed_all: bool) -> None:
+        """
+        Write the index for the next run, atomically.
+
+        Args:
+            listed_all (bool): Whether this run saw the whole listing; cars
+                it did not list are then dropped. Otherwise they are kept.
+        """
+        entries = {**self.previous, **self._saved}
+        if listed_all:
+            entries = {
+                key: value for key, value in entries.items() if key in self._listed
+            }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(_ENTRY.pack(*entry) for entry in entries.items()))
+        os.replace(temp_path, self.path)
+
+
+class Spool:
+    """Items parked in a temporary file until they are wanted, in order."""
+
+    def __init__(self) -> None:
+        self._file = tempfile.TemporaryFile()
+        self._count = 0
+
+    def append(self, item: Any) -> None:
+        pickle.dump(item, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Any]:
+        self._file.seek(0)
+        for _ in range(self._count):
+            yield pickle.load(self._file)
+
+    def close(self) -> None:
+        self._file.close()
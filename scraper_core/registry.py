@@ -0,0 +1,63 @@
+"""
+The site scrapers, by name.
+
+Each entry points at a :class:`scraper_core.base.BaseScraper` subclass as
+``"module:Class"``. Classes are imported on first use, so listing the
+sites (app.py, the scheduler and the configuration do) costs nothing and a
+process only loads the scrapers it runs.
+
+A new site is one ``BaseScraper`` subclass plus a :func:`register` call
+(or an entry below); the engine gives it concurrency, retries, stats and
+output without further wiring.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List, Type, Union
+
+if TYPE_CHECKING:
+    from .base import BaseScraper
+
+SCRAPERS: Dict[str, Union[str, Type["BaseScraper"]]] = {
+    "kavak": "kavak_scraper:KavakScraper",
+    "automall": "automall_scraper:Automall",
+    "cars24": "cars24_scraper:CarScraper",
+    "dubizzle": "dubizzle_scraper:DubizzleScraper",
+    "nxtcarsuae": "nxtcarsuae_scraper.nxtcarsuae_scraper:NxtCarsUae",
+}
+
+
+def register(site: str, scraper: Union[str, Type["BaseScraper"]]) -> None:
+    """
+    Add or replace the scraper of ``site``.
+
+    Args:
+        site (str): The site name, as used in ``legend.toml`` and on the
+            command line.
+        scraper (Union[str, Type[BaseScraper]]): The class, or
+            ``"module:Class"`` to import it lazily.
+    """
+    SCRAPERS[site] = scraper
+
+
+def names() -> List[str]:
+    """Every registered site, in registration order."""
+    return list(SCRAPERS)
+
+
+def load(site: str) -> Type["BaseScraper"]:
+    """
+    The scraper class of ``site``, imported on first use.
+
+    Raises:
+        KeyError: If no scraper is registered for ``site``.
+    """
+    scraper = SCRAPERS[site]
+    if isinstance(scraper, str):
+        module, _, attribute = scraper.partition(":")
+        scraper = SCRAPERS[site] = getattr(importlib.import_module(module), attribute)
+    return scraper
+
+
+def create(site: str, **kwargs: Any) -> "BaseScraper":
+    """A new scraper for ``site``; use it as an async context manager."""
+    return load(site)(**kwargs)
@@ -0,0 +1,135 @@
+"""
+Spreading a site's requests over several sessions.
+
+One ``AsyncSession`` presents one browser fingerprint and sends at most
+``max_clients`` requests at a time (10 unless told otherwise). A
+:class:`SessionPool` holds a site's ``sessions`` of them, each with the next
+of its ``impersonate`` profiles and its own cap of ``session_connections``,
+and hands every request to one: the next in turn (``round_robin``) or the
+one with the fewest requests in flight (``least_loaded``). A session whose
+requests keep failing or being blocked is retired and replaced by a fresh
+one, with the next profile; requests sent through a proxy only count
+against it when blocked.
+
+The pool has the ``request`` and ``close`` of a session, so it is what
+:attr:`~scraper_core.base.BaseScraper.session` holds and what
+:func:`scraper_core.http.request` sends through.
+"""
+
+import asyncio
+from typing import Any, List, Sequence, Set, Union
+
+from . import http, logs, metrics
+
+# Failed or blocked requests in a row after which a session is replaced.
+MAX_FAILURES = 5
+
+
+class _Member:
+    """One session of a pool and how it has been doing."""
+
+    def __init__(self, session: Any, profile: str) -> None:
+        self.session = session
+        self.profile = profile
+        self.in_flight = 0
+        self.failures = 0
+        self.retired = False
+
+
+class SessionPool:
+    """
+    Sessions of one site, each request sent through one of them.
+
+    Args:
+        site (str): The scraper, for logs and metrics.
+        size (int): Number of sessions.
+        profiles (Union[str, Sequence[str]]): Impersonation targets, handed
+            out to the sessions in turn.
+        connections (int): Requests each session sends at once at most.
+        strategy (str): ``"least_loaded"`` or ``"round_robin"``.
+        **kwargs: Passed through to every session, e.g. ``timeout``.
+    """
+
+    def __init__(
+        self,
+        site: str,
+        size: int = 1,
+        profiles: Union[str, Sequence[str]] = "chrome",
+        connections: int = 10,
+        strategy: str = "least_loaded",
+        **kwargs: Any,
+    ) -> None:
+        self.site = site
+        self.profiles = [profiles] if isinstance(profiles, str) else list(profiles)
+        self.connections = connections
+        self.strategy = strategy
+        self.kwargs = kwargs
+        self.log = logs.get_logger(site)
+        self._created = 0
+        self._turn = 0
+        self._closing: Set["asyncio.Task[None]"] = set()
+        self.members: List[_Member] = [self._new_member() for _ in range(size)]
+
+    def _new_member(self) -> _Member:
+        profile = self.profiles[self._created % len(self.profiles)]
+        self._created += 1
+        session = http.new_session(
+            impersonate=profile, max_clients=self.connections, **self.kwargs
+        )
+        return _Member(session, profile)
+
+    def _pick(self) -> _Member:
+        count = len(self.members)
+        start = self._turn % count
+        self._turn += 1
+        if self.strategy == "round_robin":
+            return self.members[start]
+        # Start the search at the next in turn so that ties rotate.
+        return min(
+            (self.members[(start + offset) % count] for offset in range(count)),
+            key=lambda member: member.in_flight,
+        )
+
+    def _failed(self, member: _Member) -> None:
+        member.failures += 1
+        if member.retired or member.failures < MAX_FAILURES:
+            return
+        member.retired = True
+        self.members[self.members.index(member)] = self._new_member()
+        metrics.SESSION_ROTATIONS.inc(site=self.site)
+        self.log.warning(
+            "Replacing a %s session after %d failed requests in a row.",
+            member.profile,
+            member.failures,
+        )
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Send a request through the chosen session, as ``session.request``."""
+        member = self._pick()
+        member.in_flight += 1
+        # Stays None when cancelled, e.g. as the losing copy of a hedge.
+        failed = None
+        try:
+            response = await member.session.request(method, url, **kwargs)
+            failed = response.status_code in http.BLOCKED_STATUSES
+            return response
+        except Exception:
+            # Through a proxy, a failed connection is the proxy's doing.
+            failed = "proxy" not in kwargs
+            raise
+        finally:
+            member.in_flight -= 1
+            if failed:
+                self._failed(member)
+            elif failed is not None:
+                member.failures = 0
+            if member.retired and not member.in_flight:
+                task = asyncio.ensure_future(member.session.close())
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def close(self) -> None:
+        """Close every session, including retired ones still closing."""
+        for member in self.members:
+            await member.session.close()
+        await asyncio.gather(*self._closing, return_exceptions=True)
@@ -0,0 +1,118 @@
+"""
+Coordinated, graceful shutdown on SIGINT and SIGTERM.
+
+The first signal only asks for a stop: the engine stops discovering new
+items, lets the ones in flight finish for up to the site's
+``drain_timeout``, flushes the sinks and checkpoints what was done (see
+:mod:`scraper_core.checkpoint`). A second Ctrl+C stops at once.
+
+:func:`install` hooks the signals into the running event loop; the engine
+calls it, so every entry point (app.py, the scheduler's processes, worker.py
+and the scrapers' own ``__main__``) shuts down the same way. Runners that
+wait on a process pool call :func:`sigterm_as_interrupt` so that SIGTERM
+unwinds them like Ctrl+C, and :func:`share` the stop flag with the workers
+(:func:`attach` is the pool initializer): a stop requested in the parent
+reaches every scrape, and the pool can then be closed and joined as usual.
+"""
+
+import asyncio
+import multiprocessing as mp
+import signal
+import threading
+import weakref
+from typing import Any
+
+from . import logs
+
+log = logs.get_logger("shutdown")
+
+# Seconds between checks of the stop flag by waiters.
+POLL_INTERVAL = 0.1
+
+_requested: Any = threading.Event()
+_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+# Signals this process received; the flag may have been set by another one.
+_signals_seen = 0
+
+
+def request(reason: str = "requested") -> None:
+    """Ask every running scrape in this process to stop."""
+    if not _requested.is_set():
+        log.warning("Stopping (%s): finishing in-flight items", reason)
+    _requested.set()
+
+
+def requested() -> bool:
+    """Whether a stop was asked for."""
+    return _requested.is_set()
+
+
+async def wait() -> None:
+    """Return once a stop is asked for."""
+    while not _requested.is_set():
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def _on_signal(signum: int) -> None:
+    global _signals_seen
+    _signals_seen += 1
+    if signum == signal.SIGINT and _signals_seen > 1:
+        raise KeyboardInterrupt
+    request(signal.Signals(signum).name)
+
+
+def install() -> None:
+    """
+    Handle SIGINT and SIGTERM on the running loop by requesting a stop.
+
+    Does nothing outside the main thread or where the loop cannot handle
+    signals (Windows); safe to call more than once.
+    """
+    loop = asyncio.get_running_loop()
+    if loop in _loops or threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, _on_signal, signum)
+    except (NotImplementedError, RuntimeError):
+        return
+    _loops.add(loop)
+
+
+def _raise_interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+
+def sigterm_as_interrupt() -> None:
+    """Make SIGTERM raise KeyboardInterrupt in the main thread, as Ctrl+C does."""
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+
+
+def share() -> Any:
+    """Make the stop flag visible to child processes; pass it to :func:`attach`."""
+    global _requested
+    if isinstance(_requested, threading.Event):
+        shared = mp.Event()
+        if _requested.is_set():
+            shared.set()
+        _requested = shared
+    return _requested
+
+
+def attach(stop: Any) -> None:
+    """Pool initializer: follow the parent's stop flag from :func:`share`."""
+    global _requested
+    _requested = stop
+    leave_to_parent()
+
+
+def leave_to_parent() -> None:
+    """
+    In a pool worker, ignore Ctrl+C and let SIGTERM end it quietly.
+
+    The parent stops its workers through the shared flag, so an idle worker
+    has nothing to do on Ctrl+C; a running scrape still stops gracefully on
+    either signal, as :func:`install` handles both while its loop runs.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
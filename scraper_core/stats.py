@@ -0,0 +1,152 @@
+"""
+Per-site counters for the current run.
+
+The shared request path records requests, bytes and latency; scrapers add
+listing pages, detail fetches and their outcomes. :func:`snapshot` turns
+the counters into a flat row for the run history.
+"""
+
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Latency samples kept per site; beyond this a uniform reservoir is kept.
+MAX_SAMPLES = 10_000
+
+
+class SiteStats:
+    """Counters for one site during one run."""
+
+    def __init__(self, site: str) -> None:
+        self.site = site
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.bytes = 0
+        self.pages = 0
+        self.details = 0
+        self.successes = 0
+        self.phase = "starting"
+        # Why the run failed, once its phase is "failed".
+        self.error: Optional[str] = None
+        self.expected: Optional[int] = None
+        self.expected_pages: Optional[int] = None
+        self.failures: Counter = Counter()
+        self.latencies: List[float] = []
+        self._seen_latencies = 0
+
+    def record_request(self, seconds: float, size: int, ok: bool) -> None:
+        self.requests += 1
+        self.bytes += size
+        if not ok:
+            self.errors += 1
+
+        self._seen_latencies += 1
+        if len(self.latencies) < MAX_SAMPLES:
+            self.latencies.append(seconds)
+        else:
+            index = random.randrange(self._seen_latencies)
+            if index < MAX_SAMPLES:
+                self.latencies[index] = seconds
+
+    def merge(self, other: "SiteStats") -> None:
+        """Fold the counters of ``other``, e.g. from a child process, into these."""
+        self.requests += other.requests
+        self.errors += other.errors
+        self.bytes += other.bytes
+        self.pages += other.pages
+        self.details += other.details
+        self.successes += other.successes
+        self.failures.update(other.failures)
+        for seconds in other.latencies:
+            self._seen_latencies += 1
+            if len(self.latencies) < MAX_SAMPLES:
+                self.latencies.append(seconds)
+
+    def set_expected(self, total: int) -> None:
+        """Record how many records this run should produce, for progress/ETA."""
+        self.expected = total
+
+    def set_expected_pages(self, total: int) -> None:
+        """Record how many listing pages this run should fetch."""
+        self.expected_pages = total
+
+    def set_phase(self, phase: str) -> None:
+        """Record what the scraper is doing: listing, details, writing, ..."""
+        self.phase = phase
+
+    def fail(self, error: str) -> None:
+        """Record that the run gave up, and why."""
+        self.phase = "failed"
+        self.error = error
+
+    def record_page(self) -> None:
+        self.pages += 1
+
+    def record_success(self, detail: bool = True) -> None:
+        if detail:
+            self.details += 1
+        self.successes += 1
+
+    def record_failure(self, reason: str, detail: bool = True) -> None:
+        if detail:
+            self.details += 1
+        self.failures[reason] += 1
+
+
+_sites: Dict[str, SiteStats] = {}
+
+
+def for_site(site: str) -> SiteStats:
+    """Return the counters for ``site``, creating them on first use."""
+    stats = _sites.get(site)
+    if stats is None:
+        stats = _sites[site] = SiteStats(site)
+    return stats
+
+
+def sites() -> List[str]:
+    """The sites with counters in this process."""
+    return list(_sites)
+
+
+def reset(site: Optional[str] = None) -> None:
+    """Clear the counters of one site, or of every site."""
+    if site is None:
+        _sites.clear()
+    else:
+        _sites.pop(site, None)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Return the ``fraction`` percentile of ``values`` (nearest rank)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def snapshot(site: str) -> Dict[str, Any]:
+    """Summarise the counters of ``site`` as a flat dictionary."""
+    stats = for_site(site)
+    p50 = percentile(stats.latencies, 0.50)
+    p95 = percentile(stats.latencies, 0.95)
+    return {
+        "site": site,
+        "requests": stats.requests,
+        "errors": stats.errors,
+        "bytes": stats.bytes,
+        "pages": stats.pages,
+        "details": stats.details,
+        "successes": stats.successes,
+        "failures": sum(stats.failures.values()),
+        "failure_reasons": dict(stats.failures),
+        "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+        "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+    }
+
+
+def snapshot_all() -> Dict[str, Dict[str, Any]]:
+    """Summarise every site seen in this process."""
+    return {site: snapshot(site) for site in _sites}
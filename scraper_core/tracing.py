@@ -0,0 +1,322 @@
+"""
+Sampled per-request tracing.
+
+Spans carry the libcurl phase timings of each request (DNS, connect, TLS,
+time to first byte, download) plus the parse/extract time spent on the
+page, so slow detail pages can be attributed to the network or to us.
+
+Tracing is off unless configured, either with :func:`configure` or with
+environment variables (inherited by worker processes):
+
+    LEGEND_TRACE_FILE      write spans as JSON lines to this file
+    LEGEND_OTLP_ENDPOINT   POST spans as OTLP/HTTP JSON, e.g. http://127.0.0.1:4318
+    LEGEND_TRACE_SAMPLE    fraction of root spans to keep (default 1.0)
+"""
+
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from curl_cffi import CurlInfo
+
+# Timing fields requested from libcurl for every traced session.
+CURL_INFOS = [
+    CurlInfo.NAMELOOKUP_TIME,
+    CurlInfo.CONNECT_TIME,
+    CurlInfo.APPCONNECT_TIME,
+    CurlInfo.PRETRANSFER_TIME,
+    CurlInfo.STARTTRANSFER_TIME,
+    CurlInfo.TOTAL_TIME,
+    CurlInfo.NUM_CONNECTS,
+]
+
+SERVICE_NAME = "legend-scrapers"
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "sampled",
+    )
+
+    def __init__(
+        self, name: str, parent: Optional["Span"], sampled: bool, **attributes: Any
+    ) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = attributes
+        self.sampled = sampled
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+        }
+
+
+class _Exporter:
+    """Writes finished spans from a background thread."""
+
+    def __init__(self, path: Optional[str], otlp_endpoint: Optional[str]) -> None:
+        self.path = path
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") if otlp_endpoint else None
+        self.queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=10_000)
+        self.thread = threading.Thread(target=self._run, name="tracing", daemon=True)
+        self.thread.start()
+
+    def submit(self, span: Span) -> None:
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            pass  # Dropping spans beats stalling the event loop.
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            item = self.queue.get()
+            while True:
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= 512:
+                    break
+                try:
+                    item = self.queue.get(timeout=1.0)
+                except queue.Empty:
+                    break
+            if batch:
+                self._export(batch)
+            for _ in range(len(batch) + stopping):
+                self.queue.task_done()
+
+    def _export(self, batch: List[Span]) -> None:
+        if self.path:
+            # One write per batch keeps lines whole when processes share a file.
+            lines = "".join(
+                json.dumps(span.to_dict(), default=str) + "\n" for span in batch
+            )
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        if self.otlp_endpoint:
+            try:
+                self._post_otlp(batch)
+            except Exception as e:
+                print(f">= Tracing: OTLP export failed: {e}")
+
+    def _post_otlp(self, batch: List[Span]) -> None:
+        def attribute(key: str, value: Any) -> Dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        spans = [
+            {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                "name": span.name,
+                "kind": 3 if span.name == "http.request" else 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [attribute(k, v) for k, v in span.attributes.items()],
+            }
+            for span in batch
+        ]
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [attribute("service.name", SERVICE_NAME)]
+                    },
+                    "scopeSpans": [{"scope": {"name": "scraper_core"}, "spans": spans}],
+                }
+            ]
+        }
+        request = urllib.request.Request(
+            f"{self.otlp_endpoint}/v1/traces",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+    def flush(self) -> None:
+        self.queue.join()
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join(timeout=10)
+
+
+_exporter: Optional[_Exporter] = None
+_sample_rate = 1.0
+_current: ContextVar[Optional[Span]] = ContextVar("legend_span", default=None)
+
+
+def configure(
+    path: Optional[str] = None,
+    otlp_endpoint: Optional[str] = None,
+    sample_rate: float = 1.0,
+) -> None:
+    """
+    Enable tracing, or disable it when neither ``path`` nor ``otlp_endpoint``
+    is given.
+
+    Args:
+        path (Optional[str]): JSON lines file to append spans to.
+        otlp_endpoint (Optional[str]): Base URL of an OTLP/HTTP collector.
+        sample_rate (float): Fraction of root spans to keep, 0.0 to 1.0.
+    """
+    global _exporter, _sample_rate
+    shutdown()
+    _sample_rate = max(0.0, min(1.0, sample_rate))
+    if path or otlp_endpoint:
+        _exporter = _Exporter(path, otlp_endpoint)
+
+
+def configure_from_env() -> None:
+    """Configure tracing from the ``LEGEND_TRACE_*`` environment variables."""
+    configure(
+        path=os.environ.get("LEGEND_TRACE_FILE") or None,
+        otlp_endpoint=os.environ.get("LEGEND_OTLP_ENDPOINT") or None,
+        sample_rate=float(os.environ.get("LEGEND_TRACE_SAMPLE", "1.0")),
+    )
+
+
+def shutdown() -> None:
+    """Flush pending spans and stop exporting."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
+
+
+def flush() -> None:
+    """Block until every span submitted so far has been exported."""
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def enabled() -> bool:
+    """Whether spans are being exported."""
+    return _exporter is not None
+
+
+def _start(name: str, attributes: Dict[str, Any]) -> Span:
+    parent = _current.get()
+    sampled = parent.sampled if parent else random.random() < _sample_rate
+    return Span(name, parent, sampled, **attributes)
+
+
+def _finish(span: Span) -> None:
+    span.end_ns = time.time_ns()
+    if span.sampled and _exporter is not None:
+        _exporter.submit(span)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time the ``with`` block as a span, a child of the current span if any.
+
+    Yields None when tracing is disabled.
+    """
+    if _exporter is None:
+        yield None
+        return
+    current = _start(name, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        _finish(current)
+
+
+def traced(name: str) -> Callable:
+    """Decorate a coroutine function so each call is wrapped in a span."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _exporter is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(name: str, seconds: float, **attributes: Any) -> None:
+    """Record an operation that just finished and took ``seconds``."""
+    if _exporter is None:
+        return
+    finished = _start(name, attributes)
+    finished.start_ns = time.time_ns() - int(seconds * 1e9)
+    _finish(finished)
+
+
+def curl_phases(response: Any) -> Dict[str, float]:
+    """
+    Break a response's libcurl timings into per-phase milliseconds.
+
+    libcurl reports cumulative times since the start of the transfer; a
+    reused connection reports zero for DNS, connect and TLS.
+    """
+    infos = getattr(response, "infos", None) or {}
+    if CurlInfo.TOTAL_TIME not in infos:
+        return {}
+    dns = infos.get(CurlInfo.NAMELOOKUP_TIME, 0.0)
+    connect = infos.get(CurlInfo.CONNECT_TIME, 0.0)
+    tls = infos.get(CurlInfo.APPCONNECT_TIME, 0.0)
+    pretransfer = infos.get(CurlInfo.PRETRANSFER_TIME, 0.0)
+    first_byte = infos.get(CurlInfo.STARTTRANSFER_TIME, 0.0)
+    total = infos.get(CurlInfo.TOTAL_TIME, 0.0)
+    return {
+        "dns_ms": round(dns * 1000, 3),
+        "connect_ms": round(max(connect - dns, 0.0) * 1000, 3),
+        "tls_ms": round(max(tls - connect, 0.0) * 1000, 3) if tls else 0.0,
+        "ttfb_ms": round(max(first_byte - pretransfer, 0.0) * 1000, 3),
+        "download_ms": round(max(total - first_byte, 0.0) * 1000, 3),
+        "total_ms": round(total * 1000, 3),
+        "new_connections": int(infos.get(CurlInfo.NUM_CONNECTS, 0)),
+    }
+
+
+configure_from_env()
@@ -0,0 +1,394 @@
+"""
+Work queues for distributing detail fetches across processes and hosts.
+
+A coordinator enqueues one job per detail page, workers lease jobs for a
+visibility timeout, fetch them and acknowledge. A job whose lease expires
+without an ack becomes visible again, so a crashed worker never loses work,
+unless it has been leased ``max_attempts`` times already: then it is failed,
+as on a nack, so that a job that keeps crashing its workers is not retried
+forever.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+Job = Tuple[str, Any]
+
+# Moves a job between Redis keys in one step, so that a worker dying halfway
+# cannot lose it. Leasing first requeues expired leases, or fails them once
+# they used up their attempts, then leases up to ARGV[1] pending jobs.
+# KEYS: pending, leased, payloads, attempts, failed.
+# ARGV: count, lease deadline, now, max attempts.
+_REDIS_LEASE = """
+local function release(job_id)
+    local attempts = tonumber(redis.call('HGET', KEYS[4], job_id) or 0)
+    if attempts >= tonumber(ARGV[4]) then
+        redis.call('INCR', KEYS[5])
+        redis.call('HDEL', KEYS[3], job_id)
+        redis.call('HDEL', KEYS[4], job_id)
+    else
+        redis.call('RPUSH', KEYS[1], job_id)
+    end
+end
+
+for _, job_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], 0, ARGV[3])) do
+    redis.call('ZREM', KEYS[2], job_id)
+    release(job_id)
+end
+
+local jobs = {}
+while #jobs < 2 * tonumber(ARGV[1]) do
+    local job_id = redis.call('LPOP', KEYS[1])
+    if not job_id then
+        break
+    end
+    local payload = redis.call('HGET', KEYS[3], job_id)
+    if payload then
+        redis.call('ZADD', KEYS[2], ARGV[2], job_id)
+        redis.call('HINCRBY', KEYS[4], job_id, 1)
+        table.insert(jobs, job_id)
+        table.insert(jobs, payload)
+    end
+end
+return jobs
+"""
+# Returns a leased job to the queue, or fails it, if the lease is still the
+# caller's. Same KEYS; ARGV: job id, max attempts, lease deadline.
+_REDIS_NACK = """
+local deadline = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if not deadline or tonumber(deadline) ~= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+local attempts = tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or 0)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('INCR', KEYS[5])
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    redis.call('HDEL', KEYS[4], ARGV[1])
+else
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+class WorkQueue:
+    """
+    Interface shared by every queue backend.
+
+    Jobs are ``(job_id, payload)`` pairs; the payload must be JSON
+    serialisable. Enqueuing an id that is already known is a no-op.
+    """
+
+    def enqueue(self, jobs: Iterable[Job]) -> int:
+        """Add jobs to the queue and return how many were new."""
+        raise NotImplementedError
+
+    def lease(self, count: int = 1, visibility_timeout: float = 300.0) -> List[Job]:
+        """Take up to ``count`` jobs, hiding them for ``visibility_timeout``."""
+        raise NotImplementedError
+
+    def ack(self, job_id: str) -> None:
+        """Mark a leased job as done; a job that is not leased is left alone."""
+        raise NotImplementedError
+
+    def nack(self, job_id: str) -> None:
+        """
+        Return a job leased by this queue object to the queue, or fail it after
+        too many attempts. Does nothing once the lease has passed to another
+        worker or the job is done, so a late nack cannot undo their work.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of pending, leased, done and failed jobs."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+    def is_drained(self) -> bool:
+        """Whether no job is left pending or leased."""
+        counts = self.stats()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue stored in a local SQLite file.
+
+    Suitable for several worker processes on one host, or hosts sharing a
+    reliable network filesystem.
+    """
+
+    def __init__(self, path: str, name: str = "default", max_attempts: int = 3):
+        self.path = path
+        self.name = name
+        self.max_attempts = max_attempts
+        # Deadlines of the leases this object holds, which nack checks.
+        self._leases: Dict[str, float] = {}
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                queue TEXT NOT NULL,
+                id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                lease_until REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (queue, id)
+            )
+            """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_state ON jobs (queue, state, lease_until)"
+        )
+
+    def enqueue(self, jobs: Iterable[Job]) -> int:
+        rows = [(self.name, job_id, json.dumps(payload)) for job_id, payload in jobs]
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (queue, id, payload) VALUES (?, ?, ?)",
+                rows,
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return self.conn.total_changes - before
+
+    def lease(self, count: int = 1, visibility_timeout: float = 300.0) -> List[Job]:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                """
+                UPDATE jobs SET state = 'failed', lease_until = 0
+                WHERE queue = ? AND state = 'leased' AND lease_until < ?
+                  AND attempts >= ?
+                """,
+                (self.name, now, self.max_attempts),
+            )
+            rows = self.conn.execute(
+                """
+                SELECT id, payload FROM jobs
+                WHERE queue = ?
+                  AND (state = 'pending' OR (state = 'leased' AND lease_until < ?))
+                LIMIT ?
+                """,
+                (self.name, now, count),
+            ).fetchall()
+            self.conn.executemany(
+                """
+                UPDATE jobs SET state = 'leased', lease_until = ?, attempts = attempts + 1
+                WHERE queue = ? AND id = ?
+                """,
+                [(now + visibility_timeout, self.name, job_id) for job_id, _ in rows],
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        for job_id, _ in rows:
+            self._leases[job_id] = now + visibility_timeout
+        return [(job_id, json.loads(payload)) for job_id, payload in rows]
+
+    def ack(self, job_id: str) -> None:
+        self._leases.pop(job_id, None)
+        self.conn.execute(
+            """
+            UPDATE jobs SET state = 'done'
+            WHERE queue = ? AND id = ? AND state = 'leased'
+            """,
+            (self.name, job_id),
+        )
+
+    def nack(self, job_id: str) -> None:
+        lease_until = self._leases.pop(job_id, None)
+        if lease_until is None:
+            return
+        self.conn.execute(
+            """
+            UPDATE jobs
+            SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                lease_until = 0
+            WHERE queue = ? AND id = ? AND state = 'leased' AND lease_until = ?
+            """,
+            (self.max_attempts, self.name, job_id, lease_until),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        rows = self.conn.execute(
+            """
+            SELECT CASE WHEN state = 'leased' AND lease_until < ? THEN
+                            CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END
+                        ELSE state END AS effective_state, COUNT(*)
+            FROM jobs WHERE queue = ? GROUP BY effective_state
+            """,
+            (time.time(), self.max_attempts, self.name),
+        )
+        for state, total in rows:
+            counts[state] = counts.get(state, 0) + total
+        return counts
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class RedisWorkQueue(WorkQueue):
+    """
+    Work queue stored in Redis, for workers spread over several hosts.
+
+    Jobs move between keys in Lua scripts, so any client with the redis-py
+    interface works, including in-memory stand-ins such as ``fakeredis``
+    (with ``lupa`` installed) for local testing.
+    """
+
+    def __init__(self, client: Any, name: str = "default", max_attempts: int = 3):
+        self.client = client
+        self.name = name
+        self.max_attempts = max_attempts
+        self.pending_key = f"legend:{name}:pending"
+        self.leased_key = f"legend:{name}:leased"
+        self.payload_key = f"legend:{name}:payloads"
+        self.attempts_key = f"legend:{name}:attempts"
+        self.done_key = f"legend:{name}:done"
+        self.failed_key = f"legend:{name}:failed"
+        self._keys = [
+            self.pending_key,
+            self.leased_key,
+            self.payload_key,
+            self.attempts_key,
+            self.failed_key,
+        ]
+        self._lease = client.register_script(_REDIS_LEASE)
+        self._nack = client.register_script(_REDIS_NACK)
+        # Deadlines of the leases this object holds, which nack checks.
+        self._leases: Dict[str, float] = {}
+
+    def enqueue(self, jobs: Iterable[Job]) -> int:
+        added = 0
+        for job_id, payload in jobs:
+            if self.client.hsetnx(self.payload_key, job_id, json.dumps(payload)):
+                self.client.rpush(self.pending_key, job_id)
+                added += 1
+        return added
+
+    def lease(self, count: int = 1, visibility_timeout: float = 300.0) -> List[Job]:
+        now = time.time()
+        deadline = now + visibility_timeout
+        reply = self._lease(
+            keys=self._keys, args=[count, deadline, now, self.max_attempts]
+        )
+        jobs: List[Job] = []
+        for job_id, payload in zip(reply[::2], reply[1::2]):
+            if isinstance(job_id, bytes):
+                job_id = job_id.decode()
+            self._leases[job_id] = deadline
+            jobs.append((job_id, json.loads(payload)))
+        return jobs
+
+    def ack(self, job_id: str) -> None:
+        self._leases.pop(job_id, None)
+        if not self.client.zrem(self.leased_key, job_id):
+            return
+        self.client.incr(self.done_key)
+        self.client.hdel(self.payload_key, job_id)
+        self.client.hdel(self.attempts_key, job_id)
+
+    def nack(self, job_id: str) -> None:
+        lease_until = self._leases.pop(job_id, None)
+        if lease_until is not None:
+            self._nack(keys=self._keys, args=[job_id, self.max_attempts, lease_until])
+
+    def stats(self) -> Dict[str, int]:
+        now = time.time()
+        expired = self.client.zcount(self.leased_key, 0, now)
+        return {
+            "pending": int(self.client.llen(self.pending_key)) + int(expired),
+            "leased": int(self.client.zcard(self.leased_key)) - int(expired),
+            "done": int(self.client.get(self.done_key) or 0),
+            "failed": int(self.client.get(self.failed_key) or 0),
+        }
+
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)
+        if close:
+            close()
+
+
+def open_queue(url: str, name: str, max_attempts: int = 3) -> WorkQueue:
+    """
+    Open a work queue from a URL.
+
+    Args:
+        url (str): ``sqlite:///path/to/file.db`` or ``redis://host:port/db``.
+        name (str): Queue name, so several sites can share one backend.
+        max_attempts (int): Leases allowed before a job is marked failed.
+
+    Returns:
+        WorkQueue: The opened queue.
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteWorkQueue(url[len("sqlite:///") :], name, max_attempts)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "Redis work queues need the 'redis' package: uv add redis"
+            ) from e
+        return RedisWorkQueue(redis.Redis.from_url(url), name, max_attempts)
+    raise ValueError(f"Unsupported work queue URL: {url}")
+
+
+async def drain(
+    queue: WorkQueue,
+    handler: Callable[[Any], Awaitable[bool]],
+    batch_size: int = 100,
+    visibility_timeout: float = 300.0,
+    poll_interval: float = 5.0,
+    stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, int]:
+    """
+    Lease jobs in batches and run ``handler`` on them until the queue is empty.
+
+    Args:
+        queue (WorkQueue): The queue to work from.
+        handler (Callable): Coroutine taking a payload and returning whether
+            it succeeded. Successful jobs are acked, the rest are nacked.
+        batch_size (int): Jobs leased and processed concurrently.
+        visibility_timeout (float): Seconds a lease stays hidden from others.
+        poll_interval (float): Seconds to wait while other workers hold leases.
+        stop (Optional[Callable[[], bool]]): Checked before every lease;
+            once it returns True the worker returns without leasing more.
+
+    Returns:
+        Dict[str, int]: Number of jobs this worker acked and nacked.
+    """
+    counts = {"acked": 0, "nacked": 0}
+    while not (stop and stop()):
+        jobs = queue.lease(batch_size, visibility_timeout)
+        if not jobs:
+            if queue.is_drained():
+                return counts
+            await asyncio.sleep(poll_interval)
+            continue
+
+        results = await asyncio.gather(
+            *(handler(payload) for _, payload in jobs), return_exceptions=True
+        )
+        for (job_id, _), ok in zip(jobs, results):
+            if ok is True:
+                queue.ack(job_id)
+                counts["acked"] += 1
+            else:
+                queue.nack(job_id)
+                counts["nacked"] += 1
+    return counts
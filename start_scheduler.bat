@@ -1,6 +1,6 @@
 @echo off
 REM Legend Scrapers Scheduler - Windows Batch File
-REM This batch file starts the scheduler for daily execution at 2 PM Bangladesh time
+REM This batch file starts the scheduler: per-site cron schedules in Bangladesh time
 
 REM Set UTF-8 encoding for better Unicode support
 chcp 65001 >nul 2>&1
@@ -8,7 +8,7 @@ chcp 65001 >nul 2>&1
 echo ============================================================
 echo LEGEND SCRAPERS SCHEDULER
 echo ============================================================
-echo Starting scheduler for daily execution at 2:00 PM Bangladesh time...
+echo Starting scheduler with per-site schedules in Bangladesh time...
 echo Press Ctrl+C to stop the scheduler
 echo ============================================================
 
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Legend Scrapers Work-Queue Runner
+=================================
+
+Splits a site's detail phase across many processes or machines. One
+coordinator fetches the listings and enqueues a job per car; any number of
+workers lease jobs, fetch the detail pages and acknowledge them.
+
+Usage:
+    python worker.py coordinator --site kavak --queue sqlite:///legend_queue.db
+    python worker.py worker      --site kavak --queue sqlite:///legend_queue.db
+    python worker.py worker      --site automall --queue redis://10.0.0.5:6379/0
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from scraper_core import engine, logs, registry
+from scraper_core.workqueue import open_queue
+
+
+async def run(role: str, site: str, queue_url: str, max_attempts: int) -> None:
+    # One queue per site per day, so yesterday's finished jobs never mask today's.
+    today_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    queue = open_queue(queue_url, f"{site}-{today_date}", max_attempts)
+    try:
+        # A worker only imports the scraper of the site it serves.
+        async with registry.create(site) as scraper:
+            if role == "coordinator":
+                await engine.enqueue(scraper, queue)
+            else:
+                await engine.work(scraper, queue)
+        logs.get_logger(site).info("Queue state %s", queue.stats())
+    finally:
+        queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed detail fetching")
+    parser.add_argument("role", choices=["coordinator", "worker"])
+    parser.add_argument("--site", choices=registry.names(), required=True)
+    parser.add_argument(
+        "--queue",
+        default="sqlite:///legend_queue.db",
+        help="Queue backend URL: sqlite:///path.db or redis://host:port/db",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Leases allowed per job before it is marked failed",
+    )
+    args = parser.parse_args()
+
+    logs.setup()
+    try:
+        asyncio.run(run(args.role, args.site, args.queue, args.max_attempts))
+    finally:
+        logs.shutdown()
+
+
+if __name__ == "__main__":
+    main()